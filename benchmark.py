@@ -0,0 +1,337 @@
+"""
+A benchmark suite for the puzzle solvers
+
+Run every solver strategy on fixed, seeded corpora of all four puzzle
+types and write what each run cost to JSON:
+
+    python benchmark.py run results.json [--quick] [--memory]
+
+and compare a run with a stored baseline, exiting with status 1 if any
+case regressed by more than the threshold:
+
+    python benchmark.py compare baseline.json results.json
+"""
+from puzzle_tools import (SearchBudget, SearchStats, breadth_first_search,
+                          depth_first_search)
+from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+from mn_puzzle import MNPuzzle
+from sudoku_puzzle import SudokuPuzzle
+from word_ladder_puzzle import WordDictionary, WordLadderPuzzle
+from time import perf_counter
+import json
+import os
+import platform
+import random
+import sys
+import tracemalloc
+
+# strategies run on every case, by name
+STRATEGIES = {"depth_first": depth_first_search,
+              "breadth_first": breadth_first_search}
+# symbols of sudoku puzzles up to 16x16
+_SYMBOLS = "123456789ABCDEFG"
+
+
+def sudoku_case(n, blanks, rng):
+    """
+    Return a SudokuPuzzle of n x n cells with a single solution-shaped
+    grid chosen by rng and blanks of its cells emptied.
+
+    @type n: int
+    @type blanks: int
+    @type rng: random.Random
+    @rtype: SudokuPuzzle
+
+    >>> s = sudoku_case(4, 6, random.Random(1))
+    >>> str(s) == str(sudoku_case(4, 6, random.Random(1)))
+    True
+    >>> str(s).count("*")
+    6
+    """
+    box = round(n ** (1 / 2))
+    symbols = list(_SYMBOLS[:n])
+    rng.shuffle(symbols)
+    rows = [band * box + r for band in rng.sample(range(box), box)
+            for r in rng.sample(range(box), box)]
+    cols = [stack * box + c for stack in rng.sample(range(box), box)
+            for c in rng.sample(range(box), box)]
+    grid = [symbols[(box * (r % box) + r // box + c) % n]
+            for r in rows for c in cols]
+    for i in rng.sample(range(n * n), blanks):
+        grid[i] = "*"
+    return SudokuPuzzle(n, grid, set(symbols))
+
+
+def mn_case(rows, cols, depth, rng):
+    """
+    Return an MNPuzzle of rows x cols tiles reached from its goal by a
+    random walk of depth moves chosen by rng, never undoing the move
+    before.
+
+    @type rows: int
+    @type cols: int
+    @type depth: int
+    @type rng: random.Random
+    @rtype: MNPuzzle
+
+    >>> m = mn_case(2, 3, 4, random.Random(1))
+    >>> m.to_grid
+    (('1', '2', '3'), ('4', '5', '*'))
+    >>> m.is_solved()
+    False
+    """
+    labels = [str(i) for i in range(1, rows * cols)] + ["*"]
+    goal = tuple([tuple(labels[r * cols:(r + 1) * cols])
+                  for r in range(rows)])
+    (puzzle, previous) = (MNPuzzle(goal, goal), None)
+    for _ in range(depth):
+        moves = [p for p in puzzle.extensions()
+                 if previous is None or p.from_grid != previous.from_grid]
+        (previous, puzzle) = (puzzle, rng.choice(moves))
+    return puzzle
+
+
+def peg_case(rows):
+    """
+    Return a GridPegSolitairePuzzle laid out by rows, strings of "*",
+    "." and "#".
+
+    @type rows: list[str]
+    @rtype: GridPegSolitairePuzzle
+    """
+    return GridPegSolitairePuzzle([list(row) for row in rows],
+                                  {"*", ".", "#"})
+
+
+def ladder_cases(words, count, rng, length=4):
+    """
+    Return count WordLadderPuzzles between words of length letters in
+    words, chosen by rng.
+
+    @type words: WordDictionary
+    @type count: int
+    @type rng: random.Random
+    @type length: int
+    @rtype: list[WordLadderPuzzle]
+    """
+    choices = sorted([word for word in words.words_of_length(length)
+                      if word.isalpha() and word.islower()])
+    return [WordLadderPuzzle(rng.choice(choices), rng.choice(choices), words)
+            for _ in range(count)]
+
+
+def corpus(seed=0, quick=False, words_path="words.txt"):
+    """
+    Return the benchmark cases as (name, puzzle) pairs, the same for
+    every run with the same seed. quick leaves out the slowest ones, and
+    the word ladders are left out if there is no file at words_path.
+
+    @type seed: int
+    @type quick: bool
+    @type words_path: str
+    @rtype: list[(str, Puzzle)]
+
+    >>> [name for (name, _) in corpus(quick=True, words_path="")][:3]
+    ['sudoku-4x4', 'sudoku-9x9-star', 'sudoku-9x9-40']
+    """
+    rng = random.Random(seed)
+    cases = [("sudoku-4x4", sudoku_case(4, 10, rng)),
+             ("sudoku-9x9-star", SudokuPuzzle(
+                 9, list("***7*8*1***7*9***69*31*****35*8**6*1*********"
+                         "1*6**9*48*****12*78***7*4***6*3*2***"),
+                 set(_SYMBOLS[:9]))),
+             ("sudoku-9x9-40", sudoku_case(9, 40, rng))]
+    if not quick:
+        cases.append(("sudoku-16x16-60", sudoku_case(16, 60, rng)))
+    for depth in [5, 10, 15] + ([] if quick else [20]):
+        cases.append(("mn-3x3-{}".format(depth), mn_case(3, 3, depth, rng)))
+    cases.append(("peg-4x5", peg_case(["*****", "*****", "*****", "*.***"])))
+    cases.append(("peg-5x5", peg_case(["*****", "*****", "*****", "**.**",
+                                       "*****"])))
+    if not quick:
+        cases.append(("peg-english", peg_case(
+            ["##***##", "##***##", "*******", "***.***", "*******",
+             "##***##", "##***##"])))
+    if os.path.exists(words_path):
+        with open(words_path, "r") as f:
+            words = WordDictionary.intern(f.read().split())
+        for (i, puzzle) in enumerate(ladder_cases(words, 3 if quick else 10,
+                                                  rng)):
+            cases.append(("ladder-{}".format(i), puzzle))
+    return cases
+
+
+def run_case(puzzle, strategy, budget, repeat=1, memory=False):
+    """
+    Return what solving puzzle with strategy within budget cost: the
+    status of the search, the best of repeat wall times, the nodes
+    generated and expanded, the peak RSS of the process so far and, if
+    memory is set, the peak bytes traced by tracemalloc in one more run.
+
+    @type puzzle: Puzzle
+    @type strategy: (Puzzle, SearchBudget) -> SearchResult
+    @type budget: SearchBudget
+    @type repeat: int
+    @type memory: bool
+    @rtype: dict[str, object]
+    """
+    seconds = None
+    for _ in range(repeat):
+        stats = SearchStats()
+        start = perf_counter()
+        result = strategy(puzzle, budget, stats=stats)
+        elapsed = perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    record = {"status": result.status, "seconds": seconds,
+              "expanded": stats.expanded, "generated": stats.generated,
+              "max_frontier": stats.max_frontier,
+              "max_rss_bytes": _max_rss_bytes()}
+    if memory:
+        tracemalloc.start()
+        strategy(puzzle, budget)
+        record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return record
+
+
+def run_benchmarks(cases, strategies=None, repeat=1, memory=False,
+                   nodes=200000, seconds=60.0, progress=None):
+    """
+    Return the results of running each of strategies, by default
+    STRATEGIES, on each of cases, with a budget of nodes expanded and
+    seconds per run, as a dict ready for json.
+
+    If progress is given, it is called with the name of each case and
+    strategy and its record as they finish.
+
+    @type cases: list[(str, Puzzle)]
+    @type strategies: dict[str, (Puzzle, SearchBudget) -> SearchResult]
+    @type repeat: int
+    @type memory: bool
+    @type nodes: int
+    @type seconds: float
+    @type progress: (str, dict[str, object]) -> object | None
+    @rtype: dict[str, object]
+    """
+    if strategies is None:
+        strategies = STRATEGIES
+    results = {}
+    for (name, puzzle) in cases:
+        for (strategy_name, strategy) in strategies.items():
+            key = "{}/{}".format(name, strategy_name)
+            results[key] = run_case(puzzle, strategy,
+                                    SearchBudget(nodes=nodes, seconds=seconds),
+                                    repeat, memory)
+            if progress is not None:
+                progress(key, results[key])
+    return {"machine": {"python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "processor": platform.processor()},
+            "settings": {"repeat": repeat, "nodes": nodes,
+                         "seconds": seconds},
+            "results": results}
+
+
+def compare(baseline, current, threshold=0.1, noise=0.005):
+    """
+    Return a description of each case of current, a dict made by
+    run_benchmarks, that regressed against baseline: a status that is no
+    longer "solved", or time, nodes expanded or traced memory grown by
+    more than threshold. Time differences under noise seconds are
+    ignored.
+
+    @type baseline: dict[str, object]
+    @type current: dict[str, object]
+    @type threshold: float
+    @type noise: float
+    @rtype: list[str]
+
+    >>> old = {"results": {"a/dfs": {"status": "solved", "seconds": 1.0,
+    ...                              "expanded": 100}}}
+    >>> new = {"results": {"a/dfs": {"status": "solved", "seconds": 1.5,
+    ...                              "expanded": 100}}}
+    >>> compare(old, new)
+    ['a/dfs: seconds 1 -> 1.5 (+50%)']
+    >>> compare(old, new, threshold=0.6)
+    []
+    """
+    regressions = []
+    for (key, now) in sorted(current["results"].items()):
+        before = baseline["results"].get(key)
+        if before is None:
+            continue
+        if before["status"] == "solved" and now["status"] != "solved":
+            regressions.append("{}: status {} -> {}".format(
+                key, before["status"], now["status"]))
+        for measure in ["seconds", "expanded", "peak_bytes"]:
+            if measure not in before or measure not in now:
+                continue
+            (old, new) = (before[measure], now[measure])
+            if measure == "seconds" and new - old < noise:
+                continue
+            if new > old * (1 + threshold):
+                regressions.append("{}: {} {:g} -> {:g} ({:+.0%})".format(
+                    key, measure, old, new, new / old - 1 if old else 1))
+    return regressions
+
+
+def _max_rss_bytes():
+    # Return the peak resident memory of this process so far, or 0
+    # where that is not available.
+    #
+    # @rtype: int
+    try:
+        import resource
+    except ImportError:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the solvers.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument("output", help="JSON file to write the results to")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--quick", action="store_true",
+                     help="leave out the slowest cases")
+    run.add_argument("--repeat", type=int, default=1,
+                     help="runs per case, keeping the best time")
+    run.add_argument("--memory", action="store_true",
+                     help="also trace peak memory, in one more run")
+    run.add_argument("--nodes", type=int, default=200000,
+                     help="most nodes to expand per run")
+    run.add_argument("--seconds", type=float, default=60.0,
+                     help="most seconds per run")
+    run.add_argument("--words", default="words.txt")
+    check = commands.add_parser("compare", help="compare with a baseline")
+    check.add_argument("baseline")
+    check.add_argument("current")
+    check.add_argument("--threshold", type=float, default=0.1,
+                       help="growth allowed, as a fraction")
+    arguments = parser.parse_args()
+
+    if arguments.command == "run":
+        results = run_benchmarks(
+            corpus(arguments.seed, arguments.quick, arguments.words),
+            repeat=arguments.repeat, memory=arguments.memory,
+            nodes=arguments.nodes, seconds=arguments.seconds,
+            progress=lambda key, record: print(
+                "{:<32}{:<18}{:>10.4f}s{:>10} nodes".format(
+                    key, record["status"], record["seconds"],
+                    record["expanded"])))
+        results["settings"].update({"seed": arguments.seed,
+                                    "quick": arguments.quick})
+        with open(arguments.output, "w") as f:
+            json.dump(results, f, indent=1)
+    else:
+        with open(arguments.baseline, "r") as f:
+            baseline = json.load(f)
+        with open(arguments.current, "r") as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, arguments.threshold)
+        for regression in regressions:
+            print(regression)
+        sys.exit(1 if regressions else 0)
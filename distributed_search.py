@@ -0,0 +1,717 @@
+"""
+Depth-first searches shared out over TCP among workers
+
+A Coordinator splits the search below a puzzle into work units, each
+the subtree below one puzzle, and hands them out to the workers that
+connect to it, each running run_worker, on this machine or others. A
+worker searches each unit depth-first for up to unit_nodes nodes, then
+sends back what it has not yet tried as new units, so that big subtrees
+are split among workers as they go. Units of a worker that disconnects,
+or that takes longer than lease seconds to answer, are handed out again.
+
+Messages are frames of a 4-byte length, a byte for their kind and their
+contents. Puzzles travel as puzzle_codec encodings, with a
+ContextRegistry holding what they share with the start puzzle, such as
+a sudoku's symbol set or a word ladder's dictionary, pickled once in the
+first frame to each worker. Pickles run code when read, so only connect
+workers to coordinators they trust.
+
+A PositionCoordinator shares out peg_solitaire_tools.enumerate_positions
+in the same way, one level of pegs at a time. Each level is split by
+ranges of hash into units of packed positions and their path counts,
+the same workers jump every peg they can in their units, and the
+coordinator merges the positions they reach, adding up their path
+counts, into the next level.
+
+    python distributed_search.py coordinator puzzle.json --port 8766
+    python distributed_search.py positions board.json --port 8766
+    python distributed_search.py worker 127.0.0.1 8766 --processes 4
+
+where puzzle.json holds a puzzle as read by puzzle_io.puzzle_from_json,
+and board.json a peg solitaire puzzle.
+"""
+from packed_state_set import PackedStateSet
+from puzzle_codec import (ContextRegistry, decode, decode_batch, encode,
+                          encode_batch, read_varint, write_varint)
+from puzzle_tools import (BudgetExceeded, Meter, PuzzleNode, SearchBudget,
+                          SearchResult, expand_node, resume_depth_first)
+from array import array
+from collections import deque
+from time import monotonic
+import pickle
+import socket
+import struct
+import sys
+import threading
+import zlib
+
+# length of the frame that follows
+_LENGTH = struct.Struct(">I")
+# kinds of frame: from the coordinator, the registry and unit_nodes, or
+# the jumps of a board, a unit and the end of the search; from workers,
+# a unit exhausted, solved or split, or the positions a unit reached
+_START, _POSITIONS, _UNIT, _STOP = b"S", b"E", b"U", b"Q"
+_EXHAUSTED, _SOLVED, _SPLIT, _REACHED = b"X", b"F", b"P", b"R"
+
+
+class Coordinator:
+    """
+    Hands out the units of a depth-first search for a solution of a
+    puzzle to workers that connect over TCP, and collects their answers.
+
+    units counts the units handed out, and reissued those handed out
+    again after their worker was lost.
+    """
+
+    def __init__(self, puzzle, host="127.0.0.1", port=0, unit_nodes=20000,
+                 lease=None):
+        """
+        Create a new Coordinator self for puzzle, listening on the TCP
+        port port of host, any free one if port is 0, for workers that
+        search up to unit_nodes nodes of a unit before splitting it, and
+        give a unit to another worker when one takes more than lease
+        seconds to answer, if lease is given.
+
+        @type self: Coordinator
+        @type puzzle: Puzzle
+        @type host: str
+        @type port: int
+        @type unit_nodes: int
+        @type lease: float | None
+        @rtype: None
+        """
+        self.puzzle, self.unit_nodes, self.lease = puzzle, unit_nodes, lease
+        self.units = self.reissued = 0
+        self._listener = socket.create_server((host, port))
+        self.address = self._listener.getsockname()[:2]
+        # puzzles below puzzle share its context, so this is all the
+        # registry ever holds
+        self._registry = ContextRegistry()
+        self._registry.number(puzzle)
+        # (id of parent, puzzle) of each unit and of each puzzle between
+        # a unit and the units split from it, by id
+        self._tree = {0: (None, puzzle)}
+        # ids of the units to hand out, next first
+        self._queue = deque([0])
+        # units queued or being searched
+        self._outstanding = 1
+        self._expanded = 0
+        self._solution, self._finished = None, False
+        self._changed = threading.Condition()
+
+    def run(self, timeout=None):
+        """
+        Hand out the search of Coordinator self until a worker finds a
+        solution, there is nothing left to search or timeout seconds
+        have passed, and return what was found. The path of the result
+        ends in the solution if one was found, or else is the start.
+
+        @type self: Coordinator
+        @type timeout: float | None
+        @rtype: SearchResult
+
+        >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+        >>> peg = GridPegSolitairePuzzle([list("*****"), list("*****"),
+        ...     list("*****"), list("*.***")], {"*", "."})
+        >>> coordinator = Coordinator(peg, unit_nodes=20)
+        >>> lost = socket.create_connection(coordinator.address)
+        >>> workers = [threading.Thread(target=run_worker,
+        ...                             args=coordinator.address)
+        ...            for _ in range(2)]
+        >>> def lose_one():
+        ...     # take the start frame and a unit, and go
+        ...     for _ in range(2):
+        ...         _ = _receive(lost)
+        ...     lost.close()
+        ...     for worker in workers:
+        ...         worker.start()
+        >>> threading.Thread(target=lose_one).start()
+        >>> result = coordinator.run(timeout=60)
+        >>> for worker in workers:
+        ...     worker.join()
+        >>> result.status
+        'solved'
+        >>> node = result.path
+        >>> while node.children:
+        ...     node = node.children[0]
+        >>> str(node.puzzle).count("*")
+        1
+        >>> coordinator.units > 1, coordinator.reissued
+        (True, 1)
+        """
+        start = monotonic()
+        threading.Thread(target=_accept, daemon=True,
+                         args=(self._listener, self.lease,
+                               self._serve)).start()
+        with self._changed:
+            while self._solution is None and self._outstanding:
+                left = None if timeout is None else (
+                    timeout - (monotonic() - start))
+                if left is not None and left <= 0:
+                    break
+                self._changed.wait(left)
+            self._finished = True
+            self._changed.notify_all()
+            (solution, outstanding) = (self._solution, self._outstanding)
+        self._listener.close()
+        root = node = PuzzleNode(self.puzzle)
+        if solution is not None:
+            (status, reason) = ("solved", None)
+            for puzzle in solution[1:]:
+                child = PuzzleNode(puzzle, parent=node)
+                node.children = [child]
+                node = child
+        elif outstanding:
+            (status, reason) = ("budget_exceeded", "seconds")
+        else:
+            (status, reason) = ("exhausted", None)
+        return SearchResult(status, root, reason, self._expanded,
+                            monotonic() - start)
+
+    def _serve(self, connection):
+        # Hand units to the worker at the other end of connection until
+        # the search is finished or the worker is lost, and put its unit
+        # back in the queue if it is lost.
+        #
+        # @type self: Coordinator
+        # @type connection: socket.socket
+        # @rtype: None
+        unit = None
+        try:
+            _send(connection, _START, zlib.compress(pickle.dumps(
+                (self._registry, self.unit_nodes), pickle.HIGHEST_PROTOCOL)))
+            while True:
+                with self._changed:
+                    while not self._queue and not self._finished:
+                        self._changed.wait()
+                    if self._finished:
+                        break
+                    unit = self._queue.popleft()
+                    self.units += 1
+                _send(connection, _UNIT,
+                      encode(self._tree[unit][1], self._registry))
+                answer = _read_answer(*_receive(connection), self._registry)
+                with self._changed:
+                    self._settle(unit, answer)
+                    unit = None
+                    self._changed.notify_all()
+            _send(connection, _STOP)
+        except (OSError, EOFError, ValueError):
+            pass
+        finally:
+            connection.close()
+            with self._changed:
+                if unit is not None and not self._finished:
+                    self._queue.appendleft(unit)
+                    self.reissued += 1
+                    self._changed.notify_all()
+
+    def _settle(self, unit, answer):
+        # Record answer, sent by a worker for unit, in Coordinator self.
+        #
+        # @type self: Coordinator
+        # @type unit: int
+        # @type answer: tuple
+        # @rtype: None
+        (kind, expanded) = answer[:2]
+        self._expanded += expanded
+        self._outstanding -= 1
+        if kind == "solved":
+            path = [self._tree[unit][1]]
+            parent = self._tree[unit][0]
+            while parent is not None:
+                path.append(self._tree[parent][1])
+                parent = self._tree[parent][0]
+            self._solution = path[::-1] + answer[2]
+        elif kind == "split":
+            (stack, untried) = answer[2:]
+            (parent, units) = (unit, [])
+            for (level, children) in enumerate(untried):
+                if level > 0:
+                    parent = self._add(parent, stack[level - 1])
+                units.extend([self._add(parent, child) for child in children])
+            # deepest first, as a depth-first search would go on
+            self._queue.extendleft(units)
+            self._outstanding += len(units)
+
+    def _add(self, parent, puzzle):
+        # Add puzzle, below the puzzle with id parent, to the tree of
+        # Coordinator self and return its id.
+        #
+        # @type self: Coordinator
+        # @type parent: int
+        # @type puzzle: Puzzle
+        # @rtype: int
+        i = len(self._tree)
+        self._tree[i] = (parent, puzzle)
+        return i
+
+
+class PositionCoordinator:
+    """
+    Hands out the levels of peg_solitaire_tools.enumerate_positions for
+    a GridPegSolitairePuzzle, in units of at most unit_states positions,
+    to workers that connect over TCP, and merges what they reach.
+
+    units counts the units handed out, and reissued those handed out
+    again after their worker was lost.
+    """
+
+    def __init__(self, puzzle, host="127.0.0.1", port=0, unit_states=50000,
+                 lease=None):
+        """
+        Create a new PositionCoordinator self for puzzle, listening on
+        the TCP port port of host, any free one if port is 0, for
+        workers that are given up to unit_states positions at a time,
+        and give a unit to another worker when one takes more than
+        lease seconds to answer, if lease is given. The board of puzzle
+        may have at most 64 holes.
+
+        @type self: PositionCoordinator
+        @type puzzle: GridPegSolitairePuzzle
+        @type host: str
+        @type port: int
+        @type unit_states: int
+        @type lease: float | None
+        @rtype: None
+        """
+        assert len(puzzle.board.hole_cells) <= 64
+        self.puzzle, self.unit_states, self.lease = puzzle, unit_states, lease
+        self.units = self.reissued = 0
+        self._listener = socket.create_server((host, port))
+        self.address = self._listener.getsockname()[:2]
+        # the units of the level being expanded, by id, and the ids of
+        # those to hand out, next first
+        self._units, self._queue = {}, deque()
+        self._expanded = 0
+        self._next, self._finished = PackedStateSet(), False
+        self._changed = threading.Condition()
+        # held while merging into self._next, so the lock of
+        # self._changed isn't
+        self._merging = threading.Lock()
+
+    def run(self, timeout=None):
+        """
+        Return, as enumerate_positions does, for each number of pegs
+        from that of the puzzle of PositionCoordinator self down, the
+        number of positions reachable with that many pegs and the
+        number of jump sequences reaching them, once workers have
+        jumped from every position.
+
+        Raise BudgetExceeded if that takes more than timeout seconds.
+
+        @type self: PositionCoordinator
+        @type timeout: float | None
+        @rtype: list[(int, int, int)]
+
+        >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+        >>> from peg_solitaire_tools import enumerate_positions
+        >>> peg = GridPegSolitairePuzzle([list("****"), list("****"),
+        ...     list("****"), list("*.**")], {"*", "."})
+        >>> coordinator = PositionCoordinator(peg, unit_states=30)
+        >>> lost = socket.create_connection(coordinator.address)
+        >>> workers = [threading.Thread(target=run_worker,
+        ...                             args=coordinator.address)
+        ...            for _ in range(2)]
+        >>> def lose_one():
+        ...     # take the start frame and a unit, and go
+        ...     for _ in range(2):
+        ...         _ = _receive(lost)
+        ...     lost.close()
+        ...     for worker in workers:
+        ...         worker.start()
+        >>> threading.Thread(target=lose_one).start()
+        >>> levels = coordinator.run(timeout=60)
+        >>> for worker in workers:
+        ...     worker.join()
+        >>> levels == enumerate_positions(peg)
+        True
+        >>> levels[-1]
+        (1, 2, 210422)
+        >>> coordinator.units > len(levels), coordinator.reissued
+        (True, 1)
+        """
+        start = monotonic()
+        threading.Thread(target=_accept, daemon=True,
+                         args=(self._listener, self.lease,
+                               self._serve)).start()
+        board = self.puzzle.board
+        (pegs, result) = (bin(self.puzzle.pegs).count("1"), [])
+        level = PackedStateSet()
+        if pegs:
+            # the empty board packs to 0, which a PackedStateSet can't
+            # hold
+            level.add(board.pack(self.puzzle.pegs), 1)
+        else:
+            result.append((0, 1, 1))
+        try:
+            while len(level) > 0:
+                result.append((pegs, len(level),
+                               sum([paths for (_, paths) in level.items()])))
+                parts = -(-len(level) // self.unit_states)
+                with self._changed:
+                    self._next = PackedStateSet(len(level) * 2)
+                    self._units = {i: shard for (i, shard)
+                                   in enumerate(level.split(parts)) if shard}
+                    self._queue.extend(self._units)
+                    self._changed.notify_all()
+                    while self._units:
+                        left = None if timeout is None else (
+                            timeout - (monotonic() - start))
+                        if left is not None and left <= 0:
+                            raise BudgetExceeded("seconds", self._expanded)
+                        self._changed.wait(left)
+                    (level, pegs) = (self._next, pegs - 1)
+        finally:
+            with self._changed:
+                self._finished = True
+                self._changed.notify_all()
+            self._listener.close()
+        return result
+
+    def _serve(self, connection):
+        # Hand units to the worker at the other end of connection until
+        # the enumeration is finished or the worker is lost, and put its
+        # unit back in the queue if it is lost.
+        #
+        # @type self: PositionCoordinator
+        # @type connection: socket.socket
+        # @rtype: None
+        unit = None
+        try:
+            _send(connection, _POSITIONS, _pairs_to_bytes(array(
+                "Q", [mask for jump in self.puzzle.board.packed_masks
+                      for mask in jump])))
+            while True:
+                with self._changed:
+                    while not self._queue and not self._finished:
+                        self._changed.wait()
+                    if self._finished:
+                        break
+                    unit = self._queue.popleft()
+                    shard = self._units[unit]
+                    self.units += 1
+                _send(connection, _UNIT, _pairs_to_bytes(shard))
+                (kind, data) = _receive(connection)
+                if kind != _REACHED:
+                    raise ValueError("unknown answer {!r}".format(kind))
+                reached = _bytes_to_pairs(data)
+                with self._merging:
+                    add = self._next.add
+                    for i in range(0, len(reached), 2):
+                        add(reached[i], reached[i + 1])
+                with self._changed:
+                    del self._units[unit]
+                    self._expanded += len(shard) // 2
+                    unit = None
+                    self._changed.notify_all()
+            _send(connection, _STOP)
+        except (OSError, EOFError, ValueError):
+            pass
+        finally:
+            connection.close()
+            with self._changed:
+                if unit is not None and not self._finished:
+                    self._queue.appendleft(unit)
+                    self.reissued += 1
+                    self._changed.notify_all()
+
+
+def run_worker(host, port):
+    """
+    Work on the units handed out by the Coordinator or the
+    PositionCoordinator at the TCP port port of host until it has no
+    more, and return the number done.
+
+    Puzzles already searched by this worker are skipped in later units.
+
+    @type host: str
+    @type port: int
+    @rtype: int
+    """
+    done = 0
+    with socket.create_connection((host, port)) as connection:
+        try:
+            (kind, data) = _receive(connection)
+            if kind == _START:
+                (registry, unit_nodes) = pickle.loads(zlib.decompress(data))
+                overlap = {}
+
+                def work(unit):
+                    return _write_answer(_work(decode(unit, registry),
+                                               overlap, unit_nodes),
+                                         registry)
+            elif kind == _POSITIONS:
+                masks = _bytes_to_pairs(data)
+
+                def work(unit):
+                    return _REACHED, _pairs_to_bytes(
+                        _reach(_bytes_to_pairs(unit), masks))
+            else:
+                raise ValueError("no start frame")
+            while True:
+                (kind, data) = _receive(connection)
+                if kind == _STOP:
+                    break
+                _send(connection, *work(data))
+                done += 1
+        except (OSError, EOFError):
+            # the coordinator has finished, or is gone
+            pass
+    return done
+
+
+def _work(puzzle, overlap, unit_nodes):
+    # Search depth-first below puzzle for up to unit_nodes nodes,
+    # skipping puzzles in overlap, and return the answer to send: the
+    # kind of answer, the nodes expanded, and for "solved" the puzzles
+    # after puzzle on the way to the solution, or for "split" the
+    # puzzles on the path to the deepest node being searched, after
+    # puzzle, and the children not yet tried of each node on it.
+    #
+    # @type puzzle: Puzzle
+    # @type overlap: dict[object : Puzzle]
+    # @type unit_nodes: int
+    # @rtype: tuple
+    key = puzzle.canonical_key()
+    if key in overlap:
+        return ("exhausted", 0)
+    elif puzzle.fail_fast():
+        overlap[key] = puzzle
+        return ("exhausted", 0)
+    elif puzzle.is_solved():
+        return ("solved", 0, [])
+    meter = Meter(SearchBudget(nodes=unit_nodes))
+    root = PuzzleNode(puzzle)
+    stack = [[expand_node(root, overlap, meter, 0), 0]]
+    (solution, _) = resume_depth_first(stack, overlap, meter, root, 1)
+    # each node on stack is the child its parent tried last
+    path = [node.children[tried - 1].puzzle for (node, tried) in stack
+            if tried]
+    if solution is not None:
+        return ("solved", meter.expanded, path)
+    elif not stack:
+        return ("exhausted", meter.expanded)
+    return ("split", meter.expanded, path[:len(stack) - 1],
+            [[child.puzzle for child in node.children[tried:]]
+             for (node, tried) in stack])
+
+
+def _reach(shard, masks):
+    # Return the positions one jump from those of shard, each followed
+    # by the sum of the path counts of the positions it is reached
+    # from. shard holds packed positions, each followed by its path
+    # count, and masks the (from and over, to) masks of each jump.
+    #
+    # @type shard: array
+    # @type masks: array
+    # @rtype: array
+    jumps = list(zip(masks[::2], masks[1::2]))
+    reached = PackedStateSet(len(shard))
+    for i in range(0, len(shard), 2):
+        (state, paths) = (shard[i], shard[i + 1])
+        for (fo, t) in jumps:
+            if state & fo == fo and not state & t:
+                reached.add(state ^ (fo | t), paths)
+    return array("Q", [n for pair in reached.items() for n in pair])
+
+
+def _pairs_to_bytes(numbers):
+    # Return numbers, an array of unsigned 64-bit ints, as bytes in
+    # little-endian order.
+    #
+    # @type numbers: array
+    # @rtype: bytes
+    if sys.byteorder == "big":
+        numbers = array("Q", numbers)
+        numbers.byteswap()
+    return numbers.tobytes()
+
+
+def _bytes_to_pairs(data):
+    # Return the array of unsigned 64-bit ints _pairs_to_bytes wrote as
+    # data.
+    #
+    # @type data: bytes
+    # @rtype: array
+    if len(data) % 16:
+        raise ValueError("truncated pairs")
+    numbers = array("Q", data)
+    if sys.byteorder == "big":
+        numbers.byteswap()
+    return numbers
+
+
+def _write_answer(answer, registry):
+    # Return the kind of frame and the contents that carry answer, as
+    # _work returns it, using registry.
+    #
+    # @type answer: tuple
+    # @type registry: ContextRegistry
+    # @rtype: (bytes, bytes)
+    (kind, expanded) = answer[:2]
+    if kind == "exhausted":
+        return _EXHAUSTED, write_varint(expanded)
+    elif kind == "solved":
+        return _SOLVED, (write_varint(expanded) +
+                         encode_batch(answer[2], registry))
+    (path, untried) = answer[2:]
+    return _SPLIT, b"".join(
+        [write_varint(expanded), write_varint(len(untried))] +
+        [write_varint(len(children)) for children in untried] +
+        [encode_batch(path + [child for children in untried
+                              for child in children], registry)])
+
+
+def _read_answer(kind, data, registry):
+    # Return the answer that _write_answer wrote as a frame of kind
+    # with contents data, using registry.
+    #
+    # @type kind: bytes
+    # @type data: bytes
+    # @type registry: ContextRegistry
+    # @rtype: tuple
+    (expanded, i) = read_varint(data, 0)
+    if kind == _EXHAUSTED:
+        return ("exhausted", expanded)
+    elif kind == _SOLVED:
+        return ("solved", expanded, decode_batch(data[i:], registry))
+    elif kind != _SPLIT:
+        raise ValueError("unknown answer {!r}".format(kind))
+    (levels, i) = read_varint(data, i)
+    counts = []
+    for _ in range(levels):
+        (count, i) = read_varint(data, i)
+        counts.append(count)
+    puzzles = decode_batch(data[i:], registry)
+    # the path to the deepest node has one puzzle fewer than levels
+    (path, start, untried) = (puzzles[:levels - 1], levels - 1, [])
+    for count in counts:
+        untried.append(puzzles[start:start + count])
+        start += count
+    return ("split", expanded, path, untried)
+
+
+def _accept(listener, lease, serve):
+    # Call serve with each connection made to listener, in a thread of
+    # its own, until listener is closed. Connections time out after
+    # lease seconds, if it is given.
+    #
+    # @type listener: socket.socket
+    # @type lease: float | None
+    # @type serve: (socket.socket) -> None
+    # @rtype: None
+    while True:
+        try:
+            (connection, _) = listener.accept()
+        except OSError:
+            return
+        connection.settimeout(lease)
+        threading.Thread(target=serve, args=(connection,),
+                         daemon=True).start()
+
+
+def _send(connection, kind, data=b""):
+    # Send a frame of kind with contents data on connection.
+    #
+    # @type connection: socket.socket
+    # @type kind: bytes
+    # @type data: bytes
+    # @rtype: None
+    connection.sendall(_LENGTH.pack(len(data) + 1) + kind + data)
+
+
+def _receive(connection):
+    # Return the kind and the contents of the next frame on connection.
+    #
+    # @type connection: socket.socket
+    # @rtype: (bytes, bytes)
+    (length,) = _LENGTH.unpack(_read(connection, _LENGTH.size))
+    frame = _read(connection, length)
+    return frame[:1], frame[1:]
+
+
+def _read(connection, size):
+    # Return the next size bytes from connection, raising EOFError if
+    # it closes first.
+    #
+    # @type connection: socket.socket
+    # @type size: int
+    # @rtype: bytes
+    chunks = []
+    while size:
+        chunk = connection.recv(min(size, 1 << 20))
+        if not chunk:
+            raise EOFError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    import argparse
+    import json
+    import multiprocessing
+    from puzzle_io import puzzle_from_json
+
+    parser = argparse.ArgumentParser(
+        description="Share a depth-first search among workers over TCP.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    coordinate = commands.add_parser("coordinator")
+    coordinate.add_argument("puzzle", help="JSON file holding the puzzle")
+    coordinate.add_argument("--host", default="127.0.0.1")
+    coordinate.add_argument("--port", type=int, default=8766)
+    coordinate.add_argument("--unit-nodes", type=int, default=20000)
+    coordinate.add_argument("--lease", type=float, default=None)
+    coordinate.add_argument("--timeout", type=float, default=None)
+    coordinate.add_argument("--words", default="words.txt")
+    positions = commands.add_parser("positions")
+    positions.add_argument("puzzle", help="JSON file holding the board")
+    positions.add_argument("--host", default="127.0.0.1")
+    positions.add_argument("--port", type=int, default=8766)
+    positions.add_argument("--unit-states", type=int, default=50000)
+    positions.add_argument("--lease", type=float, default=None)
+    positions.add_argument("--timeout", type=float, default=None)
+    work = commands.add_parser("worker")
+    work.add_argument("host")
+    work.add_argument("port", type=int)
+    work.add_argument("--processes", type=int, default=1)
+    arguments = parser.parse_args()
+
+    if arguments.command == "coordinator":
+        with open(arguments.puzzle, "r") as f:
+            data = json.load(f)
+        words = None
+        if data.get("type") == "word_ladder" and "words" not in data:
+            with open(arguments.words, "r") as f:
+                words = set(f.read().split())
+        coordinator = Coordinator(puzzle_from_json(data, words),
+                                  arguments.host, arguments.port,
+                                  arguments.unit_nodes, arguments.lease)
+        result = coordinator.run(arguments.timeout)
+        print(result)
+        node, steps = result.path, 0
+        while node.children:
+            (node, steps) = (node.children[0], steps + 1)
+        print("{} steps to:".format(steps))
+        print(node.puzzle)
+    elif arguments.command == "positions":
+        with open(arguments.puzzle, "r") as f:
+            board = puzzle_from_json(json.load(f))
+        coordinator = PositionCoordinator(board, arguments.host,
+                                          arguments.port,
+                                          arguments.unit_states,
+                                          arguments.lease)
+        print("pegs  positions  paths")
+        for (pegs, count, paths) in coordinator.run(arguments.timeout):
+            print("{:>4} {:>10} {:>6}".format(pegs, count, paths))
+    else:
+        workers = [multiprocessing.Process(
+            target=run_worker, args=(arguments.host, arguments.port))
+            for _ in range(arguments.processes)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
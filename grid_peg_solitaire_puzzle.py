@@ -1,12 +1,532 @@
 from puzzle import Puzzle
-from copy import deepcopy
+
+# weight ratio of the golden-ratio pagoda: x + x ** 2 == 1
+_GOLDEN = (5 ** 0.5 - 1) / 2
+
+
+class PegBoard:
+    """
+    The shape of a peg solitaire board: its dimensions, which cells are
+    holes, and every (from, over, to) jump the shape allows.
+
+    Cell (r, c) is bit r * cols + c of the int masks used for boards
+    and pegs. Boards are shared: use PegBoard.get rather than creating
+    them directly, so puzzles on the same shape share one jump table.
+    """
+
+    def __init__(self, rows, cols, holes):
+        """
+        Create a new PegBoard self with rows x cols cells, where the
+        cells set in holes can hold a peg.
+
+        @type self: PegBoard
+        @type rows: int
+        @type cols: int
+        @type holes: int
+        @rtype: None
+        """
+        self.rows, self.cols, self.holes = rows, cols, holes
+        self.size = rows * cols
+        # (from, over, to) cell indices of every jump on this shape,
+        # horizontal jumps before vertical ones.
+        self.jumps = tuple(self._find_jumps(0, 1) + self._find_jumps(1, 0))
+        # (from|over, to) masks in the same order as self.jumps
+        self.masks = tuple(((1 << f) | (1 << o), 1 << t)
+                           for (f, o, t) in self.jumps)
+        # cells of the holes, in order; pack numbers holes this way
+        self.hole_cells = tuple([i for i in range(self.size)
+                                 if holes >> i & 1])
+        hole_number = {cell: n for (n, cell) in enumerate(self.hole_cells)}
+        self._pack_tables = _byte_tables(
+            [1 << hole_number[i] if i in hole_number else 0
+             for i in range(self.size)])
+        self._unpack_tables = _byte_tables(
+            [1 << cell for cell in self.hole_cells])
+        # self.masks with holes numbered as by pack
+        self.packed_masks = tuple(
+            ((1 << hole_number[f]) | (1 << hole_number[o]),
+             1 << hole_number[t]) for (f, o, t) in self.jumps)
+        # text of each row, keyed by that row's slice of the pegs,
+        # filled in as patterns turn up
+        self._row_text = [{} for _ in range(rows)]
+        # cells on each diagonal family, by (r + c) % 3 and (r - c) % 3
+        self._diagonals = [[0, 0, 0], [0, 0, 0]]
+        for i in range(self.size):
+            r, c = self.cell(i)
+            if holes >> i & 1:
+                self._diagonals[0][(r + c) % 3] |= 1 << i
+                self._diagonals[1][(r - c) % 3] |= 1 << i
+        # holes a lone peg can finish in, by position class
+        self._finals = {}
+        for i in range(self.size):
+            if holes >> i & 1:
+                key = self.position_class(1 << i)
+                self._finals[key] = self._finals.get(key, 0) | 1 << i
+        # (step, from, over, to) masks of the jumps in each direction,
+        # where over is from + step and to is from + 2 * step
+        steps = {}
+        for (f, o, t) in self.jumps:
+            masks = steps.setdefault(o - f, [0, 0, 0])
+            masks[0] |= 1 << f
+            masks[1] |= 1 << o
+            masks[2] |= 1 << t
+        # (positive steps in _ahead, negated negative ones in _behind)
+        self._ahead = [(k, f, o, t) for (k, (f, o, t))
+                       in sorted(steps.items()) if k > 0]
+        self._behind = [(-k, f, o, t) for (k, (f, o, t))
+                        in sorted(steps.items()) if k < 0]
+        # golden-ratio pagoda weights, by final cell, built on demand
+        self._pagodas = {}
+        # Cell permutations of the board's symmetries other than the
+        # identity, and for each one the images of every pattern of
+        # pegs on each byte of cells.
+        self.symmetries, self._images = [], []
+        for transform in _transforms(rows, cols)[1:]:
+            perm = [self.index(*transform(*self.cell(i)))
+                    for i in range(self.size)]
+            if all([holes >> perm[i] & 1 == holes >> i & 1
+                    for i in range(self.size)]):
+                self.symmetries.append(perm)
+                self._images.append(_byte_tables([1 << j for j in perm]))
+        # weights of each cell in the pagoda functions known for this
+        # shape, and their images under its symmetries
+        self.pagodas = []
+        for rows_text in _PAGODA_TABLES.get(self._shape(), []):
+            weights = [0] * self.size
+            for (cell, weight) in zip(self.hole_cells,
+                                      " ".join(rows_text).split()):
+                weights[cell] = int(weight)
+            for perm in [list(range(self.size))] + self.symmetries:
+                image = [0] * self.size
+                for i in range(self.size):
+                    image[perm[i]] = weights[i]
+                if image not in self.pagodas:
+                    self.pagodas.append(image)
+        # (tables summing the weights of a pagoda over each byte of
+        # cells, low one less than its least weight, and the masks of
+        # the cells weighing more than low, low + 1, ...) for each of
+        # self.pagodas
+        self._pagoda_checks = []
+        for weights in self.pagodas:
+            low = min(weights) - 1
+            self._pagoda_checks.append((_byte_tables(weights), low, [
+                sum([1 << i for i in range(self.size) if weights[i] > t])
+                for t in range(low, max(weights))]))
+
+    @staticmethod
+    def get(rows, cols, holes):
+        """
+        Return the shared PegBoard with rows x cols cells and holes.
+
+        @type rows: int
+        @type cols: int
+        @type holes: int
+        @rtype: PegBoard
+
+        >>> PegBoard.get(1, 3, 7) is PegBoard.get(1, 3, 7)
+        True
+        >>> PegBoard.get(1, 3, 7).jumps
+        ((0, 1, 2), (2, 1, 0))
+        """
+        key = (rows, cols, holes)
+        if key not in _BOARDS:
+            _BOARDS[key] = PegBoard(rows, cols, holes)
+        return _BOARDS[key]
+
+    def __reduce__(self):
+        """
+        Return how to pickle PegBoard self so that it is shared again
+        when unpickled.
+
+        @type self: PegBoard
+        @rtype: tuple
+        """
+        return PegBoard.get, (self.rows, self.cols, self.holes)
+
+    def index(self, row, col):
+        """
+        Return the cell index of (row, col) on PegBoard self.
+
+        @type self: PegBoard
+        @type row: int
+        @type col: int
+        @rtype: int
+        """
+        return row * self.cols + col
+
+    def cell(self, index):
+        """
+        Return the (row, col) of cell index on PegBoard self.
+
+        @type self: PegBoard
+        @type index: int
+        @rtype: (int, int)
+        """
+        return divmod(index, self.cols)
+
+    def pack(self, pegs):
+        """
+        Return pegs on PegBoard self with the unused cells squeezed out,
+        so bit n stands for the n-th hole in self.hole_cells.
+
+        @type self: PegBoard
+        @type pegs: int
+        @rtype: int
+
+        >>> b = PegBoard.get(2, 2, 0b1110)
+        >>> b.pack(0b1010)
+        5
+        >>> b.unpack(5)
+        10
+        """
+        return _apply(self._pack_tables, pegs)
+
+    def unpack(self, packed):
+        """
+        Return the pegs on PegBoard self that pack to packed.
+
+        @type self: PegBoard
+        @type packed: int
+        @rtype: int
+        """
+        return _apply(self._unpack_tables, packed)
+
+    def render(self, pegs):
+        """
+        Return the text of PegBoard self holding pegs, with "#" for
+        unused cells, "*" for pegs and "." for empty holes.
+
+        @type self: PegBoard
+        @type pegs: int
+        @rtype: str
+
+        >>> print(PegBoard.get(2, 2, 7).render(1))
+        *.
+        .#
+        """
+        cols, row_mask, lines = self.cols, (1 << self.cols) - 1, []
+        for r in range(self.rows):
+            bits = pegs >> (r * cols) & row_mask
+            texts = self._row_text[r]
+            if bits not in texts:
+                texts[bits] = "".join(
+                    ["#" if not self.holes >> self.index(r, c) & 1 else
+                     "*" if bits >> c & 1 else "." for c in range(cols)])
+            lines.append(texts[bits])
+        return "\n".join(lines)
+
+    def position_class(self, pegs):
+        """
+        Return the position class of pegs on PegBoard self.
+
+        Every jump changes the number of pegs on each of the three
+        diagonals of a family by one, so the parities of neighbouring
+        pairs of diagonals never change (Conway's rule of three).
+
+        @type self: PegBoard
+        @type pegs: int
+        @rtype: (int, int, int, int)
+
+        >>> b = PegBoard.get(1, 3, 7)
+        >>> b.position_class(3) == b.position_class(4)
+        True
+        """
+        result = ()
+        for family in self._diagonals:
+            counts = [bin(pegs & d).count("1") for d in family]
+            result += ((counts[0] + counts[1]) % 2,
+                       (counts[1] + counts[2]) % 2)
+        return result
+
+    def final_cells(self, pegs):
+        """
+        Return the mask of holes where pegs on PegBoard self could be
+        reduced to a single peg, judging by position class alone.
+
+        @type self: PegBoard
+        @type pegs: int
+        @rtype: int
+
+        >>> PegBoard.get(1, 3, 7).final_cells(3)
+        4
+        """
+        return self._finals.get(self.position_class(pegs), 0)
+
+    def pagoda(self, pegs, final):
+        """
+        Return the golden-ratio pagoda value of pegs on PegBoard self,
+        with respect to finishing in cell final.
+
+        A peg at distance d from final weighs x ** d, where x + x ** 2
+        is 1, so no jump increases the total. A position worth less
+        than 1 can never finish in final.
+
+        @type self: PegBoard
+        @type pegs: int
+        @type final: int
+        @rtype: float
+
+        >>> PegBoard.get(1, 5, 31).pagoda(1 << 4, 0) < 1
+        True
+        """
+        if final not in self._pagodas:
+            fr, fc = self.cell(final)
+            self._pagodas[final] = [
+                _GOLDEN ** (abs(r - fr) + abs(c - fc))
+                for (r, c) in [self.cell(i) for i in range(self.size)]]
+        weights, total = self._pagodas[final], 0
+        while pegs:
+            low = pegs & -pegs
+            total += weights[low.bit_length() - 1]
+            pegs ^= low
+        return total
+
+    def pagoda_finals(self, pegs, finals):
+        """
+        Return the mask of the cells in finals where pegs on PegBoard
+        self could still be reduced to a single peg, judging by pagoda
+        functions: the golden-ratio pagoda of each cell, and those in
+        self.pagodas.
+
+        A pagoda function weighs each hole so that no jump increases
+        the total weight of the pegs, so pegs that weigh less than a
+        lone peg on a cell can never finish there.
+
+        @type self: PegBoard
+        @type pegs: int
+        @type finals: int
+        @rtype: int
+
+        >>> english = GridPegSolitairePuzzle([list(row) for row in [
+        ...     "##***##", "##***##", "*******", "***.***", "*******",
+        ...     "##***##", "##***##"]], {"*", ".", "#"}).board
+        >>> len(english.pagodas)
+        16
+        >>> all([w[t] <= w[f] + w[o] for w in english.pagodas
+        ...      for (f, o, t) in english.jumps])
+        True
+        >>> english.pagoda_finals(english.holes ^ 1 << 24, 1 << 24) > 0
+        True
+        """
+        for (tables, low, heavier) in self._pagoda_checks:
+            total = _total(tables, pegs) - low
+            if total < len(heavier):
+                # cells weighing more than the pegs are out of reach
+                finals &= ~heavier[max(total, 0)]
+                if not finals:
+                    return 0
+        result = finals
+        while finals:
+            low = finals & -finals
+            if self.pagoda(pegs, low.bit_length() - 1) < 1 - 1e-9:
+                result ^= low
+            finals ^= low
+        return result
+
+    def _shape(self):
+        # Return the rows of PegBoard self with "#" for unused cells and
+        # "." for holes, as _PAGODA_TABLES keys them.
+        #
+        # @type self: PegBoard
+        # @rtype: tuple[str]
+        return tuple(["".join(["." if self.holes >> self.index(r, c) & 1
+                               else "#" for c in range(self.cols)])
+                      for r in range(self.rows)])
+
+    def stuck_pegs(self, pegs):
+        """
+        Return the mask of pegs on PegBoard self that can never jump
+        nor be jumped over, whatever moves are made.
+
+        @type self: PegBoard
+        @type pegs: int
+        @rtype: int
+
+        >>> PegBoard.get(1, 5, 31).stuck_pegs(1 + 16)
+        17
+        >>> PegBoard.get(1, 5, 31).stuck_pegs(1 + 2)
+        0
+        """
+        lonely = pegs & ~self._partnered(pegs)
+        if not lonely:
+            return 0
+        # Over-approximate the cells that could ever hold a peg by
+        # allowing jumps without taking pegs away, until that gives
+        # every lonely peg a partner or nothing more can be reached.
+        reach, last = pegs, 0
+        while reach != last and lonely:
+            last = reach
+            for (k, _, _, to) in self._ahead:
+                reach |= to & last << k & last << 2 * k
+            for (k, _, _, to) in self._behind:
+                reach |= to & last >> k & last >> 2 * k
+            lonely &= ~self._partnered(reach)
+        return lonely
+
+    def _partnered(self, pegs):
+        # Return the mask of cells that have a partner in pegs: a
+        # cell they could jump over, or a cell that could jump them.
+        #
+        # @type self: PegBoard
+        # @type pegs: int
+        # @rtype: int
+        result = 0
+        for (k, start, over, _) in self._ahead:
+            result |= start & pegs >> k | over & pegs << k
+        for (k, start, over, _) in self._behind:
+            result |= start & pegs << k | over & pegs >> k
+        return result
+
+    def canonical(self, pegs):
+        """
+        Return the least of the images of pegs under the symmetries of
+        PegBoard self, which is the same for all symmetric positions.
+
+        @type self: PegBoard
+        @type pegs: int
+        @rtype: int
+
+        >>> b = PegBoard.get(3, 3, 511)
+        >>> len(b.symmetries)
+        7
+        >>> b.canonical(1 << 2) == b.canonical(1 << 6) == 1
+        True
+        """
+        best = pegs
+        for tables in self._images:
+            image = _apply(tables, pegs)
+            if image < best:
+                best = image
+        return best
+
+    def _find_jumps(self, dr, dc):
+        # Return the (from, over, to) jumps along direction (dr, dc),
+        # in both senses, whose three cells are all holes.
+        #
+        # @type self: PegBoard
+        # @type dr: int
+        # @type dc: int
+        # @rtype: list[(int, int, int)]
+        result = []
+        for r in range(self.rows):
+            for c in range(self.cols):
+                # a peg at (r, c) jumping backwards, then forwards
+                for s in (-1, 1):
+                    r2, c2 = r + 2 * s * dr, c + 2 * s * dc
+                    if 0 <= r2 < self.rows and 0 <= c2 < self.cols:
+                        cells = (self.index(r, c),
+                                 self.index(r + s * dr, c + s * dc),
+                                 self.index(r2, c2))
+                        if all([self.holes >> i & 1 for i in cells]):
+                            result.append(cells)
+        return result
+
+
+# shared PegBoards, keyed by (rows, cols, holes)
+_BOARDS = {}
+
+# Pagoda functions of boards of some shapes, keyed by their rows as
+# PegBoard._shape gives them, each function the weights of the holes row
+# by row. The symmetries of the board give the rest.
+_PAGODA_TABLES = {
+    # the 33-hole English board: pegs left on the ends of its arms need
+    # pegs on the arms beside them to be cleared
+    ("##...##", "##...##", ".......", ".......", ".......", "##...##",
+     "##...##"): [
+        ("-1 0 -1",
+         "1 0 1",
+         "0 0 0 0 0 0 0",
+         "0 1 1 0 1 0 1",
+         "0 0 0 0 0 0 0",
+         "1 0 1",
+         "-1 0 -1"),
+        ("-1 0 -1",
+         "1 1 1",
+         "0 0 0 0 0 0 0",
+         "0 1 1 1 1 1 0",
+         "0 0 0 0 0 0 0",
+         "1 1 1",
+         "-1 1 0"),
+        ("-1 1 0",
+         "1 1 0",
+         "0 0 0 0 0 0 0",
+         "0 1 1 1 0 1 0",
+         "0 0 0 0 0 0 0",
+         "1 1 0",
+         "-1 1 0")]}
+
+
+def _byte_tables(image_of):
+    # Return tables mapping each pattern of bits on each byte of cells
+    # to the union of image_of those cells, for use with _apply.
+    #
+    # @type image_of: list[int]
+    # @rtype: list[list[int]]
+    return [[sum([image_of[i + b] for b in range(8)
+                  if bits >> b & 1 and i + b < len(image_of)])
+             for bits in range(256)]
+            for i in range(0, len(image_of), 8)]
+
+
+def _apply(tables, mask):
+    # Return the union of the images of the cells in mask, using
+    # tables from _byte_tables.
+    #
+    # @type tables: list[list[int]]
+    # @type mask: int
+    # @rtype: int
+    result = 0
+    for table in tables:
+        result |= table[mask & 255]
+        mask >>= 8
+    return result
+
+
+def _total(tables, mask):
+    # Return the sum of the weights of the cells in mask, using tables
+    # from _byte_tables.
+    #
+    # @type tables: list[list[int]]
+    # @type mask: int
+    # @rtype: int
+    result = 0
+    for table in tables:
+        result += table[mask & 255]
+        mask >>= 8
+    return result
+
+
+def _transforms(rows, cols):
+    # Return the maps of (row, col) for the symmetries of a rows x cols
+    # rectangle, starting with the identity: all eight symmetries of
+    # the square when rows == cols, otherwise the four that keep the
+    # rectangle's orientation.
+    #
+    # @type rows: int
+    # @type cols: int
+    # @rtype: list[function]
+    r, c = rows - 1, cols - 1
+    result = [lambda i, j: (i, j),
+              lambda i, j: (r - i, c - j),
+              lambda i, j: (r - i, j),
+              lambda i, j: (i, c - j)]
+    if rows == cols:
+        result += [lambda i, j: (j, i),
+                   lambda i, j: (c - j, r - i),
+                   lambda i, j: (j, r - i),
+                   lambda i, j: (c - j, i)]
+    return result
 
 
 class GridPegSolitairePuzzle(Puzzle):
     """
     Snapshot of peg solitaire on a rectangular grid. May be solved,
     unsolved, or even unsolvable.
+
+    The state is a bitboard: self.pegs has bit i set when cell i of
+    self.board holds a peg.
     """
+    __slots__ = ("board", "pegs", "_marker_set")
 
     def __init__(self, marker, marker_set):
         """
@@ -23,10 +543,35 @@ class GridPegSolitairePuzzle(Puzzle):
         assert all([len(x) == len(marker[0]) for x in marker[1:]])
         assert all([all(x in marker_set for x in row) for row in marker])
         assert all([x == "*" or x == "." or x == "#" for x in marker_set])
-        self._marker, self._marker_set = marker, marker_set
+        rows, cols = len(marker), len(marker[0])
+        holes, pegs = 0, 0
+        for r in range(rows):
+            for c in range(cols):
+                if marker[r][c] != "#":
+                    holes |= 1 << (r * cols + c)
+                if marker[r][c] == "*":
+                    pegs |= 1 << (r * cols + c)
+        self.board, self.pegs = PegBoard.get(rows, cols, holes), pegs
+        self._marker_set = marker_set
+
+    def with_pegs(self, pegs):
+        """
+        Return a GridPegSolitairePuzzle on the same board as self with
+        pegs, skipping the checks in __init__.
+
+        @type self: GridPegSolitairePuzzle
+        @type pegs: int
+        @rtype: GridPegSolitairePuzzle
+
+        >>> s = GridPegSolitairePuzzle([["*", ".", "*"]], {"*", "."})
+        >>> print(s.with_pegs(2))
+        .*.
+        """
+        result = type(self).__new__(type(self))
+        result.board, result.pegs = self.board, pegs
+        result._marker_set = self._marker_set
+        return result
 
-    # TODO
-    # implement __eq__, __str__ methods
     def __eq__(self, other):
         """
         Return whether GridPegSolitairePuzzle self is equivalent to other.
@@ -54,8 +599,19 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> s2.__eq__(s3)
         True
         """
-        return (type(self) == type(other) and self._marker == other._marker and
-                self._marker_set == self._marker_set)
+        return (type(self) == type(other) and self.board is other.board and
+                self.pegs == other.pegs and
+                self._marker_set == other._marker_set)
+
+    def __hash__(self):
+        """
+        Return a hash of GridPegSolitairePuzzle self, consistent
+        with __eq__.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+        """
+        return hash((id(self.board), self.pegs))
 
     def __str__(self):
         """
@@ -77,19 +633,103 @@ class GridPegSolitairePuzzle(Puzzle):
         ******
         ##**##
         """
-        result = ""
-        for i in self._marker:
-            for j in i:
-                result += j
-            result += "\n"
-        return result[:len(result)-1]
+        return self.board.render(self.pegs)
 
-    # __repr__ is up to you
+    def canonical_key(self):
+        """
+        Return the same key for GridPegSolitairePuzzle self and every
+        rotation or reflection of it that fits the board.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> p = {"*", ".", "#"}
+        >>> s1 = GridPegSolitairePuzzle([["*", "*", "."]], p)
+        >>> s2 = GridPegSolitairePuzzle([[".", "*", "*"]], p)
+        >>> s1.canonical_key() == s2.canonical_key()
+        True
+        """
+        return self.board.canonical(self.pegs)
+
+    def context(self):
+        """
+        Return the board and the marker set of GridPegSolitairePuzzle
+        self.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: (PegBoard, frozenset[str])
+        """
+        return (self.board, frozenset(self._marker_set))
+
+    def to_bytes(self):
+        """
+        Return the pegs of GridPegSolitairePuzzle self as bytes, a bit
+        for each cell of its board.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: bytes
+
+        >>> s = GridPegSolitairePuzzle([["*", ".", "*"], ["#", "*", "#"]],
+        ...                            {"*", ".", "#"})
+        >>> s.to_bytes()
+        b'\\x15'
+        >>> print(GridPegSolitairePuzzle.from_bytes(s.context(), s.to_bytes()))
+        *.*
+        #*#
+        """
+        return self.pegs.to_bytes((self.board.size + 7) // 8, "little")
+
+    @staticmethod
+    def from_bytes(context, data):
+        """
+        Return the GridPegSolitairePuzzle with context whose pegs
+        to_bytes wrote as data.
+
+        @type context: (PegBoard, frozenset[str])
+        @type data: bytes
+        @rtype: GridPegSolitairePuzzle
+        """
+        result = GridPegSolitairePuzzle.__new__(GridPegSolitairePuzzle)
+        (result.board, result._marker_set) = context
+        result.pegs = int.from_bytes(data, "little")
+        return result
+
+    def describe_move(self, extension):
+        """
+        Return the jump from GridPegSolitairePuzzle self to extension as
+        the (row, column) of the peg that jumps and of the hole it lands
+        in.
+
+        @type self: GridPegSolitairePuzzle
+        @type extension: GridPegSolitairePuzzle
+        @rtype: str
+
+        >>> s = GridPegSolitairePuzzle([["*", "*", "."], ["#", "#", "#"]],
+        ...                            {"*", ".", "#"})
+        >>> s.describe_move(s.extensions()[0])
+        '(0, 0)->(0, 2)'
+        """
+        to = (extension.pegs & ~self.pegs).bit_length() - 1
+        gone = self.pegs & ~extension.pegs
+        (low, high) = ((gone & -gone).bit_length() - 1, gone.bit_length() - 1)
+        # the peg jumped over is halfway between the other two cells
+        start = low if low + to == 2 * high else high
+        return "{}->{}".format(self.board.cell(start), self.board.cell(to))
+
+    def marker(self):
+        """
+        Return the list-of-lists marker grid of
+        GridPegSolitairePuzzle self.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: list[list[str]]
+
+        >>> s = GridPegSolitairePuzzle([["*", ".", "#"]], {"*", ".", "#"})
+        >>> s.marker()
+        [['*', '.', '#']]
+        """
+        return [list(row) for row in str(self).split("\n")]
 
-    # TODO
-    # override extensions
-    # legal extensions consist of all configurations that can be reached by
-    # making a single jump from this configuration
     def extensions(self):
         """
         Return list of legal extensions of GridPegSolitairePuzzle self.
@@ -135,89 +775,77 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> all([s in T1 for s in T2])
         True
         """
-        def jump_right_left(board, marker_set):
-            """
-            Return a list of str where a peg can jump over in a row
-
-            @type board: list[str]
-            @type marker_set: set[str]
-            @rtype: list[[str]]
-
-            #>>> grid = [["*", "*", "*", "*", "*"],\
-            #        ["*", "*", "*", "*", "*"],\
-            #        ["*", "*", "*", "*", "*"],\
-            #        ["*", "*", ".", "*", "*"],\
-            #        ["*", "*", "*", "*", "*"]]
-            #>>> ls = jump_right_left(grid)
-            #>>> print(ls)
-            [['']]
-            """
-            peg, empty, hole = "*", "#", "."
-            lst = []
-            for x in range(len(board)):
-                for j in range(len(board[x])):
-                    l = deepcopy(board)
-                    if board[x][j] == peg:
-                        if j - 2 >= 0 and board[x][j - 2] == hole and\
-                                        board[x][j - 1] == peg:
-                            l[x][j - 1] = l[x][j] = hole, hole
-                            l[x][j - 2] = peg
-                            lst.append(l)
-                        elif j + 2 < len(board[x]) and board[x][j + 2] == hole\
-                                and board[x][j + 1] == peg:
-                            l[x][j + 1] = l[x][j] = hole
-                            l[x][j + 2] = peg
-                            lst.append(l)
-            return lst
-
-        def jump_up_down(board, marker_set):
-            """
-            Return a list of list of str which contains a modified configuration
-
-            @type board: list of list of str
-            @type marker_set: set[str]
-            @rtype: list of list of list of str
-
-            #>>> grid = [["*", "*", "*", "*", "*"],\
-            #        ["*", "*", "*", "*", "*"],\
-            #        ["*", "*", "*", "*", "*"],\
-            #        ["*", "*", ".", "*", "*"],\
-            #        ["*", "*", "*", "*", "*"]]
-            #>>> jump_up_down(grid)
-            """
-            peg, empty, hole = "*", "#", "."
-            lst = []
-            for x in range(len(board)):
-                for j in range(len(board[x])):
-                    l = deepcopy(board)
-                    if board[x][j] == peg:
-                        if x-2 >= 0 and board[x-1][j] == peg and board[x-2][j]\
-                                == hole:
-                            l[x-1][j] = l[x][j] = hole
-                            l[x-2][j] = peg
-                            lst.append(l)
-                        elif x+2 < len(board) and board[x+1][j] == peg and \
-                                        board[x+2][j] == hole:
-                            l[x+1][j] = l[x][j] = hole
-                            l[x+2][j] = peg
-                            lst.append(l)
-            return lst
-
-        marker, marker_set, extension = self._marker, self._marker_set, []
-        extension = (jump_right_left(marker, marker_set) +
-                     jump_up_down(marker, marker_set))
-        r= []
-        for i in extension:
-            r.append(GridPegSolitairePuzzle(i, marker_set))
-        return r
-
-    # TODO
-    # override is_solved
-    # A configuration is solved when there is exactly one "*" left
+        pegs = self.pegs
+        # a jump needs pegs on from and over, and an empty to
+        return [self.with_pegs(pegs ^ (fo | t))
+                for (fo, t) in self.board.masks
+                if pegs & fo == fo and not pegs & t]
+
+    def fail_fast(self):
+        """
+        Return True iff GridPegSolitairePuzzle self can never be
+        reduced to a single peg.
+
+        Three tests are tried in turn: the position class must match
+        some hole, at most one peg may be stuck for good, and the pagoda
+        functions of the board must leave one of the holes left within
+        reach. Jumps never change the position class, so it only rules
+        out hopeless starts, but it narrows the holes the other tests
+        must rule out. Call track_pruning to count which test fired.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: bool
+
+        >>> p = {"*", ".", "#"}
+        >>> GridPegSolitairePuzzle([["*", "*", "*"]], p).fail_fast()
+        True
+        >>> GridPegSolitairePuzzle([["*", ".", ".", ".", "*"]], p).fail_fast()
+        True
+        >>> GridPegSolitairePuzzle([["*", "*", ".", "*"]], p).fail_fast()
+        False
+        >>> english = GridPegSolitairePuzzle([list(row) for row in [
+        ...     "##***##", "##*.*##", "*.*.*..", "..***..", "***.***",
+        ...     "##*.*##", "##***##"]], p)
+        >>> track_pruning()
+        >>> english.fail_fast(), pruning_report()["pagoda"]
+        (True, 1)
+        >>> track_pruning(False)
+        """
+        test = self._dead_end()
+        if test is not None and _prune_counts is not None:
+            _prune_counts[test] += 1
+        return test is not None
+
+    def _dead_end(self):
+        # Return the name of the first test showing self can't be
+        # solved, or None if none of them does.
+        #
+        # @type self: GridPegSolitairePuzzle
+        # @rtype: str | None
+        board, pegs = self.board, self.pegs
+        if pegs & (pegs - 1) == 0:
+            return None if pegs else "position class"
+        finals = board.final_cells(pegs)
+        if not finals:
+            return "position class"
+        stuck = board.stuck_pegs(pegs)
+        if stuck & (stuck - 1):
+            return "stuck peg"
+        elif stuck:
+            # the one peg that never moves has to be the last one
+            finals &= stuck
+            if not finals:
+                return "stuck peg"
+        if not board.pagoda_finals(pegs, finals):
+            return "pagoda"
+        return None
+
     def is_solved(self):
         """
         Return True iff Puzzle self is solved.
 
+        A configuration is solved when there is exactly one "*" left.
+
         @type self: GridPegSolitairePuzzle
         @rtype: bool
 
@@ -230,12 +858,46 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> p.is_solved()
         True
         """
-        marker, count = self._marker, 0
-        for i in marker:
-            count += i.count("*")
-            if count > 1:
-                return False
-        return count == 1
+        # a non-zero power of two has exactly one bit set
+        return self.pegs != 0 and self.pegs & (self.pegs - 1) == 0
+
+
+# Nodes pruned by each fail_fast test, or None when not counting.
+_prune_counts = None
+
+
+def track_pruning(enabled=True):
+    """
+    Start counting, from zero, how many positions each test in
+    GridPegSolitairePuzzle.fail_fast prunes, or stop if not enabled.
+
+    @type enabled: bool
+    @rtype: None
+    """
+    global _prune_counts
+    if enabled:
+        _prune_counts = {"position class": 0, "stuck peg": 0, "pagoda": 0}
+    else:
+        _prune_counts = None
+
+
+def pruning_report():
+    """
+    Return how many positions each fail_fast test has pruned since
+    track_pruning was last called, or None if not counting.
+
+    @rtype: dict[str, int] | None
+
+    >>> track_pruning()
+    >>> GridPegSolitairePuzzle([["*", "*", "*"]], {"*", "."}).fail_fast()
+    True
+    >>> pruning_report()["position class"]
+    1
+    >>> track_pruning(False)
+    >>> pruning_report() is None
+    True
+    """
+    return None if _prune_counts is None else dict(_prune_counts)
 
 
 if __name__ == "__main__":
@@ -250,9 +912,24 @@ if __name__ == "__main__":
             ["*", "*", "*", "*", "*"]]
     gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
     import time
+    track_pruning()
 
     start = time.time()
     solution = depth_first_solve(gpsp)
     end = time.time()
     print("Solved 5x5 peg solitaire in {} seconds.".format(end - start))
     print("Using depth-first: \n{}".format(solution))
+
+    english = [list(row) for row in ["##***##",
+                                     "##***##",
+                                     "*******",
+                                     "***.***",
+                                     "*******",
+                                     "##***##",
+                                     "##***##"]]
+    start = time.time()
+    solution = depth_first_solve(GridPegSolitairePuzzle(english,
+                                                        {"*", ".", "#"}))
+    end = time.time()
+    print("Solved English 33-hole board in {} seconds.".format(end - start))
+    print("Positions pruned by fail_fast: {}".format(pruning_report()))
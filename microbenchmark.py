@@ -0,0 +1,188 @@
+"""
+Microbenchmarks of the puzzle methods the solvers call on every node
+
+    python microbenchmark.py [--output results.json] [--seconds 0.2]
+
+measures each method in CASES on a representative state, and reports
+as JSON its calls per second, the most bytes each call holds at once
+while it runs, and the memory blocks and bytes left allocated in what
+it returns.
+"""
+from benchmark import mn_case, peg_case
+from sudoku_puzzle import SudokuPuzzle
+from word_ladder_puzzle import WordDictionary, WordLadderPuzzle
+from statistics import median
+from timeit import Timer
+import json
+import os
+import random
+import sys
+import tracemalloc
+
+
+def sudoku_state():
+    """
+    Return the 9x9 SudokuPuzzle the solvers' doctests start from, with
+    56 of its cells still to fill.
+
+    @rtype: SudokuPuzzle
+    """
+    return SudokuPuzzle(
+        9, list("***7*8*1***7*9***69*31*****35*8**6*1*********"
+                "1*6**9*48*****12*78***7*4***6*3*2***"),
+        set("123456789"))
+
+
+def mn_state():
+    """
+    Return a 3x3 MNPuzzle 15 moves from its goal.
+
+    @rtype: MNPuzzle
+    """
+    return mn_case(3, 3, 15, random.Random(0))
+
+
+def peg_state():
+    """
+    Return the English GridPegSolitairePuzzle, with all its jumps open.
+
+    @rtype: GridPegSolitairePuzzle
+    """
+    return peg_case(["##***##", "##***##", "*******", "***.***", "*******",
+                     "##***##", "##***##"])
+
+
+def ladder_state(words_path="words.txt"):
+    """
+    Return a WordLadderPuzzle from "cast" to "list" over the words in the
+    file at words_path.
+
+    @type words_path: str
+    @rtype: WordLadderPuzzle
+    """
+    with open(words_path, "r") as f:
+        return WordLadderPuzzle("cast", "list",
+                                WordDictionary.intern(f.read().split()))
+
+
+# (name, function returning a state, method name) of each benchmark
+CASES = [("SudokuPuzzle.extensions", sudoku_state, "extensions"),
+         ("SudokuPuzzle.fail_fast", sudoku_state, "fail_fast"),
+         ("SudokuPuzzle.is_solved", sudoku_state, "is_solved"),
+         ("MNPuzzle.extensions", mn_state, "extensions"),
+         ("GridPegSolitairePuzzle.extensions", peg_state, "extensions"),
+         ("WordLadderPuzzle.extensions", ladder_state, "extensions")]
+
+
+def measure(method, seconds=0.2, repeat=5, calls=200):
+    """
+    Return the calls per second of method, a function of no arguments,
+    in the best of repeat runs of at least seconds each, and the median
+    over calls calls of the most bytes held at once during a call and
+    of the memory blocks and bytes held by what it returns. Each result
+    is dropped before the next call, and what the measuring itself
+    allocates is taken off; the median leaves out calls during which
+    something else was freed.
+
+    @type method: () -> object
+    @type seconds: float
+    @type repeat: int
+    @type calls: int
+    @rtype: dict[str, float]
+
+    >>> result = measure(lambda: [None] * 10, seconds=0.01, repeat=1)
+    >>> result["ops_per_second"] > 0
+    True
+    >>> result["blocks_per_call"], result["bytes_per_call"] >= 10 * 8
+    (1.0, True)
+    >>> result = measure(lambda: bool([None] * 1000), seconds=0.01, repeat=1)
+    >>> result["bytes_per_call"], result["peak_bytes_per_call"] >= 1000 * 8
+    (0.0, True)
+    """
+    timer = Timer(method)
+    number = 1
+    while timer.timeit(number) < seconds / 10:
+        number *= 10
+    number = max(1, int(number * seconds / max(timer.timeit(number), 1e-9)))
+    best = min(timer.repeat(repeat, number)) / number
+    method()
+    tracemalloc.start()
+    try:
+        # the first snapshots fill caches of their own
+        _allocations(method, 1)
+        used = _allocations(method, calls)
+        idle = _allocations(lambda: None, calls)
+    finally:
+        tracemalloc.stop()
+    (peak, blocks, size) = [max(0.0, float(median(u) - median(i)))
+                            for (u, i) in zip(used, idle)]
+    return {"ops_per_second": 1 / best, "seconds_per_call": best,
+            "peak_bytes_per_call": peak, "blocks_per_call": blocks,
+            "bytes_per_call": size}
+
+
+def _allocations(method, calls):
+    # Return, for each of calls calls of method, the most bytes
+    # allocated at once during the call, and the blocks and bytes
+    # still allocated when it returns, dropping each result before the
+    # next call. tracemalloc must be tracing.
+    #
+    # @type method: () -> object
+    # @type calls: int
+    # @rtype: (list[int], list[int], list[int])
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    (peaks, blocks, sizes) = ([], [], [])
+    for _ in range(calls):
+        (current, _) = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        method()
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    for _ in range(calls):
+        before = tracemalloc.take_snapshot().filter_traces(ignore)
+        result = method()
+        grown = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(
+            before, "filename")
+        del result
+        blocks.append(sum([stat.count_diff for stat in grown]))
+        sizes.append(sum([stat.size_diff for stat in grown]))
+    return peaks, blocks, sizes
+
+
+def run_microbenchmarks(cases=None, seconds=0.2, repeat=5):
+    """
+    Return the measurements of each of cases, by default CASES, by name.
+    Cases that need words.txt are left out if it is missing.
+
+    @type cases: list[(str, () -> Puzzle, str)] | None
+    @type seconds: float
+    @type repeat: int
+    @rtype: dict[str, dict[str, float]]
+    """
+    results = {}
+    for (name, state, method_name) in CASES if cases is None else cases:
+        if state is ladder_state and not os.path.exists("words.txt"):
+            continue
+        results[name] = measure(getattr(state(), method_name), seconds,
+                                repeat)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the methods the solvers call on each node.")
+    parser.add_argument("--output", help="JSON file to write, not stdout")
+    parser.add_argument("--seconds", type=float, default=0.2,
+                        help="least time of each timed run")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="timed runs per method, keeping the best")
+    arguments = parser.parse_args()
+    results = run_microbenchmarks(seconds=arguments.seconds,
+                                  repeat=arguments.repeat)
+    if arguments.output is None:
+        json.dump(results, sys.stdout, indent=1)
+        print()
+    else:
+        with open(arguments.output, "w") as f:
+            json.dump(results, f, indent=1)
@@ -5,7 +5,10 @@ class MNPuzzle(Puzzle):
     """
     An nxm puzzle, like the 15-puzzle, which may be solved, unsolved,
     or even unsolvable.
+
+    Its grids are immutable tuples, hashed once when first needed.
     """
+    __slots__ = ("n", "m", "from_grid", "to_grid", "_hash")
 
     def __init__(self, from_grid, to_grid):
         """
@@ -24,6 +27,7 @@ class MNPuzzle(Puzzle):
         assert all([len(r) == len(to_grid[0]) for r in to_grid])
         self.n, self.m = len(from_grid), len(from_grid[0])
         self.from_grid, self.to_grid = from_grid, to_grid
+        self._hash = None
 
     def __eq__(self, other):
         """
@@ -41,10 +45,26 @@ class MNPuzzle(Puzzle):
         >>> mn1 == mn3
         False
         """
-        return (type(self) == type(other) and
-                self.n == other.n and self.m == other.m and
-                self.from_grid == other.from_grid and
-                self.to_grid == other.to_grid)
+        return self is other or (
+            type(self) == type(other) and hash(self) == hash(other) and
+            self.from_grid == other.from_grid and
+            (self.to_grid is other.to_grid or self.to_grid == other.to_grid))
+
+    def __hash__(self):
+        """
+        Return a hash of MNPuzzle self, consistent with __eq__.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> goal = (("1", "2"), ("3", "*"))
+        >>> len({MNPuzzle((("1", "2"), ("*", "3")), goal),
+        ...      MNPuzzle((("1", "2"), ("*", "3")), goal)})
+        1
+        """
+        if self._hash is None:
+            self._hash = hash(self.from_grid)
+        return self._hash
 
     def __str__(self):
         """
@@ -75,6 +95,97 @@ class MNPuzzle(Puzzle):
                 "{}".format(align_column(self.from_grid),
                             align_column(self.to_grid)))
 
+    def canonical_key(self):
+        """
+        Return the same key for MNPuzzle self and every rotation or
+        reflection of it that keeps the goal's empty space in place,
+        with its tiles relabelled so the goal maps onto itself.
+
+        @type self: MNPuzzle
+        @rtype: tuple
+
+        >>> goal = (("*", "1"), ("2", "3"))
+        >>> mn1 = MNPuzzle((("1", "*"), ("2", "3")), goal)
+        >>> mn2 = MNPuzzle((("2", "1"), ("*", "3")), goal)
+        >>> mn1.canonical_key() == mn2.canonical_key()
+        True
+        >>> mn3 = MNPuzzle((("1", "2"), ("*", "3")), goal)
+        >>> mn1.canonical_key() == mn3.canonical_key()
+        False
+        """
+        if self.to_grid not in _SYMMETRIES:
+            _SYMMETRIES[self.to_grid] = _goal_symmetries(self.to_grid)
+        tiles = [x for row in self.from_grid for x in row]
+        best = tuple(tiles)
+        for (perm, relabel) in _SYMMETRIES[self.to_grid]:
+            image = [None] * len(tiles)
+            for i in range(len(tiles)):
+                image[perm[i]] = relabel.get(tiles[i], tiles[i])
+            if tuple(image) < best:
+                best = tuple(image)
+        return self.to_grid, best
+
+    def context(self):
+        """
+        Return the goal of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: tuple[tuple[str]]
+        """
+        return self.to_grid
+
+    def to_bytes(self):
+        """
+        Return the current grid of MNPuzzle self as bytes, one for each
+        cell: the place of its tile in the goal, row by row.
+
+        @type self: MNPuzzle
+        @rtype: bytes
+
+        >>> mn = MNPuzzle((("2", "*"), ("1", "3")), (("1", "2"), ("3", "*")))
+        >>> mn.to_bytes()
+        b'\\x01\\x03\\x00\\x02'
+        >>> MNPuzzle.from_bytes(mn.context(), mn.to_bytes()) == mn
+        True
+        """
+        tiles = [tile for row in self.to_grid for tile in row]
+        return bytes([tiles.index(tile)
+                      for row in self.from_grid for tile in row])
+
+    @staticmethod
+    def from_bytes(context, data):
+        """
+        Return the MNPuzzle with goal context whose current grid
+        to_bytes wrote as data.
+
+        @type context: tuple[tuple[str]]
+        @type data: bytes
+        @rtype: MNPuzzle
+        """
+        tiles = [tile for row in context for tile in row]
+        m = len(context[0])
+        return MNPuzzle(tuple([tuple([tiles[i] for i in data[r:r + m]])
+                               for r in range(0, len(data), m)]), context)
+
+    def describe_move(self, extension):
+        """
+        Return the tile that moves from MNPuzzle self to extension, and
+        the way it moves.
+
+        @type self: MNPuzzle
+        @type extension: MNPuzzle
+        @rtype: str
+
+        >>> mn = MNPuzzle((("1", "2"), ("*", "3")), (("1", "2"), ("3", "*")))
+        >>> [mn.describe_move(e) for e in mn.extensions()]
+        ['3 left', '1 down']
+        """
+        (r, c) = _blank(self.from_grid)
+        (r2, c2) = _blank(extension.from_grid)
+        way = {(-1, 0): "up", (1, 0): "down", (0, -1): "left",
+               (0, 1): "right"}[(r - r2, c - c2)]
+        return "{} {}".format(self.from_grid[r2][c2], way)
+
     def extensions(self):
         """
         Return list of extensions of MNPuzzle self.
@@ -254,6 +365,55 @@ class MNPuzzle(Puzzle):
         """
         return self.from_grid == self.to_grid
 
+
+def _blank(grid):
+    # Return the (row, column) of the empty space of grid.
+    #
+    # @type grid: tuple[tuple[str]]
+    # @rtype: (int, int)
+    for (r, row) in enumerate(grid):
+        if "*" in row:
+            return r, row.index("*")
+
+
+# symmetries of each goal grid seen so far, for canonical_key
+_SYMMETRIES = {}
+
+
+def _goal_symmetries(goal):
+    # Return (perm, relabel) pairs for the rotations and reflections of
+    # goal, other than the identity, that keep its empty space in place.
+    # perm maps each flat position to its image, and relabel maps each
+    # tile to the one the goal has where that tile's goal position
+    # lands, so applying both to the goal gives back the goal. There are
+    # none if the goal repeats a tile.
+    #
+    # @type goal: tuple[tuple[str]]
+    # @rtype: list[(list[int], dict[str, str])]
+    n, m = len(goal), len(goal[0])
+    tiles = [x for row in goal for x in row]
+    if len(set(tiles)) != len(tiles):
+        return []
+    transforms = [lambda i, j: (n - 1 - i, m - 1 - j),
+                  lambda i, j: (n - 1 - i, j),
+                  lambda i, j: (i, m - 1 - j)]
+    if n == m:
+        transforms += [lambda i, j: (j, i),
+                       lambda i, j: (m - 1 - j, n - 1 - i),
+                       lambda i, j: (j, n - 1 - i),
+                       lambda i, j: (m - 1 - j, i)]
+    result = []
+    for transform in transforms:
+        perm = []
+        for k in range(n * m):
+            i, j = transform(k // m, k % m)
+            perm.append(i * m + j)
+        if tiles[perm[tiles.index("*")]] == "*":
+            relabel = {tiles[k]: tiles[perm[k]] for k in range(n * m)}
+            result.append((perm, relabel))
+    return result
+
+
 # def check_empty_space(grid):
 #     """
 #     Return the place of the empty space.
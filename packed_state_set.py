@@ -0,0 +1,193 @@
+"""
+A compact set of puzzle states packed into integers
+"""
+from array import array
+
+# multiplier for Fibonacci hashing of 64-bit keys
+_GOLDEN_64 = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+
+class PackedStateSet:
+    """
+    An open-addressing hash set of states packed into positive integers
+    below 2 ** 64, each with a count, such as the number of ways it was
+    reached.
+
+    Keys and counts live in two arrays of unsigned 64-bit ints, so each
+    state costs about 16 bytes per slot rather than a Python object.
+    Adding a count that would pass 2 ** 64 - 1 raises OverflowError.
+    """
+
+    def __init__(self, capacity=16):
+        """
+        Create a new empty PackedStateSet self with room for at least
+        capacity states before it grows.
+
+        @type self: PackedStateSet
+        @type capacity: int
+        @rtype: None
+        """
+        bits = 4
+        while (1 << bits) * 3 < capacity * 4:
+            bits += 1
+        self._bits, self._size = bits, 0
+        # 0 marks an empty slot, which is why keys must be positive
+        self._keys = array("Q", bytes(8 << bits))
+        self._counts = array("Q", bytes(8 << bits))
+
+    def __len__(self):
+        """
+        Return the number of states in PackedStateSet self.
+
+        @type self: PackedStateSet
+        @rtype: int
+        """
+        return self._size
+
+    def __contains__(self, key):
+        """
+        Return whether key is in PackedStateSet self.
+
+        @type self: PackedStateSet
+        @type key: int
+        @rtype: bool
+
+        >>> s = PackedStateSet()
+        >>> s.add(5)
+        >>> 5 in s, 6 in s
+        (True, False)
+        """
+        return self._keys[self._slot(key)] == key
+
+    def __iter__(self):
+        """
+        Return an iterator over the states in PackedStateSet self.
+
+        @type self: PackedStateSet
+        @rtype: iterator[int]
+        """
+        return (key for key in self._keys if key)
+
+    def add(self, key, count=0):
+        """
+        Add key to PackedStateSet self if it is not there yet, and add
+        count to its count.
+
+        @type self: PackedStateSet
+        @type key: int
+        @type count: int
+        @rtype: None
+
+        >>> s = PackedStateSet(1)
+        >>> for key in range(1, 100):
+        ...     s.add(key, key)
+        >>> s.add(7, 1)
+        >>> len(s), s.count(7), s.count(100)
+        (99, 8, 0)
+        """
+        assert 0 < key <= _MASK_64
+        i = self._slot(key)
+        if not self._keys[i]:
+            if (self._size + 1) * 4 > len(self._keys) * 3:
+                self._grow()
+                i = self._slot(key)
+            self._keys[i] = key
+            self._size += 1
+        self._counts[i] += count
+
+    def count(self, key):
+        """
+        Return the count of key in PackedStateSet self, or 0 if key is
+        not there.
+
+        @type self: PackedStateSet
+        @type key: int
+        @rtype: int
+        """
+        i = self._slot(key)
+        return self._counts[i] if self._keys[i] == key else 0
+
+    def items(self):
+        """
+        Return an iterator over the (state, count) pairs in
+        PackedStateSet self.
+
+        @type self: PackedStateSet
+        @rtype: iterator[(int, int)]
+
+        >>> s = PackedStateSet()
+        >>> s.add(3, 2)
+        >>> list(s.items())
+        [(3, 2)]
+        """
+        keys, counts = self._keys, self._counts
+        return ((keys[i], counts[i]) for i in range(len(keys)) if keys[i])
+
+    def split(self, parts):
+        """
+        Return the states of PackedStateSet self in parts arrays of
+        unsigned 64-bit ints, each state followed by its count. The i-th
+        array holds the states whose hashes fall in the i-th of parts
+        equal ranges, so the arrays are about the same length.
+
+        The hash is not the one self places states by: that one is
+        linear, so states found by flipping the same bits of those in a
+        range of it would crowd into a few ranges of it, and into a few
+        runs of slots of the sets they are added to.
+
+        @type self: PackedStateSet
+        @type parts: int
+        @rtype: list[array]
+
+        >>> s = PackedStateSet()
+        >>> for key in range(1, 101):
+        ...     s.add(key, 2 * key)
+        >>> shards = s.split(4)
+        >>> keys = sorted([key for shard in shards for key in shard[::2]])
+        >>> keys == list(range(1, 101))
+        True
+        >>> all(count == 2 * key for shard in shards
+        ...     for (key, count) in zip(shard[::2], shard[1::2]))
+        True
+        >>> all(15 < len(shard) // 2 < 35 for shard in shards)
+        True
+        """
+        shards = [array("Q") for _ in range(parts)]
+        for (key, count) in self.items():
+            # the finaliser of MurmurHash3
+            h = key ^ key >> 33
+            h = h * 0xFF51AFD7ED558CCD & _MASK_64
+            h ^= h >> 33
+            h = h * 0xC4CEB9FE1A85EC53 & _MASK_64
+            shard = shards[(h ^ h >> 33) * parts >> 64]
+            shard.append(key)
+            shard.append(count)
+        return shards
+
+    def _slot(self, key):
+        # Return the slot holding key, or the empty slot where it
+        # belongs, probing linearly from its hash.
+        #
+        # @type self: PackedStateSet
+        # @type key: int
+        # @rtype: int
+        keys, mask = self._keys, len(self._keys) - 1
+        i = (key * _GOLDEN_64 & _MASK_64) >> (64 - self._bits)
+        while keys[i] and keys[i] != key:
+            i = (i + 1) & mask
+        return i
+
+    def _grow(self):
+        # Double the number of slots of self, re-inserting every state.
+        #
+        # @type self: PackedStateSet
+        # @rtype: None
+        keys, counts = self._keys, self._counts
+        self._bits += 1
+        self._keys = array("Q", bytes(8 << self._bits))
+        self._counts = array("Q", bytes(8 << self._bits))
+        for i in range(len(keys)):
+            if keys[i]:
+                j = self._slot(keys[i])
+                self._keys[j], self._counts[j] = keys[i], counts[i]
@@ -0,0 +1,260 @@
+"""
+Some functions for searching peg solitaire boards as a whole
+"""
+from packed_state_set import PackedStateSet
+from puzzle_tools import Meter, PuzzleNode
+
+
+def enumerate_positions(puzzle, budget=None):
+    """
+    Return, for each number of pegs from that of GridPegSolitairePuzzle
+    puzzle down, the number of positions reachable from puzzle with that
+    many pegs and the number of jump sequences reaching them.
+
+    Every jump removes a peg, so the positions are walked one level at
+    a time, holding just two levels as packed states with their path
+    counts. The path count on the one-peg level is the number of
+    solutions. Boards may have at most 64 holes. Each position whose
+    jumps are tried counts as a node expanded against budget, if it is
+    given; raise BudgetExceeded if it runs out. To share the levels out
+    among other processes or machines, use
+    distributed_search.PositionCoordinator.
+
+    @type puzzle: GridPegSolitairePuzzle
+    @type budget: SearchBudget | None
+    @rtype: list[(int, int, int)]
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", ".", "*", "*", "*", "*"]]
+    >>> for level in enumerate_positions(GridPegSolitairePuzzle(grid,\
+    {"*", "."})):
+    ...     print(level)
+    (5, 1, 1)
+    (4, 1, 1)
+    (3, 2, 2)
+    (2, 1, 2)
+    (1, 2, 4)
+    >>> enumerate_positions(GridPegSolitairePuzzle([[".", ".", "."]],
+    ...                                            {"*", "."}))
+    [(0, 1, 1)]
+    >>> from puzzle_tools import SearchBudget
+    >>> enumerate_positions(GridPegSolitairePuzzle(grid, {"*", "."}),
+    ...                     SearchBudget(nodes=3))
+    Traceback (most recent call last):
+    ...
+    puzzle_tools.BudgetExceeded: nodes budget exceeded after 3 nodes
+    """
+    board = puzzle.board
+    assert len(board.hole_cells) <= 64
+    if puzzle.pegs == 0:
+        # the empty board is the only position, and packs to 0, which
+        # a PackedStateSet can't hold
+        return [(0, 1, 1)]
+    level, meter = PackedStateSet(), Meter(budget)
+    level.add(board.pack(puzzle.pegs), 1)
+    pegs, result = bin(puzzle.pegs).count("1"), []
+    while len(level) > 0:
+        result.append((pegs, len(level),
+                       sum([paths for (_, paths) in level.items()])))
+        next_level = PackedStateSet(len(level) * 2)
+        depth = len(result) - 1
+        for (state, paths) in level.items():
+            for (fo, t) in board.packed_masks:
+                if state & fo == fo and not state & t:
+                    next_level.add(state ^ (fo | t), paths)
+            # metering costs a tenth of the time, so only when it counts;
+            # there are no stats to give the number of children to
+            if budget is not None:
+                meter.spend(0, len(level) + len(next_level), depth)
+                meter.check()
+        level, pegs = next_level, pegs - 1
+    return result
+
+
+def solve_to_hole(puzzle, row, col, max_states=200000, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode holding a
+    single peg at (row, col), with each child PuzzleNode containing an
+    extension of the puzzle in its parent. Return None if this is not
+    possible.
+
+    Jumps are undone from the goal, one level of pegs at a time, until
+    a level would hold more than max_states positions or reaches the
+    pegs of puzzle. A depth-first search forward from puzzle then only
+    has to reach a position on that last level. Each position undone
+    or searched from counts as a node expanded against budget, if it is
+    given; raise BudgetExceeded if it runs out.
+
+    @type puzzle: GridPegSolitairePuzzle
+    @type row: int
+    @type col: int
+    @type max_states: int
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | None
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", ".", "*", "*", "*", "*"]]
+    >>> s = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> solve_to_hole(s, 0, 0) is None
+    True
+    >>> node = solve_to_hole(s, 0, 1, 1)
+    >>> while node.children:
+    ...     node = node.children[0]
+    >>> print(node.puzzle)
+    .*....
+    >>> from puzzle_tools import SearchBudget
+    >>> solve_to_hole(s, 0, 1, 1, SearchBudget(nodes=2))
+    Traceback (most recent call last):
+    ...
+    puzzle_tools.BudgetExceeded: nodes budget exceeded after 2 nodes
+    """
+    board = puzzle.board
+    cell = board.index(row, col)
+    assert board.holes >> cell & 1 and len(board.hole_cells) <= 64
+    if board.position_class(puzzle.pegs) != board.position_class(1 << cell):
+        return None
+    start, count = board.pack(puzzle.pegs), bin(puzzle.pegs).count("1")
+    # levels[k - 1] holds the positions with k pegs that can finish
+    levels = [PackedStateSet()]
+    levels[0].add(board.pack(1 << cell))
+    meter = Meter(budget)
+    while len(levels) < count and len(levels[-1]) <= max_states:
+        levels.append(_undo_jumps(levels[-1], board.packed_masks, meter))
+    states = _search_forward(start, count, levels, board.packed_masks,
+                             meter)
+    if states is None:
+        return None
+    # Finish off through the levels undone from the goal.
+    for k in range(count - len(states), 0, -1):
+        state = states[-1]
+        for (fo, t) in board.packed_masks:
+            if (state & fo == fo and not state & t and
+                    state ^ (fo | t) in levels[k - 1]):
+                states.append(state ^ (fo | t))
+                break
+    node = PuzzleNode(puzzle)
+    for state in states[1:]:
+        child = PuzzleNode(puzzle.with_pegs(board.unpack(state)),
+                           parent=node)
+        node.children = [child]
+        node = child
+    while node.parent is not None:
+        node = node.parent
+    return node
+
+
+def can_finish_at(puzzle, row, col, max_states=200000):
+    """
+    Return whether GridPegSolitairePuzzle puzzle can be reduced to a
+    single peg at (row, col).
+
+    @type puzzle: GridPegSolitairePuzzle
+    @type row: int
+    @type col: int
+    @type max_states: int
+    @rtype: bool
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", ".", "*", "*", "*", "*"]]
+    >>> s = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> [can_finish_at(s, 0, c) for c in range(6)]
+    [False, True, False, False, True, False]
+    """
+    return solve_to_hole(puzzle, row, col, max_states) is not None
+
+
+def _undo_jumps(level, masks, meter):
+    # Return the positions that reach a position in level by one jump,
+    # spending a node in meter for each position of level.
+    #
+    # @type level: PackedStateSet
+    # @type masks: tuple[(int, int)]
+    # @type meter: Meter
+    # @rtype: PackedStateSet
+    result = PackedStateSet(len(level) * 2)
+    for state in level:
+        children = 0
+        for (fo, t) in masks:
+            # the peg on to goes back to from, and over is refilled
+            if state & t and not state & fo:
+                result.add(state ^ (fo | t))
+                children += 1
+        meter.spend(children, len(level) + len(result), 0)
+        meter.check()
+    return result
+
+
+def _search_forward(start, count, levels, masks, meter):
+    # Return the packed positions along a run of jumps from start, which
+    # has count pegs, to a position in the last of levels, or None if
+    # there is no such run, spending a node in meter for each position
+    # searched from.
+    #
+    # @type start: int
+    # @type count: int
+    # @type levels: list[PackedStateSet]
+    # @type masks: tuple[(int, int)]
+    # @type meter: Meter
+    # @rtype: list[int] | None
+    goal = levels[-1]
+    if count == len(levels):
+        return [start] if start in goal else None
+    # positions seen above the goal level; none of them led to it
+    seen = PackedStateSet()
+    seen.add(start)
+    path, stack = [start], [iter(masks)]
+    meter.spend(0, 1, 0)
+    meter.check()
+    while stack:
+        state = path[-1]
+        for (fo, t) in stack[-1]:
+            if state & fo == fo and not state & t:
+                child = state ^ (fo | t)
+                if count - len(path) == len(levels):
+                    if child in goal:
+                        return path + [child]
+                elif child not in seen:
+                    seen.add(child)
+                    path.append(child)
+                    stack.append(iter(masks))
+                    meter.spend(0, len(stack), len(path) - 1)
+                    meter.check()
+                    break
+        else:
+            path.pop()
+            stack.pop()
+    return None
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    from time import time
+
+    grid = [["*", "*", "*", "*", "*"],
+            ["*", "*", "*", "*", "*"],
+            ["*", "*", ".", "*", "*"],
+            ["*", "*", "*", "*", "*"],
+            ["*", "*", "*", "*", "*"]]
+    start = time()
+    levels = enumerate_positions(GridPegSolitairePuzzle(grid, {"*", "."}))
+    end = time()
+    print("pegs  positions  paths")
+    for (pegs, positions, paths) in levels:
+        print("{:>4} {:>10} {:>6}".format(pegs, positions, paths))
+    print("Enumerated 5x5 peg solitaire in {} seconds.".format(end - start))
+
+    english = [list(row) for row in ["##***##",
+                                     "##***##",
+                                     "*******",
+                                     "***.***",
+                                     "*******",
+                                     "##***##",
+                                     "##***##"]]
+    start = time()
+    solution = solve_to_hole(GridPegSolitairePuzzle(english, {"*", ".", "#"}),
+                             3, 3)
+    end = time()
+    print("Solved English 33-hole board to the centre in {} seconds."
+          .format(end - start))
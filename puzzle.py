@@ -3,6 +3,7 @@ class Puzzle:
     Snapshot of a full-information puzzle, which may be solved, unsolved,
     or even unsolvable.
     """
+    __slots__ = ()
 
     def fail_fast(self):
         """
@@ -39,3 +40,88 @@ class Puzzle:
         @rtype: list[Puzzle]
         """
         raise NotImplementedError
+
+    def canonical_key(self):
+        """
+        Return a key shared by Puzzle self and every puzzle that is
+        equivalent to it under a symmetry that keeps the goal.
+
+        Solvers use this key to skip puzzles they have already seen.
+        Override this in a subclass whose puzzles have such symmetries;
+        by default the key is the string representation of self.
+
+        @type self: Puzzle
+        @rtype: object
+        """
+        return self.__str__()
+
+    def fingerprint(self):
+        """
+        Return a string that identifies Puzzle self, the same in every
+        run, so that its solutions can be stored and looked up later.
+
+        By default this is the class name and the string representation
+        of self. Override this in a subclass whose string representation
+        leaves out part of what the puzzle is.
+
+        @type self: Puzzle
+        @rtype: str
+        """
+        return "{}\n{}".format(type(self).__name__, self)
+
+    def context(self):
+        """
+        Return what Puzzle self shares with the puzzles it extends to,
+        such as its goal or its dictionary, as a hashable object that
+        to_bytes leaves out.
+
+        This is an abstract method that must be implemented
+        in a subclass that can be written as bytes.
+
+        @type self: Puzzle
+        @rtype: object
+        """
+        raise NotImplementedError
+
+    def to_bytes(self):
+        """
+        Return the state of Puzzle self, without its context, as bytes
+        that from_bytes reads back.
+
+        This is an abstract method that must be implemented
+        in a subclass that can be written as bytes.
+
+        @type self: Puzzle
+        @rtype: bytes
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def from_bytes(context, data):
+        """
+        Return the puzzle with context whose state to_bytes wrote as
+        data.
+
+        This is an abstract method that must be implemented
+        in a subclass that can be written as bytes.
+
+        @type context: object
+        @type data: bytes
+        @rtype: Puzzle
+        """
+        raise NotImplementedError
+
+    def describe_move(self, extension):
+        """
+        Return a short description of the move from Puzzle self to
+        extension, one of its extensions, or None to show extension in
+        full instead.
+
+        Override this in a subclass whose moves can be told more
+        briefly than its puzzles.
+
+        @type self: Puzzle
+        @type extension: Puzzle
+        @rtype: str | None
+        """
+        return None
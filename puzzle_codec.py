@@ -0,0 +1,293 @@
+"""
+Compact binary encodings of puzzles, for sending between processes and
+storing
+
+A puzzle is written as a format version, the number its class and
+context have in a ContextRegistry, and the bytes of its to_bytes, so
+what many puzzles share, such as a word ladder's dictionary or an MN
+puzzle's goal, is kept once in the registry rather than in every
+encoding. Both ends must use the same registry: pickle it once, for
+example to the initializer of a process pool, and then send encodings.
+"""
+from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+from mn_puzzle import MNPuzzle
+from sudoku_puzzle import SudokuPuzzle
+from word_ladder_puzzle import WordLadderPuzzle
+
+# version of the encodings written by encode and encode_batch
+FORMAT_VERSION = 1
+
+
+class ContextRegistry:
+    """
+    Numbers the pairs of a Puzzle subclass and a context of its puzzles,
+    in the order they are first seen.
+    """
+
+    def __init__(self):
+        """
+        Create a new, empty ContextRegistry self.
+
+        @type self: ContextRegistry
+        @rtype: None
+        """
+        # (class, context) of each number
+        self._entries = []
+        self._numbers = {}
+
+    def __len__(self):
+        """
+        Return the number of contexts in ContextRegistry self.
+
+        @type self: ContextRegistry
+        @rtype: int
+        """
+        return len(self._entries)
+
+    def __getstate__(self):
+        """
+        Return what to pickle of ContextRegistry self.
+
+        @type self: ContextRegistry
+        @rtype: list[(type, object)]
+        """
+        return self._entries
+
+    def __setstate__(self, entries):
+        """
+        Make ContextRegistry self hold entries, as returned by
+        __getstate__.
+
+        @type self: ContextRegistry
+        @type entries: list[(type, object)]
+        @rtype: None
+        """
+        self._entries = entries
+        self._numbers = {entry: i for (i, entry) in enumerate(entries)}
+
+    def number(self, puzzle):
+        """
+        Return the number of the class and context of puzzle in
+        ContextRegistry self, adding them if they are new.
+
+        @type self: ContextRegistry
+        @type puzzle: Puzzle
+        @rtype: int
+        """
+        entry = (type(puzzle), puzzle.context())
+        number = self._numbers.get(entry)
+        if number is None:
+            number = self._numbers[entry] = len(self._entries)
+            self._entries.append(entry)
+        return number
+
+    def entry(self, number):
+        """
+        Return the class and context numbered number in ContextRegistry
+        self.
+
+        Raise ValueError if there is no such number.
+
+        @type self: ContextRegistry
+        @type number: int
+        @rtype: (type, object)
+        """
+        if not 0 <= number < len(self._entries):
+            raise ValueError("unknown context {}".format(number))
+        return self._entries[number]
+
+
+def encode(puzzle, registry):
+    """
+    Return puzzle as bytes, with its context numbered in registry.
+
+    @type puzzle: Puzzle
+    @type registry: ContextRegistry
+    @rtype: bytes
+
+    >>> import pickle
+    >>> registry = ContextRegistry()
+    >>> s = SudokuPuzzle(9, list("***7*8*1***7*9***69*31*****35*8**6*1*****"
+    ...                          "****1*6**9*48*****12*78***7*4***6*3*2***"),
+    ...                  set("123456789"))
+    >>> data = encode(s, registry)
+    >>> len(data), len(pickle.dumps(s)) > 250
+    (83, True)
+    >>> decode(data, registry) == s
+    True
+    >>> w = WordLadderPuzzle("cast", "list", {"cast", "cost", "list"})
+    >>> data = encode(w, registry)
+    >>> data, len(registry)
+    (b'\\x01\\x01cast', 2)
+    >>> copy = pickle.loads(pickle.dumps(registry))
+    >>> print(decode(data, copy).extensions()[0])
+    cost
+    """
+    return (write_varint(FORMAT_VERSION) +
+            write_varint(registry.number(puzzle)) + puzzle.to_bytes())
+
+
+def decode(data, registry):
+    """
+    Return the puzzle encode wrote as data with registry.
+
+    Raise ValueError if data was not written by this version of encode.
+
+    @type data: bytes
+    @type registry: ContextRegistry
+    @rtype: Puzzle
+    """
+    (version, i) = read_varint(data, 0)
+    _check(version)
+    (number, i) = read_varint(data, i)
+    (cls, context) = registry.entry(number)
+    return cls.from_bytes(context, data[i:])
+
+
+def encode_batch(puzzles, registry):
+    """
+    Return puzzles as bytes, with their contexts numbered in registry.
+    The context number is written once for each run of puzzles that
+    share it, and the length of each state only if they differ.
+
+    @type puzzles: list[Puzzle]
+    @type registry: ContextRegistry
+    @rtype: bytes
+
+    >>> registry = ContextRegistry()
+    >>> boards = [GridPegSolitairePuzzle([list("*.*")], {"*", "."}),
+    ...           GridPegSolitairePuzzle([list(".**")], {"*", "."})]
+    >>> data = encode_batch(boards, registry)
+    >>> len(data)
+    7
+    >>> [str(b) for b in decode_batch(data, registry)]
+    ['*.*', '.**']
+    >>> ws = {"cast", "cost", "most"}
+    >>> mixed = boards + [WordLadderPuzzle(w, "most", ws) for w in ws]
+    >>> sorted(str(p) for p in decode_batch(encode_batch(mixed, registry),
+    ...                                    registry))
+    ['*.*', '.**', 'cast', 'cost', 'most']
+    """
+    out = [write_varint(FORMAT_VERSION), write_varint(len(puzzles))]
+    i = 0
+    while i < len(puzzles):
+        number = registry.number(puzzles[i])
+        states = [puzzles[i].to_bytes()]
+        i += 1
+        while i < len(puzzles) and registry.number(puzzles[i]) == number:
+            states.append(puzzles[i].to_bytes())
+            i += 1
+        size = len(states[0])
+        if any(len(state) != size for state in states):
+            # 0 marks states of different sizes, each after its own size
+            out += [write_varint(number), write_varint(len(states)),
+                    write_varint(0)]
+            for state in states:
+                out += [write_varint(len(state)), state]
+        else:
+            out += [write_varint(number), write_varint(len(states)),
+                    write_varint(size + 1)] + states
+    return b"".join(out)
+
+
+def decode_batch(data, registry):
+    """
+    Return the puzzles encode_batch wrote as data with registry.
+
+    Raise ValueError if data was not written by this version of
+    encode_batch.
+
+    @type data: bytes
+    @type registry: ContextRegistry
+    @rtype: list[Puzzle]
+    """
+    (version, i) = read_varint(data, 0)
+    _check(version)
+    (count, i) = read_varint(data, i)
+    puzzles = []
+    while len(puzzles) < count:
+        (number, i) = read_varint(data, i)
+        (cls, context) = registry.entry(number)
+        (run, i) = read_varint(data, i)
+        (size, i) = read_varint(data, i)
+        for _ in range(run):
+            if size:
+                end = i + size - 1
+            else:
+                (state_size, i) = read_varint(data, i)
+                end = i + state_size
+            if end > len(data):
+                raise ValueError("truncated batch")
+            puzzles.append(cls.from_bytes(context, data[i:end]))
+            i = end
+    return puzzles
+
+
+def write_varint(n):
+    """
+    Return the non-negative int n as a LEB128 varint.
+
+    @type n: int
+    @rtype: bytes
+
+    >>> write_varint(300)
+    b'\\xac\\x02'
+    """
+    out = bytearray()
+    while n >= 0x80:
+        out.append(n & 0x7F | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def read_varint(data, i):
+    """
+    Return the varint in data at i and the index just after it.
+
+    Raise ValueError if data ends inside the varint.
+
+    @type data: bytes
+    @type i: int
+    @rtype: (int, int)
+
+    >>> read_varint(b"\\x00\\xac\\x02", 1)
+    (300, 3)
+    """
+    (n, shift) = (0, 0)
+    while True:
+        if i >= len(data):
+            raise ValueError("truncated varint")
+        byte = data[i]
+        n |= (byte & 0x7F) << shift
+        i += 1
+        if byte < 0x80:
+            return n, i
+        shift += 7
+
+
+def _check(version):
+    # Raise ValueError unless version is FORMAT_VERSION.
+    #
+    # @type version: int
+    # @rtype: None
+    if version != FORMAT_VERSION:
+        raise ValueError("unknown puzzle format version {}".format(version))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    import pickle
+    from time import time
+
+    registry = ContextRegistry()
+    with open("words.txt", "r") as f:
+        ws = set(f.read().split())
+    ladders = WordLadderPuzzle("cast", "list", ws).extensions()
+    start = time()
+    data = encode_batch(ladders, registry)
+    end = time()
+    print("Encoded {} word ladders in {} bytes in {} seconds; pickle takes "
+          "{} bytes.".format(len(ladders), len(data), end - start,
+                             len(pickle.dumps(ladders))))
@@ -0,0 +1,140 @@
+"""
+Some functions for reading and writing puzzles as JSON
+
+The puzzle modules are imported only when a puzzle of theirs is read or
+written, so that programs handling one type don't load the others.
+"""
+
+
+def puzzle_to_json(puzzle):
+    """
+    Return a dict of JSON values describing puzzle, from which
+    puzzle_from_json makes an equal puzzle. The words of a
+    WordLadderPuzzle are left out.
+
+    @type puzzle: Puzzle
+    @rtype: dict[str, object]
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> puzzle_to_json(MNPuzzle((("2", "*"), ("1", "3")),
+    ...                         (("1", "2"), ("3", "*"))))
+    {'type': 'mn', 'from_grid': [['2', '*'], ['1', '3']], \
+'to_grid': [['1', '2'], ['3', '*']]}
+    >>> puzzle_to_json(WordLadderPuzzle("cast", "list", {"cost"}))
+    {'type': 'word_ladder', 'from_word': 'cast', 'to_word': 'list'}
+    """
+    from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    from mn_puzzle import MNPuzzle
+    from sudoku_puzzle import SudokuPuzzle
+    from word_ladder_puzzle import WordLadderPuzzle
+    if isinstance(puzzle, SudokuPuzzle):
+        return {"type": "sudoku", "n": puzzle._n,
+                "symbols": "".join(puzzle._symbols),
+                "symbol_set": "".join(sorted(puzzle._symbol_set))}
+    elif isinstance(puzzle, MNPuzzle):
+        return {"type": "mn",
+                "from_grid": [list(row) for row in puzzle.from_grid],
+                "to_grid": [list(row) for row in puzzle.to_grid]}
+    elif isinstance(puzzle, GridPegSolitairePuzzle):
+        return {"type": "peg", "marker": str(puzzle).split("\n")}
+    elif isinstance(puzzle, WordLadderPuzzle):
+        return {"type": "word_ladder", "from_word": puzzle._from_word,
+                "to_word": puzzle._to_word}
+    raise TypeError("can't write a {} as JSON".format(type(puzzle).__name__))
+
+
+def puzzle_from_json(data, words=None):
+    """
+    Return the puzzle data, made by puzzle_to_json or by hand, describes.
+    A word ladder uses the list data["words"] if it has one, or else
+    words.
+
+    Raise ValueError if data does not describe a puzzle.
+
+    @type data: dict[str, object]
+    @type words: set[str] | WordDictionary | None
+    @rtype: Puzzle
+
+    >>> s = puzzle_from_json({"type": "sudoku", "n": 4,
+    ...                       "symbols": "12*4341221434*21"})
+    >>> s.is_solved(), len(s.extensions())
+    (False, 1)
+    >>> puzzle_from_json(puzzle_to_json(s)) == s
+    True
+    >>> print(puzzle_from_json({"type": "peg", "marker": ["**.", "#*."]}))
+    **.
+    #*.
+    >>> puzzle_from_json({"type": "chess"})
+    Traceback (most recent call last):
+    ...
+    ValueError: unknown puzzle type 'chess'
+    >>> puzzle_from_json({"type": "mn", "from_grid": [["1", "2"], ["3", "4"]],
+    ...                   "to_grid": [["1", "2"], ["3", "*"]]})
+    Traceback (most recent call last):
+    ...
+    ValueError: bad 'mn' puzzle: the grids need the same shape and tiles, \
+with one '*'
+    """
+    try:
+        kind = data["type"]
+        if kind == "sudoku":
+            from sudoku_puzzle import SudokuPuzzle
+            (n, symbols) = (data["n"], list(data["symbols"]))
+            symbol_set = data.get("symbol_set")
+            if symbol_set is None:
+                symbol_set = "123456789ABCDEFG"[:n]
+            return _checked(SudokuPuzzle, n, symbols, set(symbol_set))
+        elif kind == "mn":
+            from mn_puzzle import MNPuzzle
+            grids = [tuple([tuple(row) for row in data[name]])
+                     for name in ("from_grid", "to_grid")]
+            _check_grids(*grids)
+            return _checked(MNPuzzle, *grids)
+        elif kind == "peg":
+            from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+            return _checked(GridPegSolitairePuzzle,
+                            [list(row) for row in data["marker"]],
+                            {"*", ".", "#"})
+        elif kind == "word_ladder":
+            from word_ladder_puzzle import WordLadderPuzzle
+            if "words" in data:
+                words = set(data["words"])
+            if words is None:
+                raise ValueError("no words for the word ladder")
+            return WordLadderPuzzle(data["from_word"], data["to_word"], words)
+    except (KeyError, TypeError) as e:
+        raise ValueError("bad {!r} puzzle: {!r}".format(
+            data.get("type") if isinstance(data, dict) else None, e))
+    raise ValueError("unknown puzzle type {!r}".format(kind))
+
+
+def _check_grids(from_grid, to_grid):
+    # Raise ValueError unless from_grid and to_grid have the same shape
+    # and the same tiles, one of them the empty space "*".
+    #
+    # @type from_grid: tuple[tuple[str]]
+    # @type to_grid: tuple[tuple[str]]
+    # @rtype: None
+    tiles = sorted([tile for row in from_grid for tile in row])
+    if ([len(row) for row in from_grid] != [len(row) for row in to_grid] or
+            tiles != sorted([tile for row in to_grid for tile in row]) or
+            tiles.count("*") != 1):
+        raise ValueError("bad 'mn' puzzle: the grids need the same shape "
+                         "and tiles, with one '*'")
+
+
+def _checked(cls, *args):
+    # Return cls(*args), raising ValueError if its arguments are refused.
+    #
+    # @type cls: type
+    # @rtype: Puzzle
+    try:
+        return cls(*args)
+    except AssertionError:
+        raise ValueError("bad {} puzzle".format(cls.__name__))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
@@ -3,22 +3,30 @@ Some functions for working with puzzles
 """
 from puzzle import Puzzle
 from collections import deque
-# set higher recursion limit
-# which is needed in PuzzleNode.__str__
-# you may uncomment the next lines on a unix system such as CDF
-# import resource
-# resource.setrlimit(resource.RLIMIT_STACK, (2**29, -1))
+from time import monotonic
+import json
+import os
+import pickle
+import threading
 import sys
-sys.setrecursionlimit(10**6)
+import zlib
 
+# seconds portfolio_solve waits for an answer before checking that its
+# workers are still alive
+_POLL = 0.1
 
-def depth_first_solve(puzzle):
+
+def depth_first_solve(puzzle, budget=None, stats=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
-    in its parent.  Return None if this is not possible.
+    in its parent.  Return None if this is not possible, or if budget
+    runs out first; use depth_first_search to tell these apart. If
+    stats is given, record in it how the search went.
 
     @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @type stats: SearchStats | None
     @rtype: PuzzleNode | None
 
     >>> from sudoku_puzzle import SudokuPuzzle
@@ -51,21 +59,43 @@ def depth_first_solve(puzzle):
     <BLANKLINE>
     <BLANKLINE>
     """
+    return depth_first_search(puzzle, budget, stats=stats).solution()
+
+
+def depth_first_search(puzzle, budget=None, checkpoint=None, stats=None):
+    """
+    Search depth-first from PuzzleNode(puzzle) for a solution, within
+    budget if it is given, and return what was found. If checkpoint is
+    given, save the state of the search as often as it asks; see
+    resume_search. If stats is given, record in it how the search went.
+
+    @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @type checkpoint: Checkpoint | None
+    @type stats: SearchStats | None
+    @rtype: SearchResult
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+    >>> result = depth_first_search(WordLadderPuzzle("cast", "fall", ws))
+    >>> result.status, result.expanded
+    ('exhausted', 6)
+    >>> result = depth_first_search(WordLadderPuzzle("cast", "list", ws),
+    ...                             SearchBudget(nodes=2))
+    >>> result.status, result.reason, result.expanded
+    ('budget_exceeded', 'nodes', 2)
+    >>> print(result.path.children[0].puzzle)
+    cost
+    """
+    meter = Meter(budget, stats=stats)
+    root = PuzzleNode(puzzle)
+    # Return the node if it is a solution.
+    if puzzle.is_solved():
+        return meter.result(root, root)
     overlap = {}
-    pn = PuzzleNode(puzzle)
-    solution_node = puzzle_node_tree(pn, overlap)
-    assert solution_node is not None, "The Puzzle is not solvable"
-    if solution_node.puzzle.is_solved():
-        # Remove the children of the solution.
-        solution_node.children = []
-        # Goes up while deleting other possible children.
-        while solution_node.parent is not None:
-            solution_node.parent.children = [solution_node]
-            solution_node = solution_node.parent
-        return solution_node
-    # Return None if there is no further possible solution.
-    else:
-        return None
+    stack = [[expand_node(root, overlap, meter, 0), 0]]
+    return meter.result(*resume_depth_first(stack, overlap, meter, root, 1,
+                                            checkpoint))
 
 
 def puzzle_node_tree(puzzle_node, overlap):
@@ -73,8 +103,11 @@ def puzzle_node_tree(puzzle_node, overlap):
     Create a PuzzleNode of puzzle_node and return the first node
     of PuzzleNode that is a solution to the puzzle_node.puzzle
 
+    overlap maps the canonical_key of each puzzle seen so far to that
+    puzzle, so puzzles equivalent to one already seen are skipped.
+
     @type puzzle_node: PuzzleNode
-    @type overlap: dict[str : Puzzle]
+    @type overlap: dict[object : Puzzle]
     @rtype: PuzzleNode | None
 
     >>> from sudoku_puzzle import SudokuPuzzle
@@ -100,27 +133,100 @@ def puzzle_node_tree(puzzle_node, overlap):
     # Return the node if it is a solution.
     elif puzzle_node.puzzle.is_solved():
         return puzzle_node
-    else:
-        puzzle_node.children = generate_children(puzzle_node)
-        overlap[puzzle_node.puzzle.__str__()] = puzzle_node.puzzle
-        for node in puzzle_node.children:
-            # Append the puzzle that has been seen to the overlap.
-            if (not node.puzzle.fail_fast()) and node.puzzle.__str__() \
-                    not in overlap:
-                solution = puzzle_node_tree(node, overlap)
-                if solution is not None:
-                    return solution
-        # Return None if there is no further possible solution.
-        return None
+    meter = Meter(None)
+    stack = [[expand_node(puzzle_node, overlap, meter, 0), 0]]
+    return resume_depth_first(stack, overlap, meter, puzzle_node, 1)[0]
+
+
+def resume_depth_first(stack, overlap, meter, deepest, depth, checkpoint=None):
+    """
+    Carry on a depth-first search and return the first solution it
+    finds, or None, paired with the deepest node expanded. stack holds
+    [node, number of its children tried] for each node on the current
+    path, and deepest is depth nodes from the start. The search stops
+    early if meter says so, and saves its state when checkpoint asks
+    and when it stops early.
 
+    @type stack: list[list[PuzzleNode | int]]
+    @type overlap: dict[object : Puzzle]
+    @type meter: Meter
+    @type deepest: PuzzleNode
+    @type depth: int
+    @type checkpoint: Checkpoint | None
+    @rtype: (PuzzleNode | None, PuzzleNode)
 
-def breadth_first_solve(puzzle):
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+    >>> root = PuzzleNode(WordLadderPuzzle("cast", "list", ws))
+    >>> (overlap, meter) = ({}, Meter(None))
+    >>> stack = [[expand_node(root, overlap, meter, 0), 0]]
+    >>> (solution, _) = resume_depth_first(stack, overlap, meter, root, 1)
+    >>> print(solution.puzzle)
+    list
+    >>> meter.expanded
+    5
+    """
+    stats = meter.stats
+    while stack and not meter.stopped():
+        if checkpoint is not None and checkpoint.due(meter.expanded):
+            checkpoint.save(_depth_first_state(stack, overlap, meter,
+                                               deepest, depth))
+        (parent, tried) = stack[-1]
+        if tried == len(parent.children):
+            stack.pop()
+            continue
+        stack[-1][1] += 1
+        node = parent.children[tried]
+        key = node.puzzle.canonical_key()
+        if key in overlap:
+            if stats is not None:
+                stats.duplicates += 1
+        # Remember dead ends too, so they are only tested once.
+        elif node.puzzle.fail_fast():
+            overlap[key] = node.puzzle
+            if stats is not None:
+                stats.failed += 1
+        elif node.puzzle.is_solved():
+            return node, node
+        else:
+            stack.append([expand_node(node, overlap, meter, len(stack)), 0])
+            if len(stack) > depth:
+                (deepest, depth) = (node, len(stack))
+    if checkpoint is not None and meter.stopped():
+        checkpoint.save(_depth_first_state(stack, overlap, meter, deepest,
+                                           depth))
+    # Return None if there is no further possible solution.
+    return None, deepest
+
+
+def expand_node(node, overlap, meter, depth):
+    """
+    Give node, depth steps from the start, its children, note it as
+    seen in overlap and spent in meter, and return it.
+
+    @type node: PuzzleNode
+    @type overlap: dict[object : Puzzle]
+    @type meter: Meter
+    @type depth: int
+    @rtype: PuzzleNode
+    """
+    node.children = generate_children(node)
+    overlap[node.puzzle.canonical_key()] = node.puzzle
+    meter.spend(len(node.children), depth + 1, depth)
+    return node
+
+
+def breadth_first_solve(puzzle, budget=None, stats=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child PuzzleNode containing an extension
-    of the puzzle in its parent. Return None if this is not possible.
+    of the puzzle in its parent. Return None if this is not possible,
+    or if budget runs out first; use breadth_first_search to tell these
+    apart. If stats is given, record in it how the search went.
 
     @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @type stats: SearchStats | None
     @rtype: PuzzleNode | None
     >>> from sudoku_puzzle import SudokuPuzzle
     >>> s = SudokuPuzzle(9, ["*", "*", "*", "7", "*", "8", "*", "1", "*",
@@ -151,32 +257,399 @@ def breadth_first_solve(puzzle):
     <BLANKLINE>
     <BLANKLINE>
     """
+    return breadth_first_search(puzzle, budget, stats=stats).solution()
+
+
+def breadth_first_search(puzzle, budget=None, checkpoint=None, stats=None):
+    """
+    Search breadth-first from PuzzleNode(puzzle) for a solution, within
+    budget if it is given, and return what was found. If checkpoint is
+    given, save the state of the search as often as it asks; see
+    resume_search. If stats is given, record in it how the search went.
+
+    @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @type checkpoint: Checkpoint | None
+    @type stats: SearchStats | None
+    @rtype: SearchResult
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+    >>> token = CancellationToken()
+    >>> token.cancel()
+    >>> result = breadth_first_search(WordLadderPuzzle("cast", "list", ws),
+    ...                               SearchBudget(cancel=token))
+    >>> result.status, result.expanded
+    ('cancelled', 1)
+    >>> result = breadth_first_search(WordLadderPuzzle("cast", "list", ws))
+    >>> result.status, result.expanded
+    ('solved', 4)
+    """
+    meter = Meter(budget, stats=stats)
     current_node = PuzzleNode(puzzle)
+    # A solved puzzle is its own path; it won't be queued again below.
+    if puzzle.is_solved():
+        return meter.result(current_node, current_node)
     queue = deque()
     current_node.children = generate_children(current_node)
+    meter.spend(len(current_node.children), 1, 0)
+    # Canonical keys of the puzzles queued so far.
+    seen = {puzzle.canonical_key()}
     # Add children to the queue.
     for child in current_node.children:
-        queue.append(child)
+        key = child.puzzle.canonical_key()
+        if key not in seen:
+            seen.add(key)
+            queue.append(child)
+        elif stats is not None:
+            stats.duplicates += 1
+    return meter.result(*_breadth_first(queue, seen, meter, current_node,
+                                        1, len(queue), checkpoint))
+
+
+def _breadth_first(queue, seen, meter, deepest, level, left,
+                   checkpoint=None):
+    # Return the first solution found by carrying on a breadth-first
+    # search of the nodes in queue, or None, paired with the last node
+    # taken from the queue, or deepest if there is none. seen holds the
+    # canonical keys of the puzzles queued so far, and the first left
+    # nodes in queue are level steps from the start. The search stops
+    # early if meter says so, and saves its state when checkpoint asks
+    # and when it stops early.
+    #
+    # @type queue: deque[PuzzleNode]
+    # @type seen: set[object]
+    # @type meter: Meter
+    # @type deepest: PuzzleNode
+    # @type level: int
+    # @type left: int
+    # @type checkpoint: Checkpoint | None
+    # @rtype: (PuzzleNode | None, PuzzleNode)
+    stats = meter.stats
     # Iterate until the queue is empty.
-    while len(queue) != 0:
+    while len(queue) != 0 and not meter.stopped():
+        if checkpoint is not None and checkpoint.due(meter.expanded):
+            checkpoint.save(_breadth_first_state(queue, seen, meter,
+                                                 deepest, level, left))
+        if left == 0:
+            (level, left) = (level + 1, len(queue))
         remove = queue.popleft()
-        remove.children = generate_children(remove)
+        left -= 1
+        deepest = remove
         if remove.puzzle.is_solved():
-            # Remove the children of the solution.
-            remove.children = []
-            # Goes up while deleting other possible children.
-            while remove.parent is not None:
-                remove.parent.children = [remove]
-                remove = remove.parent
-            return remove
+            return remove, remove
         # Skip the code that fail fasts for the efficiency.
         elif remove.puzzle.fail_fast():
-            pass
+            if stats is not None:
+                stats.failed += 1
         else:
-            for child in remove.children:
-                queue.append(child)
+            children = generate_children(remove)
+            # keep only the children queued, so the others can be freed
+            remove.children = []
+            for child in children:
+                key = child.puzzle.canonical_key()
+                if key not in seen:
+                    seen.add(key)
+                    queue.append(child)
+                    remove.children.append(child)
+                elif stats is not None:
+                    stats.duplicates += 1
+            meter.spend(len(children), len(queue), level)
+    if checkpoint is not None and meter.stopped():
+        checkpoint.save(_breadth_first_state(queue, seen, meter, deepest,
+                                             level, left))
     # Return None if there is no further possible solution.
-    return None
+    return None, deepest
+
+
+def resume_search(path, budget=None, checkpoint=None, stats=None):
+    """
+    Carry on the search whose state was saved to the file at path by
+    a Checkpoint, within budget if it is given, and return what was
+    found, just as the search would have had it not been stopped.
+    budget counts the nodes and seconds spent before the save too, but
+    stats, if given, only what is spent after it.
+
+    @type path: str
+    @type budget: SearchBudget | None
+    @type checkpoint: Checkpoint | None
+    @type stats: SearchStats | None
+    @rtype: SearchResult
+
+    >>> import os, tempfile
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "most", "cast", "mist", "list", "lost", "lose"}
+    >>> w = WordLadderPuzzle("cast", "lose", ws)
+    >>> path = os.path.join(tempfile.mkdtemp(), "search.checkpoint")
+    >>> for search in [depth_first_search, breadth_first_search]:
+    ...     whole = search(w)
+    ...     stopped = search(w, SearchBudget(nodes=3), Checkpoint(path, nodes=2))
+    ...     resumed = resume_search(path)
+    ...     print(stopped.status, resumed.status, resumed.expanded ==
+    ...           whole.expanded, str(resumed.path) == str(whole.path))
+    budget_exceeded solved True True
+    budget_exceeded solved True True
+    """
+    state = load_checkpoint(path)
+    nodes = _rebuild_nodes(state["puzzles"], state["parents"])
+    meter = Meter(budget, state["expanded"], state["seconds"], stats)
+    if state["search"] == "depth":
+        stack = [[nodes[i], tried] for (i, tried) in state["stack"]]
+        return meter.result(*resume_depth_first(
+            stack, dict.fromkeys(state["keys"]), meter,
+            nodes[state["deepest"]], state["depth"], checkpoint))
+    queue = deque([nodes[i] for i in state["queue"]])
+    return meter.result(*_breadth_first(
+        queue, set(state["keys"]), meter, nodes[state["deepest"]],
+        state["level"], state["left"], checkpoint))
+
+
+def load_checkpoint(path):
+    """
+    Return the state of a search saved to the file at path by a
+    Checkpoint.
+
+    @type path: str
+    @rtype: dict[str, object]
+    """
+    with open(path, "rb") as f:
+        state = pickle.loads(zlib.decompress(f.read()))
+    assert state["version"] == Checkpoint.VERSION
+    return state
+
+
+def _depth_first_state(stack, overlap, meter, deepest, depth):
+    # Return the state of a depth-first search for a Checkpoint to
+    # save, with the arguments resume_depth_first takes.
+    #
+    # @type stack: list[list[PuzzleNode | int]]
+    # @type overlap: dict[object : Puzzle]
+    # @type meter: Meter
+    # @type deepest: PuzzleNode
+    # @type depth: int
+    # @rtype: dict[str, object]
+    nodes = [stack[0][0]]
+    for (node, _) in stack:
+        nodes.extend(node.children)
+    (puzzles, parents, index) = _node_table(nodes + [deepest])
+    return {"search": "depth", "puzzles": puzzles, "parents": parents,
+            "stack": [(index[id(node)], tried) for (node, tried) in stack],
+            "keys": list(overlap), "deepest": index[id(deepest)],
+            "depth": depth, "expanded": meter.expanded,
+            "seconds": meter.seconds()}
+
+
+def _breadth_first_state(queue, seen, meter, deepest, level, left):
+    # Return the state of a breadth-first search for a Checkpoint to
+    # save, with the arguments _breadth_first takes.
+    #
+    # @type queue: deque[PuzzleNode]
+    # @type seen: set[object]
+    # @type meter: Meter
+    # @type deepest: PuzzleNode
+    # @type level: int
+    # @type left: int
+    # @rtype: dict[str, object]
+    (puzzles, parents, index) = _node_table(list(queue) + [deepest])
+    return {"search": "breadth", "puzzles": puzzles, "parents": parents,
+            "queue": [index[id(node)] for node in queue], "keys": list(seen),
+            "deepest": index[id(deepest)], "level": level, "left": left,
+            "expanded": meter.expanded, "seconds": meter.seconds()}
+
+
+def _node_table(nodes):
+    # Return the puzzles of nodes and of all their ancestors, each after
+    # its parent and otherwise in order, the position of each one's
+    # parent or -1, and a dict from the id of each node to its position.
+    #
+    # @type nodes: list[PuzzleNode]
+    # @rtype: (list[Puzzle], list[int], dict[int, int])
+    puzzles, parents, index = [], [], {}
+    for node in nodes:
+        chain = []
+        while node is not None and id(node) not in index:
+            chain.append(node)
+            node = node.parent
+        for node in reversed(chain):
+            index[id(node)] = len(puzzles)
+            puzzles.append(node.puzzle)
+            parents.append(-1 if node.parent is None else
+                           index[id(node.parent)])
+    return puzzles, parents, index
+
+
+def _rebuild_nodes(puzzles, parents):
+    # Return PuzzleNodes of puzzles linked as parents says, as
+    # _node_table left them.
+    #
+    # @type puzzles: list[Puzzle]
+    # @type parents: list[int]
+    # @rtype: list[PuzzleNode]
+    nodes = []
+    for (puzzle, parent) in zip(puzzles, parents):
+        node = PuzzleNode(puzzle, parent=None if parent < 0 else nodes[parent])
+        if node.parent is not None:
+            node.parent.children.append(node)
+        nodes.append(node)
+    return nodes
+
+
+def portfolio_solve(puzzle, strategies=None, history=None, timeout=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing a
+    solution, as found first by any of strategies run side by side in
+    separate processes, or None if none of them finds one within
+    timeout seconds, including when their processes fail or die. The
+    other strategies are stopped as soon as one succeeds.
+
+    Each strategy is a solver such as depth_first_solve, defined at the
+    top level of a module. If history is given, a line recording the
+    winner is appended to the JSON lines file at that path; see
+    portfolio_defaults.
+
+    @type puzzle: Puzzle
+    @type strategies: list[(Puzzle) -> PuzzleNode | None] | None
+    @type history: str | None
+    @type timeout: float | None
+    @rtype: PuzzleNode | None
+
+    >>> import os, tempfile
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+    >>> history = os.path.join(tempfile.mkdtemp(), "portfolio.jsonl")
+    >>> node = portfolio_solve(WordLadderPuzzle("cast", "list", ws),
+    ...                        history=history)
+    >>> while node.children:
+    ...     node = node.children[0]
+    >>> print(node.puzzle)
+    list
+    >>> list(portfolio_defaults(history))
+    ['WordLadderPuzzle']
+    >>> portfolio_solve(WordLadderPuzzle("cast", "list", ws),
+    ...                 [lambda puzzle: os._exit(1)]) is None
+    True
+    """
+    import multiprocessing
+    import queue
+    if strategies is None:
+        strategies = [depth_first_solve, breadth_first_solve]
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_run_strategy,
+                                       args=(i, strategy, puzzle, results),
+                                       daemon=True)
+               for (i, strategy) in enumerate(strategies)]
+    start = monotonic()
+    for worker in workers:
+        worker.start()
+    (node, winner, answered) = (None, None, set())
+    try:
+        while node is None and len(answered) < len(workers):
+            left = None if timeout is None else timeout - (monotonic() - start)
+            if left is not None and left <= 0:
+                break
+            # a worker that dies never answers, so look up now and then
+            gone = all([worker.exitcode is not None for worker in workers])
+            try:
+                (i, steps) = results.get(
+                    timeout=_POLL if left is None else min(left, _POLL))
+            except queue.Empty:
+                if gone:
+                    # all of them had stopped before this wait, so
+                    # whatever they put is in by now
+                    break
+                continue
+            answered.add(i)
+            if steps is not None:
+                node = _follow_steps(puzzle, steps)
+                winner = None if node is None else i
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+    if history is not None:
+        names = [_strategy_name(strategy) for strategy in strategies]
+        with open(history, "a") as f:
+            f.write(json.dumps({
+                "puzzle": type(puzzle).__name__,
+                "strategies": names,
+                "winner": None if winner is None else names[winner],
+                "seconds": monotonic() - start}) + "\n")
+    return node
+
+
+def portfolio_defaults(history):
+    """
+    Return the strategy that has won most often for each type of puzzle
+    in the JSON lines file at history written by portfolio_solve.
+
+    @type history: str
+    @rtype: dict[str, str]
+    """
+    wins = {}
+    with open(history, "r") as f:
+        for line in f:
+            record = json.loads(line)
+            if record["winner"] is not None:
+                counts = wins.setdefault(record["puzzle"], {})
+                counts[record["winner"]] = counts.get(record["winner"], 0) + 1
+    return {puzzle: max(counts, key=counts.get)
+            for (puzzle, counts) in wins.items()}
+
+
+def _run_strategy(i, strategy, puzzle, results):
+    # Solve puzzle with strategy, and put i on results together with
+    # the steps to the solution found, or None.
+    #
+    # @type i: int
+    # @type strategy: (Puzzle) -> PuzzleNode | None
+    # @type puzzle: Puzzle
+    # @type results: multiprocessing.Queue
+    # @rtype: None
+    try:
+        results.put((i, _steps_of(strategy(puzzle))))
+    except Exception:
+        results.put((i, None))
+        raise
+
+
+def _steps_of(node):
+    # Return the position of each puzzle on the path from node among
+    # the extensions of the puzzle before it, or None if node is None.
+    # These are much cheaper to send between processes than puzzles.
+    #
+    # @type node: PuzzleNode | None
+    # @rtype: list[int] | None
+    if node is None:
+        return None
+    steps = []
+    while node.children:
+        steps.append(node.puzzle.extensions().index(node.children[0].puzzle))
+        node = node.children[0]
+    return steps
+
+
+def _follow_steps(puzzle, steps):
+    # Return the path of PuzzleNodes from puzzle taking the extensions
+    # at steps, or None if it does not end in a solution.
+    #
+    # @type puzzle: Puzzle
+    # @type steps: list[int]
+    # @rtype: PuzzleNode | None
+    root = node = PuzzleNode(puzzle)
+    for i in steps:
+        child = PuzzleNode(node.puzzle.extensions()[i], parent=node)
+        node.children = [child]
+        node = child
+    return root if node.puzzle.is_solved() else None
+
+
+def _strategy_name(strategy):
+    # Return the name portfolio_solve records for strategy.
+    #
+    # @type strategy: (Puzzle) -> PuzzleNode | None
+    # @rtype: str
+    return getattr(strategy, "__name__", repr(strategy))
 
 
 def generate_children(node):
@@ -212,6 +685,80 @@ def generate_children(node):
     """
     return [PuzzleNode(x, parent=node) for x in node.puzzle.extensions()]
 
+
+def write_path(node, out=None, moves=False):
+    """
+    Write the path of PuzzleNodes from node, following the first child
+    of each, to the file out, by default standard output, one step at a
+    time, and return the number of steps on it.
+
+    Each puzzle is written followed by a blank line, as str(node) shows
+    a solution path; or if moves is set, the first puzzle and then the
+    move of each step on a line of its own, as path_moves gives them.
+
+    @type node: PuzzleNode
+    @type out: io.TextIOBase | None
+    @type moves: bool
+    @rtype: int
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> peg = GridPegSolitairePuzzle([list("**.*")], {"*", "."})
+    >>> node = depth_first_solve(peg)
+    >>> write_path(node, moves=True)
+    **.*
+    (0, 0)->(0, 2)
+    (0, 3)->(0, 1)
+    2
+    >>> _ = write_path(node)
+    **.*
+    <BLANKLINE>
+    ..**
+    <BLANKLINE>
+    .*..
+    <BLANKLINE>
+    """
+    if out is None:
+        out = sys.stdout
+    out.write("{}\n{}".format(node.puzzle, "" if moves else "\n"))
+    steps = 0
+    for move in path_moves(node) if moves else _path_puzzles(node):
+        out.write("{}\n{}".format(move, "" if moves else "\n"))
+        steps += 1
+    return steps
+
+
+def path_moves(node):
+    """
+    Yield the move of each step on the path of PuzzleNodes from node,
+    following the first child of each, as describe_move tells it, or
+    else the puzzle the step reaches.
+
+    @type node: PuzzleNode
+    @rtype: Iterator[str]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+    >>> list(path_moves(breadth_first_solve(WordLadderPuzzle("cast", "list",
+    ...                                                       ws))))
+    ['cost', 'lost', 'list']
+    """
+    while node.children:
+        child = node.children[0]
+        move = node.puzzle.describe_move(child.puzzle)
+        yield str(child.puzzle) if move is None else move
+        node = child
+
+
+def _path_puzzles(node):
+    # Yield the puzzle of each node after node on its path, following
+    # the first child of each.
+    #
+    # @type node: PuzzleNode
+    # @rtype: Iterator[Puzzle]
+    while node.children:
+        node = node.children[0]
+        yield node.puzzle
+
 # Class PuzzleNode helps build trees of PuzzleNodes that have
 # an arbitrary number of children, and a parent.
 
@@ -221,6 +768,7 @@ class PuzzleNode:
     A Puzzle configuration that refers to other configurations that it
     can be extended to.
     """
+    __slots__ = ("puzzle", "children", "parent")
 
     def __init__(self, puzzle=None, children=None, parent=None):
         """
@@ -254,17 +802,542 @@ class PuzzleNode:
         True
         >>> pn1.__eq__(pn3)
         False
+        >>> pn1.children = [PuzzleNode(WordLadderPuzzle("oo", "no", {"oo"}))]
+        >>> pn1.__eq__(pn2)
+        False
+        >>> pn2.children = [PuzzleNode(WordLadderPuzzle("oo", "no", {"oo"}))]
+        >>> pn1.__eq__(pn2)
+        True
+        """
+        # pairs of nodes still to compare, so long paths don't recurse
+        pairs = [(self, other)]
+        while pairs:
+            (node, other) = pairs.pop()
+            if node is other:
+                continue
+            elif (type(node) != type(other) or node.puzzle != other.puzzle or
+                  len(node.children) != len(other.children)):
+                return False
+            # match each child with an unmatched child of other holding
+            # an equal puzzle, found by hash rather than by scanning
+            unmatched = {}
+            for child in other.children:
+                unmatched.setdefault(child.puzzle, []).append(child)
+            for child in node.children:
+                candidates = unmatched.get(child.puzzle, [])
+                if len(candidates) == 1:
+                    pairs.append((child, candidates.pop()))
+                    continue
+                # only when siblings hold equal puzzles
+                match = next((i for (i, candidate) in enumerate(candidates)
+                              if child == candidate), None)
+                if match is None:
+                    return False
+                candidates.pop(match)
+        return True
+
+    def __hash__(self):
+        """
+        Return a hash of PuzzleNode self, consistent with __eq__.
+
+        @type self: PuzzleNode
+        @rtype: int
         """
-        return (type(self) == type(other) and
-                self.puzzle == other.puzzle and
-                all([x in self.children for x in other.children]) and
-                all([x in other.children for x in self.children]))
+        return hash(self.puzzle)
 
     def __str__(self):
         """
-        Return a human-readable string representing PuzzleNode self.
+        Return a human-readable string representing PuzzleNode self:
+        its puzzle, a blank line, and the string of each child, one
+        after another.
 
-        # doctest not feasible.
+        Use write_path to write a long path without building it all
+        as one string.
+
+        @type self: PuzzleNode
+        @rtype: str
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"cost", "most", "cast"}
+        >>> node = PuzzleNode(WordLadderPuzzle("cost", "most", ws))
+        >>> cast = PuzzleNode(WordLadderPuzzle("cast", "most", ws), [], node)
+        >>> most = PuzzleNode(WordLadderPuzzle("most", "most", ws), [], node)
+        >>> node.children = [cast, most]
+        >>> cast.children = [PuzzleNode(WordLadderPuzzle("cost", "most", ws))]
+        >>> print(node)
+        cost
+        <BLANKLINE>
+        cast
+        <BLANKLINE>
+        cost
+        <BLANKLINE>
+        <BLANKLINE>
+        most
+        <BLANKLINE>
+        <BLANKLINE>
+        """
+        # strings and nodes still to write, the next last
+        parts, work = [], [self]
+        while work:
+            item = work.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            parts += [str(item.puzzle), "\n\n"]
+            for i in range(len(item.children) - 1, -1, -1):
+                work.append(item.children[i])
+                if i:
+                    work.append("\n")
+        return "".join(parts)
+
+
+class SearchBudget:
+    """
+    Limits on a search: the number of nodes it may expand, the seconds
+    it may run, and the bytes its process may grow by, each None for no
+    limit, plus a CancellationToken that stops it from elsewhere.
+    """
+
+    def __init__(self, nodes=None, seconds=None, memory=None, cancel=None):
+        """
+        Create a new SearchBudget self with these limits.
+
+        @type self: SearchBudget
+        @type nodes: int | None
+        @type seconds: float | None
+        @type memory: int | None
+        @type cancel: CancellationToken | None
+        @rtype: None
+        """
+        self.nodes, self.seconds, self.memory = nodes, seconds, memory
+        self.cancel = cancel
+
+
+class SearchStats:
+    """
+    Counts of what a search did, for comparing strategies and finding
+    out why a search is slow.
+
+    generated counts the children made, expanded the nodes whose
+    children were made, duplicates the children skipped as already
+    seen, and failed those dropped by fail_fast. max_frontier is the
+    most nodes waiting to be searched at once (the stack of a
+    depth-first search, the queue of a breadth-first one), max_depth
+    the most steps from the start of a node expanded, and seconds the
+    time the search ran.
+
+    If progress is given, it is called with self at most every every
+    seconds while the search runs, and once more when it ends.
+    """
+    # nodes expanded between looks at the clock for progress
+    _CHECK_EVERY = 256
+
+    def __init__(self, progress=None, every=1.0):
+        """
+        Create a new SearchStats self with every count zero.
+
+        @type self: SearchStats
+        @type progress: (SearchStats) -> object | None
+        @type every: float
+        @rtype: None
         """
-        return "{}\n\n{}".format(self.puzzle,
-                                 "\n".join([str(x) for x in self.children]))
+        self.progress, self.every = progress, every
+        self.generated = self.expanded = self.duplicates = self.failed = 0
+        self.max_frontier = self.max_depth = 0
+        self.seconds = 0.0
+        self._started = self._reported = monotonic()
+
+    def start(self):
+        """
+        Start timing a search in SearchStats self.
+
+        @type self: SearchStats
+        @rtype: None
+        """
+        self._started = self._reported = monotonic() - self.seconds
+
+    def expand(self, children, frontier, depth):
+        """
+        Count in SearchStats self one node expanded depth steps from the
+        start into children nodes, leaving frontier nodes to search.
+
+        @type self: SearchStats
+        @type children: int
+        @type frontier: int
+        @type depth: int
+        @rtype: None
+        """
+        self.expanded += 1
+        self.generated += children
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if (self.progress is not None and
+                self.expanded % self._CHECK_EVERY == 0 and
+                monotonic() - self._reported >= self.every):
+            self._reported = monotonic()
+            self.seconds = self._reported - self._started
+            self.progress(self)
+
+    def finish(self):
+        """
+        Note in SearchStats self that its search has ended.
+
+        @type self: SearchStats
+        @rtype: None
+        """
+        self.seconds = monotonic() - self._started
+        if self.progress is not None:
+            self.progress(self)
+
+    def rate(self):
+        """
+        Return the nodes expanded per second in SearchStats self.
+
+        @type self: SearchStats
+        @rtype: float
+        """
+        return self.expanded / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        """
+        Return the counts of SearchStats self by name, for export.
+
+        @type self: SearchStats
+        @rtype: dict[str, int | float]
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+        >>> stats = SearchStats()
+        >>> _ = breadth_first_solve(WordLadderPuzzle("cast", "list", ws),
+        ...                         stats=stats)
+        >>> counts = stats.as_dict()
+        >>> [(name, counts[name]) for name in ["generated", "expanded",
+        ...  "duplicates", "failed", "max_frontier", "max_depth"]]
+        ... # doctest: +NORMALIZE_WHITESPACE
+        [('generated', 10), ('expanded', 4), ('duplicates', 5), ('failed', 0),
+         ('max_frontier', 2), ('max_depth', 2)]
+        """
+        return {"generated": self.generated, "expanded": self.expanded,
+                "duplicates": self.duplicates, "failed": self.failed,
+                "max_frontier": self.max_frontier,
+                "max_depth": self.max_depth, "seconds": self.seconds,
+                "rate": self.rate()}
+
+
+class CancellationToken:
+    """
+    A flag that any thread can set to stop the searches whose budget
+    holds it.
+    """
+
+    def __init__(self):
+        """
+        Create a new CancellationToken self, not yet cancelled.
+
+        @type self: CancellationToken
+        @rtype: None
+        """
+        self._event = threading.Event()
+
+    def cancel(self):
+        """
+        Ask the searches holding CancellationToken self to stop.
+
+        @type self: CancellationToken
+        @rtype: None
+        """
+        self._event.set()
+
+    def cancelled(self):
+        """
+        Return whether CancellationToken self has been cancelled.
+
+        @type self: CancellationToken
+        @rtype: bool
+        """
+        return self._event.is_set()
+
+
+class SearchResult:
+    """
+    The outcome of a search.
+
+    status is "solved", "exhausted" when there is no solution,
+    "budget_exceeded" when reason names the limit that ran out ("nodes",
+    "seconds" or "memory"), or "cancelled". path is a path of PuzzleNodes
+    from the start to the solution, or else to the deepest puzzle the
+    search expanded. expanded counts the nodes expanded, in seconds.
+    """
+
+    def __init__(self, status, path, reason, expanded, seconds):
+        """
+        Create a new SearchResult self.
+
+        @type self: SearchResult
+        @type status: str
+        @type path: PuzzleNode
+        @type reason: str | None
+        @type expanded: int
+        @type seconds: float
+        @rtype: None
+        """
+        self.status, self.path, self.reason = status, path, reason
+        self.expanded, self.seconds = expanded, seconds
+
+    def __repr__(self):
+        """
+        Return a representation of SearchResult self.
+
+        @type self: SearchResult
+        @rtype: str
+        """
+        return "SearchResult({!r}, reason={!r}, expanded={}, seconds={})".format(
+            self.status, self.reason, self.expanded, self.seconds)
+
+    def solution(self):
+        """
+        Return the path to a solution of SearchResult self, or None if
+        the search did not find one.
+
+        @type self: SearchResult
+        @rtype: PuzzleNode | None
+        """
+        return self.path if self.status == "solved" else None
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by a search that has no SearchResult to return when its
+    SearchBudget runs out. reason names the limit that ran out
+    ("nodes", "seconds" or "memory"), or is "cancelled", and expanded
+    counts the nodes expanded before the search stopped.
+    """
+
+    def __init__(self, reason, expanded):
+        """
+        Create a new BudgetExceeded self for a search that expanded
+        expanded nodes before reason stopped it.
+
+        @type self: BudgetExceeded
+        @type reason: str
+        @type expanded: int
+        @rtype: None
+        """
+        super().__init__(reason, expanded)
+        self.reason, self.expanded = reason, expanded
+
+    def __str__(self):
+        """
+        Return a description of BudgetExceeded self.
+
+        @type self: BudgetExceeded
+        @rtype: str
+        """
+        if self.reason == "cancelled":
+            return "cancelled after {} nodes".format(self.expanded)
+        return "{} budget exceeded after {} nodes".format(self.reason,
+                                                          self.expanded)
+
+
+class Checkpoint:
+    """
+    Where a long search saves its state, so that resume_search can
+    carry it on if the search is stopped, and how often: every nodes
+    nodes expanded or every seconds seconds, whichever comes first.
+    A search that runs out of budget or is cancelled saves as it stops.
+
+    The state is pickled and compressed with zlib, and written beside
+    path first so that a stop while saving leaves the last save whole.
+    """
+    # format of the saved state
+    VERSION = 2
+
+    def __init__(self, path, nodes=None, seconds=None):
+        """
+        Create a new Checkpoint self saving to the file at path.
+
+        @type self: Checkpoint
+        @type path: str
+        @type nodes: int | None
+        @type seconds: float | None
+        @rtype: None
+        """
+        self.path, self.nodes, self.seconds = path, nodes, seconds
+        (self._saved, self._checked) = (0, 0)
+        self._saved_at = monotonic()
+
+    def due(self, expanded):
+        """
+        Return whether a search that has expanded this many nodes should
+        save its state to Checkpoint self now.
+
+        @type self: Checkpoint
+        @type expanded: int
+        @rtype: bool
+        """
+        if expanded == self._checked:
+            return False
+        self._checked = expanded
+        return ((self.nodes is not None and
+                 expanded - self._saved >= self.nodes) or
+                (self.seconds is not None and
+                 monotonic() - self._saved_at >= self.seconds))
+
+    def save(self, state):
+        """
+        Save state, the state of a search, to Checkpoint self.
+
+        @type self: Checkpoint
+        @type state: dict[str, object]
+        @rtype: None
+        """
+        state["version"] = self.VERSION
+        temporary = "{}.{}.tmp".format(self.path, os.getpid())
+        with open(temporary, "wb") as f:
+            f.write(zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL)))
+        os.replace(temporary, self.path)
+        (self._saved, self._saved_at) = (state["expanded"], monotonic())
+
+
+class Meter:
+    """
+    What a search has spent of its SearchBudget so far, and why it
+    stopped, if it has.
+    """
+    # nodes between checks of the clock and of memory
+    _CHECK_EVERY = 64
+
+    def __init__(self, budget, expanded=0, seconds=0.0, stats=None):
+        """
+        Create a new Meter self for budget, starting now, of a search
+        that has already expanded nodes for seconds, recording how it
+        goes in stats if that is given.
+
+        @type self: Meter
+        @type budget: SearchBudget | None
+        @type expanded: int
+        @type seconds: float
+        @type stats: SearchStats | None
+        @rtype: None
+        """
+        self.budget, self.expanded, self.reason = budget, expanded, None
+        self.stats = stats
+        if stats is not None:
+            stats.start()
+        self.start = monotonic() - seconds
+        if budget is not None and budget.memory is not None:
+            self.resident = _resident_bytes()
+
+    def spend(self, children, frontier, depth):
+        """
+        Count one more node expanded in Meter self, depth steps from
+        the start, into children nodes, leaving frontier nodes to be
+        searched, and note whether that uses up its budget.
+
+        @type self: Meter
+        @type children: int
+        @type frontier: int
+        @type depth: int
+        @rtype: None
+        """
+        self.expanded += 1
+        if self.stats is not None:
+            self.stats.expand(children, frontier, depth)
+        budget = self.budget
+        if budget is None or self.reason is not None:
+            return
+        if budget.cancel is not None and budget.cancel.cancelled():
+            self.reason = "cancelled"
+        elif budget.nodes is not None and self.expanded >= budget.nodes:
+            self.reason = "nodes"
+        elif self.expanded % self._CHECK_EVERY == 0:
+            if (budget.seconds is not None and
+                    monotonic() - self.start >= budget.seconds):
+                self.reason = "seconds"
+            elif (budget.memory is not None and
+                  _resident_bytes() - self.resident >= budget.memory):
+                self.reason = "memory"
+
+    def seconds(self):
+        """
+        Return the seconds the search metered by Meter self has run.
+
+        @type self: Meter
+        @rtype: float
+        """
+        return monotonic() - self.start
+
+    def stopped(self):
+        """
+        Return whether the search metered by Meter self must stop.
+
+        @type self: Meter
+        @rtype: bool
+        """
+        return self.reason is not None
+
+    def check(self):
+        """
+        Raise BudgetExceeded if the search metered by Meter self must
+        stop.
+
+        @type self: Meter
+        @rtype: None
+
+        >>> meter = Meter(SearchBudget(nodes=2))
+        >>> meter.spend(3, 3, 0)
+        >>> meter.check()
+        >>> meter.spend(2, 4, 1)
+        >>> meter.check()
+        Traceback (most recent call last):
+        ...
+        puzzle_tools.BudgetExceeded: nodes budget exceeded after 2 nodes
+        """
+        if self.reason is not None:
+            raise BudgetExceeded(self.reason, self.expanded)
+
+    def result(self, solution, deepest):
+        """
+        Return the SearchResult of a search metered by Meter self that
+        found solution, or None, and expanded deepest further from the
+        start than any other node.
+
+        @type self: Meter
+        @type solution: PuzzleNode | None
+        @type deepest: PuzzleNode
+        @rtype: SearchResult
+        """
+        if solution is not None:
+            (status, reason) = ("solved", None)
+        elif self.reason is None:
+            (status, reason) = ("exhausted", None)
+        elif self.reason == "cancelled":
+            (status, reason) = ("cancelled", None)
+        else:
+            (status, reason) = ("budget_exceeded", self.reason)
+        node = deepest if solution is None else solution
+        # Remove the children of the last node.
+        node.children = []
+        # Goes up while deleting other possible children.
+        while node.parent is not None:
+            node.parent.children = [node]
+            node = node.parent
+        if self.stats is not None:
+            self.stats.finish()
+        return SearchResult(status, node, reason, self.expanded,
+                            self.seconds())
+
+
+def _resident_bytes():
+    # Return the bytes of memory this process holds, or its peak where
+    # the current figure is not available.
+    #
+    # @rtype: int
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
@@ -0,0 +1,213 @@
+"""
+Tracing of where puzzle searches spend their time
+"""
+from puzzle import Puzzle
+import puzzle_tools
+from functools import wraps
+from time import perf_counter_ns
+import json
+import os
+import threading
+
+# methods of Puzzle subclasses a Tracer times
+PUZZLE_METHODS = ("extensions", "is_solved", "fail_fast", "canonical_key",
+                  "fingerprint", "__str__", "__eq__", "__hash__")
+# methods of PuzzleNode a Tracer times
+NODE_METHODS = ("__init__", "__eq__", "__str__")
+
+
+class Tracer:
+    """
+    Times calls to the methods of every Puzzle subclass, to PuzzleNode
+    and to puzzle_tools.generate_children while it is on, without any
+    change to the subclasses.
+
+    Turn it on with start, or by using it in a with statement, and off
+    with stop. Every call is added to its method's totals, and every
+    sample_every-th call of each method is kept as a span for
+    write_chrome_trace. Times include those of the calls made within,
+    so canonical_key may include __str__, for example. Only subclasses
+    imported before start are traced.
+    """
+
+    def __init__(self, sample_every=100):
+        """
+        Create a new Tracer self, not yet on, keeping one span for every
+        sample_every calls of each method.
+
+        @type self: Tracer
+        @type sample_every: int
+        @rtype: None
+        """
+        self.sample_every = sample_every
+        # [calls, nanoseconds] by method name
+        self.totals = {}
+        # (name, start, nanoseconds, thread) of the sampled calls
+        self.spans = []
+        # (owner, attribute name, original) of each method replaced
+        self._replaced = []
+        self._origin = perf_counter_ns()
+
+    def __enter__(self):
+        """
+        Turn Tracer self on.
+
+        @type self: Tracer
+        @rtype: Tracer
+        """
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """
+        Turn Tracer self off.
+
+        @type self: Tracer
+        @rtype: bool
+        """
+        self.stop()
+        return False
+
+    def start(self):
+        """
+        Replace the traced methods with timed ones.
+
+        @type self: Tracer
+        @rtype: None
+        """
+        assert not self._replaced, "Tracer is already on"
+        classes, i = [Puzzle], 0
+        while i < len(classes):
+            classes.extend([cls for cls in classes[i].__subclasses__()
+                            if cls not in classes])
+            i += 1
+        for cls in classes:
+            for name in PUZZLE_METHODS:
+                # a class that defines __eq__ alone has __hash__ None
+                if vars(cls).get(name) is not None:
+                    self._replace(cls, name, cls.__name__ + "." + name)
+        for name in NODE_METHODS:
+            self._replace(puzzle_tools.PuzzleNode, name, "PuzzleNode." + name)
+        self._replace(puzzle_tools, "generate_children", "generate_children")
+
+    def stop(self):
+        """
+        Put back the methods replaced by start.
+
+        @type self: Tracer
+        @rtype: None
+        """
+        for (owner, name, original) in reversed(self._replaced):
+            setattr(owner, name, original)
+        self._replaced = []
+
+    def calls(self, name):
+        """
+        Return the number of calls of the method called name timed by
+        Tracer self.
+
+        @type self: Tracer
+        @type name: str
+        @rtype: int
+        """
+        return self.totals.get(name, [0, 0])[0]
+
+    def summary(self):
+        """
+        Return a table of the calls and time of each method timed by
+        Tracer self that was called, the most time first.
+
+        @type self: Tracer
+        @rtype: str
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+        >>> original = WordLadderPuzzle.extensions
+        >>> with Tracer(sample_every=1) as tracer:
+        ...     _ = puzzle_tools.breadth_first_solve(
+        ...         WordLadderPuzzle("cast", "list", ws))
+        >>> tracer.calls("WordLadderPuzzle.extensions")
+        4
+        >>> WordLadderPuzzle.extensions is original
+        True
+        >>> tracer.summary().splitlines()[0].split()
+        ['method', 'calls', 'total', 'ms', 'mean', 'us']
+        """
+        lines = ["{:<36}{:>9}{:>12}{:>10}".format("method", "calls",
+                                                 "total ms", "mean us")]
+        for (name, (calls, total)) in sorted(self.totals.items(),
+                                             key=lambda item: -item[1][1]):
+            if calls:
+                lines.append("{:<36}{:>9}{:>12.3f}{:>10.2f}".format(
+                    name, calls, total / 1e6, total / 1e3 / calls))
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path):
+        """
+        Write the sampled spans of Tracer self to the file at path as
+        Chrome trace-event JSON, with the totals of each method, for
+        chrome://tracing or Perfetto.
+
+        @type self: Tracer
+        @type path: str
+        @rtype: None
+        """
+        pid = os.getpid()
+        events = [{"name": name, "cat": "puzzle", "ph": "X", "pid": pid,
+                   "tid": thread, "ts": (start - self._origin) / 1e3,
+                   "dur": elapsed / 1e3}
+                  for (name, start, elapsed, thread) in self.spans]
+        totals = {name: {"calls": calls, "total_us": total / 1e3}
+                  for (name, (calls, total)) in self.totals.items()}
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms",
+                       "otherData": {"totals": totals}}, f)
+
+    def _replace(self, owner, name, label):
+        # Replace the attribute name of owner with a function that times
+        # each call under label.
+        #
+        # @type self: Tracer
+        # @type owner: type | module
+        # @type name: str
+        # @type label: str
+        # @rtype: None
+        original = getattr(owner, name)
+        counts = self.totals.setdefault(label, [0, 0])
+        (spans, every) = (self.spans, self.sample_every)
+
+        @wraps(original)
+        def timed(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                counts[0] += 1
+                counts[1] += elapsed
+                if counts[0] % every == 0:
+                    spans.append((label, start, elapsed,
+                                  threading.get_ident()))
+        self._replaced.append((owner, name, original))
+        setattr(owner, name, timed)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from sudoku_puzzle import SudokuPuzzle
+
+    s = SudokuPuzzle(9, ["*", "*", "*", "7", "*", "8", "*", "1", "*",
+                         "*", "*", "7", "*", "9", "*", "*", "*", "6",
+                         "9", "*", "3", "1", "*", "*", "*", "*", "*",
+                         "3", "5", "*", "8", "*", "*", "6", "*", "1",
+                         "*", "*", "*", "*", "*", "*", "*", "*", "*",
+                         "1", "*", "6", "*", "*", "9", "*", "4", "8",
+                         "*", "*", "*", "*", "*", "1", "2", "*", "7",
+                         "8", "*", "*", "*", "7", "*", "4", "*", "*",
+                         "*", "6", "*", "3", "*", "2", "*", "*", "*"],
+                     {"1", "2", "3", "4", "5", "6", "7", "8", "9"})
+    with Tracer() as tracer:
+        puzzle_tools.depth_first_solve(s)
+    print(tracer.summary())
+    tracer.write_chrome_trace("sudoku_trace.json")
@@ -0,0 +1,273 @@
+"""
+A cache of puzzle solutions that lasts across runs
+"""
+from puzzle_tools import PuzzleNode, breadth_first_solve
+from collections import OrderedDict
+import hashlib
+import json
+import sqlite3
+
+
+class SolutionCache:
+    """
+    A two-tier cache of the paths the solvers in puzzle_tools find.
+
+    Paths are keyed by the solver's mode, by default its module and
+    qualified name, and the fingerprint of the start puzzle. The most recently used paths are kept in memory as
+    puzzles; if a file is given, every path is also kept in an SQLite
+    database there as the digests of its puzzles' fingerprints, and
+    replayed through extensions when it is read back. Each tier drops
+    its least recently used paths once it is full: the memory tier past
+    memory_size paths, the database past disk_bytes bytes of stored
+    paths.
+
+    hits and misses count the lookups answered by either tier and by
+    neither.
+    """
+
+    def __init__(self, path=None, memory_size=256, disk_bytes=64 << 20):
+        """
+        Create a new SolutionCache self holding up to memory_size paths
+        in memory and, if path is given, up to disk_bytes bytes of paths
+        in the SQLite database in the file at path.
+
+        @type self: SolutionCache
+        @type path: str | None
+        @type memory_size: int
+        @type disk_bytes: int
+        @rtype: None
+        """
+        self.memory_size, self.disk_bytes = memory_size, disk_bytes
+        self.hits = self.misses = 0
+        # tuple of puzzles on the path, or None, by key; oldest first
+        self._memory = OrderedDict()
+        self._database = None
+        if path is not None:
+            self._database = sqlite3.connect(path)
+            self._database.execute(
+                "CREATE TABLE IF NOT EXISTS solutions "
+                "(key TEXT PRIMARY KEY, steps TEXT, used INTEGER)")
+            (self._clock,) = self._database.execute(
+                "SELECT COALESCE(MAX(used), 0) FROM solutions").fetchone()
+
+    def solve(self, puzzle, solver=breadth_first_solve, mode=None):
+        """
+        Return the path solver finds from PuzzleNode(puzzle) to a
+        solution, or None if there is none, using the path stored for
+        an identical puzzle and the same mode if there is one. mode
+        names what solver does; it may be left out for functions defined
+        at the top level of a module, whose module and name are used.
+
+        Raise ValueError if mode is left out for any other solver, such
+        as a lambda or a functools.partial, which could not be told
+        apart from others like it.
+
+        @type self: SolutionCache
+        @type puzzle: Puzzle
+        @type solver: (Puzzle) -> PuzzleNode | None
+        @type mode: str | None
+        @rtype: PuzzleNode | None
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+        >>> cache = SolutionCache(":memory:", memory_size=1)
+        >>> for words in [("cast", "list"), ("cast", "list"), ("mist", "cost"),
+        ...               ("cast", "list"), ("cast", "fall")]:
+        ...     node = cache.solve(WordLadderPuzzle(words[0], words[1], ws))
+        ...     path = []
+        ...     while node is not None:
+        ...         path.append(str(node.puzzle))
+        ...         node = node.children[0] if node.children else None
+        ...     print(path)
+        ['cast', 'cost', 'lost', 'list']
+        ['cast', 'cost', 'lost', 'list']
+        ['mist', 'most', 'cost']
+        ['cast', 'cost', 'lost', 'list']
+        []
+        >>> cache.hits, cache.misses
+        (2, 3)
+        >>> small = SolutionCache(":memory:", memory_size=0, disk_bytes=400)
+        >>> for words in [("cast", "list"), ("mist", "cost"), ("mist", "cost"),
+        ...               ("cast", "list")]:
+        ...     _ = small.solve(WordLadderPuzzle(words[0], words[1], ws))
+        >>> small.hits, small.misses
+        (1, 3)
+        >>> cache.solve(WordLadderPuzzle("cast", "list", ws),
+        ...             lambda puzzle: None)
+        Traceback (most recent call last):
+        ...
+        ValueError: give a mode for solver <lambda>
+        """
+        key = hashlib.sha256("{}\n{}".format(
+            _mode(solver, mode), puzzle.fingerprint()).encode(
+                "utf-8")).hexdigest()
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return _chain(self._memory[key])
+        puzzles = self._read(key, puzzle)
+        if puzzles is not False:
+            self.hits += 1
+        else:
+            self.misses += 1
+            node = solver(puzzle)
+            puzzles = None
+            if node is not None:
+                puzzles = [node.puzzle]
+                while node.children:
+                    node = node.children[0]
+                    puzzles.append(node.puzzle)
+                puzzles = tuple(puzzles)
+            self._write(key, puzzles)
+        self._memory[key] = puzzles
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+        return _chain(puzzles)
+
+    def close(self):
+        """
+        Close the database of SolutionCache self, if it has one.
+
+        @type self: SolutionCache
+        @rtype: None
+        """
+        if self._database is not None:
+            self._database.close()
+            self._database = None
+
+    def _read(self, key, puzzle):
+        # Return the puzzles on the path stored at key in the database
+        # of self, replayed from puzzle; None if no path was found for
+        # key, or False if nothing usable is stored.
+        #
+        # @type self: SolutionCache
+        # @type key: str
+        # @type puzzle: Puzzle
+        # @rtype: tuple[Puzzle] | None | bool
+        if self._database is None:
+            return False
+        row = self._database.execute(
+            "SELECT steps FROM solutions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False
+        steps = json.loads(row[0])
+        if steps is not None:
+            steps = _replay(puzzle, steps)
+            if steps is None:
+                # the puzzles have changed since the path was stored
+                self._database.execute(
+                    "DELETE FROM solutions WHERE key = ?", (key,))
+                self._database.commit()
+                return False
+        self._clock += 1
+        self._database.execute("UPDATE solutions SET used = ? WHERE key = ?",
+                               (self._clock, key))
+        self._database.commit()
+        return steps
+
+    def _write(self, key, puzzles):
+        # Store the path of puzzles, or None, at key in the database of
+        # self, dropping the least recently used paths past disk_bytes
+        # bytes of them.
+        #
+        # @type self: SolutionCache
+        # @type key: str
+        # @type puzzles: tuple[Puzzle] | None
+        # @rtype: None
+        if self._database is None:
+            return
+        steps = None if puzzles is None else [_digest(p) for p in puzzles]
+        self._clock += 1
+        self._database.execute(
+            "INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)",
+            (key, json.dumps(steps), self._clock))
+        self._database.execute(
+            "DELETE FROM solutions WHERE key IN (SELECT key FROM (SELECT "
+            "key, SUM(LENGTH(steps)) OVER (ORDER BY used DESC) AS total "
+            "FROM solutions) WHERE total > ?)", (self.disk_bytes,))
+        self._database.commit()
+
+
+def _mode(solver, mode):
+    # Return mode, or if it is None the module and qualified name of
+    # solver, raising ValueError if they don't tell it apart.
+    #
+    # @type solver: (Puzzle) -> PuzzleNode | None
+    # @type mode: str | None
+    # @rtype: str
+    if mode is not None:
+        return mode
+    name = getattr(solver, "__qualname__", None)
+    if name is None or "<" in name:
+        raise ValueError("give a mode for solver {}".format(
+            getattr(solver, "__name__", repr(solver))))
+    return "{}.{}".format(solver.__module__, name)
+
+
+def _digest(puzzle):
+    # Return the sha256 digest of the fingerprint of puzzle, in hex.
+    #
+    # @type puzzle: Puzzle
+    # @rtype: str
+    return hashlib.sha256(puzzle.fingerprint().encode("utf-8")).hexdigest()
+
+
+def _replay(puzzle, steps):
+    # Return the puzzles reached from puzzle by following the extensions
+    # whose digests are steps, or None if some step cannot be followed.
+    #
+    # @type puzzle: Puzzle
+    # @type steps: list[str]
+    # @rtype: tuple[Puzzle] | None
+    if not steps or _digest(puzzle) != steps[0]:
+        return None
+    puzzles = [puzzle]
+    for step in steps[1:]:
+        puzzle = next((extension for extension in puzzle.extensions()
+                       if _digest(extension) == step), None)
+        if puzzle is None:
+            return None
+        puzzles.append(puzzle)
+    return tuple(puzzles)
+
+
+def _chain(puzzles):
+    # Return a path of PuzzleNodes through puzzles, or None if puzzles
+    # is None.
+    #
+    # @type puzzles: tuple[Puzzle] | None
+    # @rtype: PuzzleNode | None
+    if puzzles is None:
+        return None
+    root = node = PuzzleNode(puzzles[0])
+    for puzzle in puzzles[1:]:
+        child = PuzzleNode(puzzle, parent=node)
+        node.children = [child]
+        node = child
+    return root
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from sudoku_puzzle import SudokuPuzzle
+    from time import time
+
+    s = SudokuPuzzle(9, ["*", "*", "*", "7", "*", "8", "*", "1", "*",
+                         "*", "*", "7", "*", "9", "*", "*", "*", "6",
+                         "9", "*", "3", "1", "*", "*", "*", "*", "*",
+                         "3", "5", "*", "8", "*", "*", "6", "*", "1",
+                         "*", "*", "*", "*", "*", "*", "*", "*", "*",
+                         "1", "*", "6", "*", "*", "9", "*", "4", "8",
+                         "*", "*", "*", "*", "*", "1", "2", "*", "7",
+                         "8", "*", "*", "*", "7", "*", "4", "*", "*",
+                         "*", "6", "*", "3", "*", "2", "*", "*", "*"],
+                     {"1", "2", "3", "4", "5", "6", "7", "8", "9"})
+    cache = SolutionCache("solutions.db")
+    for _ in range(2):
+        start = time()
+        cache.solve(s)
+        end = time()
+        print("Solved sudoku in {} seconds.".format(end - start))
+    print("Hits: {}, misses: {}".format(cache.hits, cache.misses))
+    cache.close()
@@ -0,0 +1,347 @@
+"""
+Solve batches of puzzles read from files, writing results as JSON lines
+
+    python solve_batch.py [FILE ...] [--format auto] [--strategy
+        breadth_first] [--nodes N] [--seconds S] [--processes P]
+
+reads puzzles from each FILE, or from standard input if there is none
+or FILE is "-", one to a line, in any of these formats:
+
+    jsonl   a puzzle as read by puzzle_io.puzzle_from_json, or an object
+            {"id": ..., "puzzle": {...}}
+    sudoku  the cells of a sudoku row by row, such as 81 characters for
+            9x9, with ".", "0" or "*" for blanks
+    lines   a word ladder as its first and last words
+
+or "auto" to tell them apart line by line. It solves them in a pool of
+processes and writes one JSON line for each as soon as it is solved:
+
+    {"id": "puzzles.txt:3", "status": "solved", "reason": null,
+     "steps": 3, "moves": ["cost", "lost", "list"], "expanded": 12,
+     "seconds": 0.01}
+
+No more than a few puzzles per process are read ahead, so memory stays
+the same however long the input is, and the puzzle modules are imported
+only by the processes that need them.
+"""
+import json
+import sys
+from time import perf_counter
+
+# symbols of sudoku lines, by size
+_SUDOKU_SYMBOLS = "123456789ABCDEFG"
+# the file of words for word ladders in this process, and its
+# WordDictionary once loaded
+_words_path, _words = "words.txt", None
+
+
+def read_puzzles(lines, fmt="auto", source="-"):
+    """
+    Yield an id and a puzzle as puzzle_io.puzzle_from_json reads it for
+    each line of lines that is not blank, in format fmt, or an id and
+    the ValueError that says why the line is not a puzzle. Ids are
+    source and the line number, unless a JSON line gives its own.
+
+    @type lines: Iterable[str]
+    @type fmt: str
+    @type source: str
+    @rtype: Iterator[(object, dict[str, object] | ValueError)]
+
+    >>> puzzles = ["cast list", "", "12*4341221434*21",
+    ...            '{"id": 7, "puzzle": {"type": "peg", "marker": ["**."]}}',
+    ...            "1 2 3"]
+    >>> for (i, puzzle) in read_puzzles(puzzles, source="x"):
+    ...     print(i, puzzle)
+    x:1 {'type': 'word_ladder', 'from_word': 'cast', 'to_word': 'list'}
+    x:3 {'type': 'sudoku', 'n': 4, 'symbols': '12*4341221434*21'}
+    7 {'type': 'peg', 'marker': ['**.']}
+    x:5 can't tell what puzzle '1 2 3' is
+    """
+    for (number, line) in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        key = "{}:{}".format(source, number)
+        try:
+            kind = fmt if fmt != "auto" else _guess_format(line)
+            if kind == "jsonl":
+                data = json.loads(line)
+                if not isinstance(data, dict):
+                    raise ValueError("a JSON line must be an object")
+                if "puzzle" in data:
+                    (key, data) = (data.get("id", key), data["puzzle"])
+                yield key, data
+            elif kind == "sudoku":
+                yield key, _sudoku(line)
+            elif kind == "lines":
+                words = line.split()
+                if len(words) != 2:
+                    raise ValueError("a word ladder is two words")
+                yield key, {"type": "word_ladder", "from_word": words[0],
+                            "to_word": words[1]}
+            else:
+                raise ValueError("unknown format {!r}".format(kind))
+        except ValueError as e:
+            yield key, e
+
+
+def solve_one(key, data, strategy="breadth_first", nodes=None,
+              seconds=None, path="moves"):
+    """
+    Return the JSON result of searching for a solution of the puzzle
+    data with key as its id, by strategy, "breadth_first" or
+    "depth_first", within nodes expanded and seconds. The result lists
+    the moves of the path found, or its puzzles if path is "full", or
+    neither if path is "none".
+
+    @type key: object
+    @type data: dict[str, object] | ValueError
+    @type strategy: str
+    @type nodes: int | None
+    @type seconds: float | None
+    @type path: str
+    @rtype: dict[str, object]
+
+    >>> ws = ["cast", "cost", "lost", "list"]
+    >>> solve_one(1, {"type": "word_ladder", "from_word": "cast",
+    ...               "to_word": "list", "words": ws})["moves"]
+    ['cost', 'lost', 'list']
+    >>> solve_one(2, ValueError("no puzzle"))
+    {'id': 2, 'status': 'error', 'reason': 'no puzzle'}
+    >>> solve_one(3, {"type": "mn", "from_grid": [["1", "2"], ["3", "4"]],
+    ...               "to_grid": [["1", "2"], ["3", "*"]]})["status"]
+    'error'
+    """
+    start = perf_counter()
+    try:
+        if isinstance(data, ValueError):
+            raise data
+        from puzzle_io import puzzle_from_json
+        import puzzle_tools
+        words = None
+        if data.get("type") == "word_ladder" and "words" not in data:
+            words = _load_words()
+        search = {"breadth_first": puzzle_tools.breadth_first_search,
+                  "depth_first": puzzle_tools.depth_first_search}[strategy]
+        result = search(puzzle_from_json(data, words),
+                        puzzle_tools.SearchBudget(nodes=nodes,
+                                                  seconds=seconds))
+    except Exception as e:
+        # a bad line must not stop the rest of the batch
+        return _error(key, e)
+    answer = {"id": key, "status": result.status, "reason": result.reason}
+    if result.status == "solved":
+        node, steps = result.path, 0
+        while node.children:
+            (node, steps) = (node.children[0], steps + 1)
+        answer["steps"] = steps
+        if path == "moves":
+            answer["moves"] = list(puzzle_tools.path_moves(result.path))
+        elif path == "full":
+            from puzzle_io import puzzle_to_json
+            answer["path"] = [puzzle_to_json(result.path.puzzle)]
+            node = result.path
+            while node.children:
+                node = node.children[0]
+                answer["path"].append(puzzle_to_json(node.puzzle))
+    answer.update(expanded=result.expanded,
+                  seconds=round(perf_counter() - start, 6))
+    return answer
+
+
+def solve_batch(puzzles, out, processes=None, **options):
+    """
+    Solve each of puzzles, pairs of an id and a puzzle as read_puzzles
+    yields them, with solve_one and options, writing each result to the
+    file out as a JSON line as soon as it is ready, and return the
+    number solved. Use processes processes, by default one for each
+    CPU, or none but this one if processes is 0. A puzzle whose search
+    fails, or whose process dies, gets an "error" line, and the rest of
+    the batch goes on.
+
+    @type puzzles: Iterable[(object, dict[str, object] | ValueError)]
+    @type out: io.TextIOBase
+    @type processes: int | None
+    @rtype: int
+
+    >>> import io
+    >>> bad_mn = ('{"type": "mn", "from_grid": [["1", "2"], ["3", "4"]], '
+    ...           '"to_grid": [["1", "2"], ["3", "*"]]}')
+    >>> out = io.StringIO()
+    >>> solve_batch(read_puzzles(["12*4341221434*21", "1*3", bad_mn]), out,
+    ...             processes=0)
+    1
+    >>> for line in out.getvalue().splitlines():
+    ...     print(json.loads(line)["status"])
+    solved
+    error
+    error
+    >>> out = io.StringIO()
+    >>> solve_batch(read_puzzles([bad_mn, "12*4341221434*21"]), out,
+    ...             processes=2)
+    1
+    >>> sorted([json.loads(line)["status"]
+    ...         for line in out.getvalue().splitlines()])
+    ['error', 'solved']
+    """
+    solved = 0
+
+    def write(answer):
+        out.write(json.dumps(answer) + "\n")
+        out.flush()
+        return answer["status"] == "solved"
+
+    if processes == 0:
+        for (key, data) in puzzles:
+            solved += write(solve_one(key, data, **options))
+        return solved
+    import os
+    from concurrent.futures import (FIRST_COMPLETED, BrokenExecutor,
+                                    ProcessPoolExecutor, wait)
+    processes = processes or os.cpu_count() or 1
+
+    def collect(futures):
+        # write the answers of futures, each against its own id even
+        # if its process died
+        count = 0
+        for future in futures:
+            key = pending.pop(future)
+            try:
+                answer = future.result()
+            except Exception as e:
+                answer = _error(key, e)
+            count += write(answer)
+        return count
+
+    def new_pool():
+        return ProcessPoolExecutor(processes, initializer=_set_words,
+                                   initargs=(_words_path,))
+
+    # id of the puzzle of each future not yet written
+    pending = {}
+    pool = new_pool()
+    try:
+        for (key, data) in puzzles:
+            if len(pending) >= 2 * processes:
+                solved += collect(wait(pending,
+                                       return_when=FIRST_COMPLETED).done)
+            try:
+                future = pool.submit(solve_one, key, data, **options)
+            except BrokenExecutor:
+                # a process of the pool died: go on with a new one
+                pool.shutdown()
+                pool = new_pool()
+                future = pool.submit(solve_one, key, data, **options)
+            pending[future] = key
+        solved += collect(wait(pending).done)
+    finally:
+        pool.shutdown()
+    return solved
+
+
+def _guess_format(line):
+    # Return the format of line: "jsonl", "sudoku" or "lines".
+    #
+    # @type line: str
+    # @rtype: str
+    if line.startswith("{"):
+        return "jsonl"
+    words = line.split()
+    if len(words) == 1 and round(len(line) ** (1 / 4)) ** 4 == len(line):
+        return "sudoku"
+    elif len(words) == 2:
+        return "lines"
+    raise ValueError("can't tell what puzzle {!r} is".format(line))
+
+
+def _sudoku(line):
+    # Return the JSON of the sudoku whose cells are line.
+    #
+    # @type line: str
+    # @rtype: dict[str, object]
+    n = round(len(line) ** (1 / 2))
+    if n * n != len(line) or n > len(_SUDOKU_SYMBOLS):
+        raise ValueError("a sudoku line can't be {} long".format(len(line)))
+    return {"type": "sudoku", "n": n,
+            "symbols": "".join(["*" if d in ".0*" else d for d in line])}
+
+
+def _error(key, error):
+    # Return the JSON result for the puzzle with id key that could not
+    # be searched because of error.
+    #
+    # @type key: object
+    # @type error: Exception
+    # @rtype: dict[str, object]
+    reason = error.args[0] if len(error.args) == 1 else None
+    return {"id": key, "status": "error",
+            "reason": reason if isinstance(reason, str) else repr(error)}
+
+
+def _set_words(path):
+    # Remember path as the file of words for the word ladders solved in
+    # this process.
+    #
+    # @type path: str
+    # @rtype: None
+    global _words_path
+    _words_path = path
+
+
+def _load_words():
+    # Return the WordDictionary of the file of words of this process,
+    # loading it the first time.
+    #
+    # @rtype: WordDictionary
+    global _words
+    if _words is None:
+        from word_ladder_puzzle import WordDictionary
+        try:
+            with open(_words_path, "r") as f:
+                _words = WordDictionary.intern(f.read().split())
+        except OSError as e:
+            raise ValueError("can't read words: {}".format(e))
+    return _words
+
+
+def _lines(paths):
+    # Yield (source, lines) for each file in paths, "-" being standard
+    # input, opening each one only when it is reached.
+    #
+    # @type paths: list[str]
+    # @rtype: Iterator[(str, Iterable[str])]
+    for path in paths or ["-"]:
+        if path == "-":
+            yield "-", sys.stdin
+        else:
+            with open(path, "r") as f:
+                yield path, f
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Solve puzzles read from files, writing JSON lines.")
+    parser.add_argument("files", nargs="*", help='files of puzzles, or "-"')
+    parser.add_argument("--format", default="auto",
+                        choices=["auto", "jsonl", "sudoku", "lines"])
+    parser.add_argument("--strategy", default="breadth_first",
+                        choices=["breadth_first", "depth_first"])
+    parser.add_argument("--nodes", type=int, default=None,
+                        help="most nodes to expand for each puzzle")
+    parser.add_argument("--seconds", type=float, default=None,
+                        help="most seconds to search each puzzle")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="0 to solve in this process")
+    parser.add_argument("--path", default="moves",
+                        choices=["moves", "full", "none"])
+    parser.add_argument("--words", default="words.txt",
+                        help="words for word ladders")
+    arguments = parser.parse_args()
+    _set_words(arguments.words)
+    puzzles = (item for (source, lines) in _lines(arguments.files)
+               for item in read_puzzles(lines, arguments.format, source))
+    solve_batch(puzzles, sys.stdout, arguments.processes,
+                strategy=arguments.strategy, nodes=arguments.nodes,
+                seconds=arguments.seconds, path=arguments.path)
@@ -0,0 +1,408 @@
+"""
+A local service that solves puzzles sent to it as JSON
+
+Each line a client sends is a request:
+
+    {"id": 1, "puzzle": {"type": "sudoku", "n": 4, "symbols": "..."},
+     "strategy": "breadth_first", "budget": {"nodes": 100000},
+     "timeout": 30}
+
+with the puzzle as read by puzzle_io.puzzle_from_json, and a budget of
+any of "nodes", "seconds" and "memory" as in puzzle_tools.SearchBudget.
+The service answers each with a line holding the same id:
+
+    {"id": 1, "status": "solved", "path": [...], "reason": null,
+     "expanded": 12, "seconds": 0.01}
+
+status is that of the puzzle_tools.SearchResult, "timeout", "busy" when
+too many requests are waiting, or "error". Answers come in the order
+their searches finish.
+"""
+from puzzle_io import puzzle_from_json, puzzle_to_json
+from puzzle_tools import (SearchBudget, breadth_first_search,
+                          depth_first_search)
+from word_ladder_puzzle import WordDictionary
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from time import time
+import asyncio
+import json
+import os
+
+# search functions by the name a request uses
+STRATEGIES = {"breadth_first": breadth_first_search,
+              "depth_first": depth_first_search}
+# the file of words of this worker process, and its WordDictionary once
+# loaded
+_words_path, _words = "words.txt", None
+
+
+class SolveService:
+    """
+    Solves the requests of clients on localhost in a pool of processes.
+
+    At most max_pending searches wait or run at once, and other requests
+    are answered "busy" at once; a connection is not read while
+    per_connection of its requests are unanswered, and is closed after
+    a request longer than max_request bytes. Puzzles are read and
+    checked in the pool, so a large one holds up no other connection.
+    Identical requests that arrive while one is searching share its
+    answer, and search again if it ran out of time before they would
+    have. Each request is answered "timeout" once its timeout runs out:
+    a search still waiting for a process is cancelled, and one already
+    running stops itself at the same deadline.
+
+    If a process of the pool dies, the requests it was searching are
+    answered "error" and the pool is replaced.
+
+    submitted counts the searches started, deduplicated the requests
+    that shared one, and rejected the requests answered "busy".
+    """
+
+    def __init__(self, processes=None, max_pending=64, per_connection=8,
+                 timeout=60.0, words_path="words.txt", max_request=1 << 20):
+        """
+        Create a new SolveService self searching in processes processes,
+        by default one per CPU, with a timeout for requests that don't
+        give their own, and words_path the file of words for word
+        ladders.
+
+        @type self: SolveService
+        @type processes: int | None
+        @type max_pending: int
+        @type per_connection: int
+        @type timeout: float
+        @type words_path: str
+        @type max_request: int
+        @rtype: None
+        """
+        self.max_pending, self.per_connection = max_pending, per_connection
+        self.timeout, self.max_request = timeout, max_request
+        self.submitted = self.deduplicated = self.rejected = 0
+        (self._processes, self._words_path) = (processes, words_path)
+        self._pool, self._closed = self._new_pool(), False
+        # [future, number of requests waiting on it, deadline, pool] of
+        # the latest search for each request key
+        self._running = {}
+
+    async def solve(self, request):
+        """
+        Return the answer of SolveService self to request.
+
+        @type self: SolveService
+        @type request: dict[str, object]
+        @rtype: dict[str, object]
+
+        >>> ws = ["cast", "cost", "lost", "list", "most", "mist"]
+        >>> puzzle = {"type": "word_ladder", "from_word": "cast",
+        ...           "to_word": "list", "words": ws}
+        >>> async def twice(service):
+        ...     return await asyncio.gather(
+        ...         service.solve({"id": 1, "puzzle": puzzle}),
+        ...         service.solve({"id": 2, "puzzle": puzzle}),
+        ...         service.solve({"id": 3, "puzzle": {"type": "chess"}}))
+        >>> service = SolveService(processes=1)
+        >>> answers = asyncio.run(twice(service))
+        >>> [step["from_word"] for step in answers[0]["path"]]
+        ['cast', 'cost', 'lost', 'list']
+        >>> answers[1]["id"], answers[1]["status"], answers[1]["expanded"]
+        (2, 'solved', 4)
+        >>> answers[2]["status"], answers[2]["reason"]
+        ('error', "unknown puzzle type 'chess'")
+        >>> service.submitted, service.deduplicated
+        (2, 1)
+        >>> async def later(service):
+        ...     return await asyncio.gather(
+        ...         service.solve({"id": 4, "puzzle": puzzle, "timeout": 0}),
+        ...         service.solve({"id": 5, "puzzle": puzzle}))
+        >>> [answer["status"] for answer in asyncio.run(later(service))]
+        ['timeout', 'solved']
+        >>> service.submitted, service.deduplicated
+        (4, 2)
+        >>> empty = {"type": "sudoku", "n": 4, "symbols": "*" * 16}
+        >>> answer = asyncio.run(service.solve(
+        ...     {"id": 6, "puzzle": empty, "budget": {"memory": 0}}))
+        >>> answer["status"], answer["reason"], answer["expanded"]
+        ('budget_exceeded', 'memory', 64)
+        >>> type(service._pool.submit(os._exit, 1).exception()).__name__
+        'BrokenProcessPool'
+        >>> asyncio.run(service.solve({"id": 7, "puzzle": puzzle}))["status"]
+        'solved'
+        >>> service.close()
+        >>> asyncio.run(service.solve({"id": 8, "puzzle": puzzle}))["reason"]
+        'cannot schedule new futures after shutdown'
+        """
+        answer = {"id": request.get("id")}
+        try:
+            timeout = float(request.get("timeout", self.timeout))
+            strategy = request.get("strategy", "breadth_first")
+            if strategy not in STRATEGIES:
+                raise ValueError("unknown strategy {!r}".format(strategy))
+            if not isinstance(request.get("puzzle"), dict):
+                raise ValueError("no puzzle")
+            budget = request.get("budget", {})
+            job = (request["puzzle"], strategy, budget.get("nodes"),
+                   budget.get("seconds"), budget.get("memory"))
+            key = json.dumps(job, sort_keys=True)
+        except (TypeError, ValueError, AttributeError) as e:
+            answer.update(status="error", reason=_reason(e))
+            return answer
+        deadline = time() + timeout
+        while True:
+            entry = self._running.get(key)
+            if entry is not None:
+                self.deduplicated += 1
+            elif len(self._running) >= self.max_pending:
+                self.rejected += 1
+                answer.update(status="busy", reason="queue full")
+                return answer
+            else:
+                try:
+                    try:
+                        pool = self._pool
+                        future = asyncio.get_running_loop().run_in_executor(
+                            pool, _search, *(job + (deadline,)))
+                    except BrokenExecutor:
+                        # a process of the pool died: go on with a new one
+                        self._replace_pool(pool)
+                        pool = self._pool
+                        future = asyncio.get_running_loop().run_in_executor(
+                            pool, _search, *(job + (deadline,)))
+                except RuntimeError as e:
+                    # the pool is closed, or broke again at once
+                    answer.update(status="error", reason=_reason(e))
+                    return answer
+                self.submitted += 1
+                entry = self._running[key] = [future, 0, deadline, pool]
+                future.add_done_callback(
+                    lambda _, entry=entry: self._running.get(key) is entry and
+                    self._running.pop(key))
+            answer.update(await self._wait(entry, deadline))
+            # a shared search may have run out of time before this
+            # request did; if so, search again for the time left
+            if answer["status"] != "timeout" or entry[2] >= deadline or \
+                    time() >= deadline:
+                return answer
+
+    async def _wait(self, entry, deadline):
+        # Return the answer of the search of entry, as [future, number
+        # of requests waiting on it, deadline, pool] in self._running,
+        # to a request with deadline, without the request's id.
+        #
+        # @type self: SolveService
+        # @type entry: list[asyncio.Future | int | float |
+        #                   ProcessPoolExecutor]
+        # @type deadline: float
+        # @rtype: dict[str, object]
+        entry[1] += 1
+        try:
+            # a little longer than the search itself, which stops itself
+            return await asyncio.wait_for(asyncio.shield(entry[0]),
+                                          deadline - time() + 1.0)
+        except asyncio.TimeoutError:
+            return {"status": "timeout", "reason": "timeout"}
+        except BrokenExecutor as e:
+            # a process of the pool died, maybe searching this puzzle, so
+            # it isn't searched again
+            self._replace_pool(entry[3])
+            return {"status": "error", "reason": _reason(e)}
+        except Exception as e:
+            # the search failed, or its process died
+            return {"status": "error", "reason": _reason(e)}
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not entry[0].done():
+                # nobody is waiting: don't start it if it hasn't started
+                entry[0].cancel()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        """
+        Answer requests sent to SolveService self on the TCP port port
+        of host until cancelled.
+
+        @type self: SolveService
+        @type host: str
+        @type port: int
+        @rtype: None
+        """
+        server = await asyncio.start_server(self._connection, host, port,
+                                            limit=self.max_request)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        """
+        Stop the processes of SolveService self.
+
+        @type self: SolveService
+        @rtype: None
+        """
+        self._closed = True
+        self._pool.shutdown(cancel_futures=True)
+
+    def _new_pool(self):
+        # Return a new pool of processes for SolveService self.
+        #
+        # @type self: SolveService
+        # @rtype: ProcessPoolExecutor
+        return ProcessPoolExecutor(self._processes, initializer=_set_words,
+                                   initargs=(self._words_path,))
+
+    def _replace_pool(self, broken):
+        # Replace the pool broken of SolveService self, one of whose
+        # processes died, unless it has been replaced already or self is
+        # closed.
+        #
+        # @type self: SolveService
+        # @type broken: ProcessPoolExecutor
+        # @rtype: None
+        if self._pool is broken and not self._closed:
+            broken.shutdown(wait=False)
+            self._pool = self._new_pool()
+
+    async def _connection(self, reader, writer):
+        # Answer the requests read from reader by writing to writer,
+        # reading no more while per_connection are unanswered.
+        #
+        # @type self: SolveService
+        # @type reader: asyncio.StreamReader
+        # @type writer: asyncio.StreamWriter
+        # @rtype: None
+        slots = asyncio.Semaphore(self.per_connection)
+        tasks = set()
+
+        async def answer(line):
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("a request must be a JSON object")
+                result = await self.solve(request)
+            except Exception as e:
+                result = {"id": None, "status": "error", "reason": _reason(e)}
+            finally:
+                slots.release()
+            writer.write(json.dumps(result).encode("utf-8") + b"\n")
+            await writer.drain()
+
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # longer than max_request: the rest of it can't be
+                    # told from the next request, so stop reading
+                    slots.release()
+                    writer.write(json.dumps(
+                        {"id": None, "status": "error",
+                         "reason": "request too long"}).encode("utf-8") +
+                        b"\n")
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    slots.release()
+                    continue
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.wait(tasks)
+        except ConnectionError:
+            pass
+        finally:
+            for task in tasks:
+                task.cancel()
+            writer.close()
+
+
+def _search(data, strategy, nodes, seconds, memory, deadline):
+    # Return the answer to a request to search for a solution of the
+    # puzzle data with the strategy named strategy, within nodes
+    # expanded, seconds and memory bytes, stopping at the time deadline.
+    # This runs in a process of the pool, which also reads the puzzle.
+    #
+    # @type data: dict[str, object]
+    # @type strategy: str
+    # @type nodes: int | None
+    # @type seconds: float | None
+    # @type memory: int | None
+    # @type deadline: float
+    # @rtype: dict[str, object]
+    left = deadline - time()
+    if left <= 0:
+        return {"status": "timeout", "reason": "timeout"}
+    words = None
+    if data.get("type") == "word_ladder" and "words" not in data:
+        words = _load_words()
+    result = STRATEGIES[strategy](
+        puzzle_from_json(data, words),
+        SearchBudget(nodes=nodes, seconds=left if seconds is None
+                     else min(seconds, left), memory=memory))
+    path, node = [], result.path
+    while node is not None:
+        path.append(puzzle_to_json(node.puzzle))
+        node = node.children[0] if node.children else None
+    reason = result.reason
+    if reason == "seconds" and (seconds is None or seconds > left):
+        (status, reason) = ("timeout", "timeout")
+    else:
+        status = result.status
+    return {"status": status, "path": path, "reason": reason,
+            "expanded": result.expanded, "seconds": result.seconds}
+
+
+def _set_words(path):
+    # Remember path as the file of words for the word ladders solved in
+    # this process.
+    #
+    # @type path: str
+    # @rtype: None
+    global _words_path
+    _words_path = path
+
+
+def _load_words():
+    # Return the WordDictionary of the file of words of this process,
+    # loading it the first time, or None if there is no such file.
+    #
+    # @rtype: WordDictionary | None
+    global _words
+    if _words is None and os.path.exists(_words_path):
+        with open(_words_path, "r") as f:
+            _words = WordDictionary.intern(f.read().split())
+    return _words
+
+
+def _reason(error):
+    # Return the message of error.
+    #
+    # @type error: Exception
+    # @rtype: str
+    return error.args[0] if len(error.args) == 1 else repr(error)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Solve puzzles sent as "
+                                                 "JSON lines over TCP.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--max-pending", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--words", default="words.txt")
+    parser.add_argument("--max-request", type=int, default=1 << 20,
+                        help="longest request line in bytes")
+    arguments = parser.parse_args()
+    service = SolveService(arguments.processes, arguments.max_pending,
+                           timeout=arguments.timeout,
+                           words_path=arguments.words,
+                           max_request=arguments.max_request)
+    try:
+        asyncio.run(service.serve("127.0.0.1", arguments.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
@@ -4,7 +4,10 @@ from puzzle import Puzzle
 class SudokuPuzzle(Puzzle):
     """
     A sudoku puzzle that may be solved, unsolved, or even unsolvable.
+
+    Its symbols are an immutable tuple, hashed once when first needed.
     """
+    __slots__ = ("_n", "_symbols", "_symbol_set", "_hash")
 
     def __init__(self, n, symbols, symbol_set):
         """
@@ -13,15 +16,17 @@ class SudokuPuzzle(Puzzle):
 
         @type self: SudokuPuzzle
         @type n: int
-        @type symbols: list[str]
-        @type symbol_set: set[str]
+        @type symbols: list[str] | tuple[str]
+        @type symbol_set: set[str] | frozenset[str]
         """
         assert n > 0
         assert round(n ** (1 / 2)) * round(n ** (1 / 2)) == n
-        assert all([d in (symbol_set | {"*"}) for d in symbols])
+        assert all([d == "*" or d in symbol_set for d in symbols])
         assert len(symbol_set) == n
         assert len(symbols) == n ** 2
-        self._n, self._symbols, self._symbol_set = n, symbols, symbol_set
+        self._n, self._symbols = n, tuple(symbols)
+        # the extensions of a puzzle share its frozenset
+        self._symbol_set, self._hash = frozenset(symbol_set), None
 
     def __eq__(self, other):
         """
@@ -51,9 +56,27 @@ class SudokuPuzzle(Puzzle):
         >>> s1.__eq__(s3)
         False
         """
-        return (type(other) == type(self) and
-                self._n == other._n and self._symbols == other._symbols and
-                self._symbol_set == other._symbol_set)
+        return self is other or (
+            type(other) == type(self) and hash(self) == hash(other) and
+            self._symbols == other._symbols and
+            (self._symbol_set is other._symbol_set or
+             self._symbol_set == other._symbol_set))
+
+    def __hash__(self):
+        """
+        Return a hash of SudokuPuzzle self, consistent with __eq__.
+
+        @type self: SudokuPuzzle
+        @rtype: int
+
+        >>> s1 = SudokuPuzzle(4, list("AB**") + ["*"] * 12, set("ABCD"))
+        >>> s2 = SudokuPuzzle(4, list("AB**") + ["*"] * 12, set("ABCD"))
+        >>> len({s1, s2})
+        1
+        """
+        if self._hash is None:
+            self._hash = hash(self._symbols)
+        return self._hash
 
     def __str__(self):
         """
@@ -178,9 +201,89 @@ class SudokuPuzzle(Puzzle):
             # list of SudokuPuzzles with each legal digit at position i
             return (
                 [SudokuPuzzle(n,
-                 symbols[:i] + [d] + symbols[i + 1:], symbol_set)
+                 symbols[:i] + (d,) + symbols[i + 1:], symbol_set)
                  for d in allowed_symbols])
 
+    def canonical_key(self):
+        """
+        Return the same key for SudokuPuzzle self and every relabelling
+        of its symbols, which can't change whether it can be solved.
+
+        Symbols are renamed by order of first appearance.
+
+        @type self: SudokuPuzzle
+        @rtype: tuple[int]
+
+        >>> s1 = SudokuPuzzle(4, ["A", "B"] + ["*"] * 14, {"A", "B", "C", "D"})
+        >>> s2 = SudokuPuzzle(4, ["C", "A"] + ["*"] * 14, {"A", "B", "C", "D"})
+        >>> s1.canonical_key() == s2.canonical_key()
+        True
+        """
+        names = {"*": 0}
+        return tuple([names.setdefault(d, len(names))
+                      for d in self._symbols])
+
+    def context(self):
+        """
+        Return the size and the sorted symbols of SudokuPuzzle self.
+
+        @type self: SudokuPuzzle
+        @rtype: (int, tuple[str])
+        """
+        return (self._n, tuple(sorted(self._symbol_set)))
+
+    def to_bytes(self):
+        """
+        Return the symbols of SudokuPuzzle self as bytes, one for each
+        cell: 0 for "*", or else 1 more than the symbol's place in
+        sorted order.
+
+        @type self: SudokuPuzzle
+        @rtype: bytes
+
+        >>> s = SudokuPuzzle(4, list("12*4341221434*21"), set("1234"))
+        >>> s.to_bytes()
+        b'\\x01\\x02\\x00\\x04\\x03\\x04\\x01\\x02\\x02\\x01\\x04\\x03\\x04\\x00\\x02\\x01'
+        >>> SudokuPuzzle.from_bytes(s.context(), s.to_bytes()) == s
+        True
+        """
+        codes = {d: i + 1 for (i, d) in enumerate(sorted(self._symbol_set))}
+        codes["*"] = 0
+        return bytes([codes[d] for d in self._symbols])
+
+    @staticmethod
+    def from_bytes(context, data):
+        """
+        Return the SudokuPuzzle with context whose symbols to_bytes
+        wrote as data.
+
+        @type context: (int, tuple[str])
+        @type data: bytes
+        @rtype: SudokuPuzzle
+        """
+        (n, symbols) = context
+        names = ("*",) + symbols
+        return SudokuPuzzle(n, [names[i] for i in data], set(symbols))
+
+    def describe_move(self, extension):
+        """
+        Return the (row, column) of the cell extension fills in
+        SudokuPuzzle self, and its symbol.
+
+        @type self: SudokuPuzzle
+        @type extension: SudokuPuzzle
+        @rtype: str
+
+        >>> s = SudokuPuzzle(4, list("12*4341221434*21"), set("1234"))
+        >>> s.describe_move(s.extensions()[0])
+        '(0, 2)=3'
+        """
+        i = next(i for (i, (d, e)) in enumerate(zip(self._symbols,
+                                                     extension._symbols))
+                 if d != e)
+        return "({}, {})={}".format(i // self._n, i % self._n,
+                                    extension._symbols[i])
+
     # TODO
     # override fail_fast
     def fail_fast(self):
@@ -0,0 +1,317 @@
+"""
+A compiled, memory-mapped graph of the one-letter steps between words
+
+compile_word_graph turns a word list into a binary file. The file holds
+the sorted words and, in compressed sparse row form, the neighbours of
+each one as found by WordDictionary. load_word_graph maps that file
+read-only, so processes loading the same file share its pages, and it
+recompiles the file first if it is missing or stale.
+
+File layout, in native byte order, 4-byte aligned:
+    header: magic, format version, number of words, number of edges,
+            length of the word text, sha256 of the source list
+    word offsets: number of words + 1 uint32 into the word text
+    word text: the sorted words in UTF-8, back to back
+    edge offsets: number of words + 1 uint32 into the edges
+    edges: uint32 word numbers of each word's neighbours in turn
+"""
+from word_ladder_puzzle import WordDictionary
+from bisect import bisect_left
+from array import array
+import hashlib
+import mmap
+import os
+import struct
+
+_MAGIC = b"WLGRAPH\0"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("=8sIIII32s")
+
+# WordGraph of each file opened so far, by real path
+_OPEN = {}
+
+
+class WordGraph:
+    """
+    A read-only, memory-mapped graph of words, where two words are
+    joined when a word ladder can step from one to the other.
+
+    It answers "in" and neighbours like a WordDictionary, so it can be
+    passed to WordLadderPuzzle in place of a word set. Word numbers
+    follow the sorted order of the words.
+    """
+    # letters a step may change to, as for WordLadderPuzzle
+    chars = "abcdefghijklmnopqrstuvwxyz"
+
+    def __init__(self, path):
+        """
+        Create a new WordGraph self over the compiled file at path.
+
+        @type self: WordGraph
+        @type path: str
+        @rtype: None
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, n, edges, text, self.checksum) = \
+            _HEADER.unpack_from(self._map)
+        assert magic == _MAGIC and version == FORMAT_VERSION
+        view, at = memoryview(self._map), _HEADER.size
+        self._word_offsets = view[at:at + 4 * (n + 1)].cast("I")
+        at += 4 * (n + 1)
+        self._text = view[at:at + text]
+        at += _padded(text)
+        self._edge_offsets = view[at:at + 4 * (n + 1)].cast("I")
+        at += 4 * (n + 1)
+        self._edges = view[at:at + 4 * edges].cast("I")
+
+    def __len__(self):
+        """
+        Return the number of words in WordGraph self.
+
+        @type self: WordGraph
+        @rtype: int
+        """
+        return len(self._word_offsets) - 1
+
+    def __contains__(self, word):
+        """
+        Return whether word is in WordGraph self.
+
+        @type self: WordGraph
+        @type word: str
+        @rtype: bool
+        """
+        return self.number(word) is not None
+
+    def __iter__(self):
+        """
+        Return an iterator over the words of WordGraph self, in order.
+
+        @type self: WordGraph
+        @rtype: iterator[str]
+        """
+        return (self.word(i) for i in range(len(self)))
+
+    def __getitem__(self, i):
+        """
+        Return the word numbered i in WordGraph self; this lets bisect
+        search the words.
+
+        @type self: WordGraph
+        @type i: int
+        @rtype: str
+        """
+        return self.word(i)
+
+    def __reduce__(self):
+        """
+        Return how to pickle WordGraph self: by the path of its file.
+
+        @type self: WordGraph
+        @rtype: tuple
+        """
+        return load_word_graph, (self.path,)
+
+    def digest(self):
+        """
+        Return the sha256 digest of the word list WordGraph self was
+        compiled from, in hex.
+
+        @type self: WordGraph
+        @rtype: str
+        """
+        return self.checksum.hex()
+
+    def word(self, i):
+        """
+        Return the word numbered i in WordGraph self.
+
+        @type self: WordGraph
+        @type i: int
+        @rtype: str
+        """
+        offsets = self._word_offsets
+        return str(self._text[offsets[i]:offsets[i + 1]], "utf-8")
+
+    def number(self, word):
+        """
+        Return the number of word in WordGraph self, or None if it is
+        not there.
+
+        @type self: WordGraph
+        @type word: str
+        @rtype: int | None
+        """
+        i = bisect_left(self, word, 0, len(self))
+        return i if i < len(self) and self.word(i) == word else None
+
+    def neighbour_numbers(self, i):
+        """
+        Return the numbers of the neighbours of the word numbered i in
+        WordGraph self.
+
+        @type self: WordGraph
+        @type i: int
+        @rtype: memoryview
+        """
+        return self._edges[self._edge_offsets[i]:self._edge_offsets[i + 1]]
+
+    def neighbours(self, word):
+        """
+        Return the words of WordGraph self one step away from word, in
+        the order WordDictionary.neighbours gives them. A word missing
+        from self, such as the start of a ladder, is looked up letter by
+        letter instead.
+
+        @type self: WordGraph
+        @type word: str
+        @rtype: list[str]
+        """
+        i = self.number(word)
+        if i is not None:
+            return [self.word(j) for j in self.neighbour_numbers(i)]
+        result = []
+        for i in range(len(word)):
+            for char in self.chars:
+                other = word[:i] + char + word[i + 1:]
+                if other != word and other in self:
+                    result.append(other)
+        return result
+
+
+def source_checksum(source_path):
+    """
+    Return the sha256 digest of the word list at source_path, which a
+    compiled file records so that it can tell when it is stale.
+
+    @type source_path: str
+    @rtype: bytes
+    """
+    digest = hashlib.sha256()
+    with open(source_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.digest()
+
+
+def compile_word_graph(source_path, graph_path):
+    """
+    Compile the whitespace-separated word list at source_path into a
+    word graph file at graph_path.
+
+    The file is written beside graph_path first and then renamed, so
+    readers never see half of it.
+
+    @type source_path: str
+    @type graph_path: str
+    @rtype: None
+    """
+    with open(source_path, "r") as f:
+        words = sorted(set(f.read().split()))
+    dictionary = WordDictionary.intern(words, WordGraph.chars)
+    number = {word: i for (i, word) in enumerate(words)}
+    text, word_offsets = bytearray(), array("I", [0])
+    edges, edge_offsets = array("I"), array("I", [0])
+    for word in words:
+        text += word.encode("utf-8")
+        word_offsets.append(len(text))
+        edges.extend([number[other] for other in dictionary.neighbours(word)])
+        edge_offsets.append(len(edges))
+    text += bytes(_padded(len(text)) - len(text))
+    header = _HEADER.pack(_MAGIC, FORMAT_VERSION, len(words), len(edges),
+                          word_offsets[-1], source_checksum(source_path))
+    temporary = "{}.{}.tmp".format(graph_path, os.getpid())
+    with open(temporary, "wb") as f:
+        f.write(header)
+        f.write(word_offsets.tobytes())
+        f.write(text)
+        f.write(edge_offsets.tobytes())
+        f.write(edges.tobytes())
+    os.replace(temporary, graph_path)
+
+
+def load_word_graph(graph_path, source_path=None):
+    """
+    Return the WordGraph in the file at graph_path, the same object for
+    each path while the file is unchanged.
+
+    If source_path is given, first compile it into graph_path when that
+    file is missing, of another format version, or compiled from a
+    different word list.
+
+    @type graph_path: str
+    @type source_path: str | None
+    @rtype: WordGraph
+
+    >>> import tempfile
+    >>> folder = tempfile.mkdtemp()
+    >>> source = os.path.join(folder, "words.txt")
+    >>> with open(source, "w") as f:
+    ...     _ = f.write("cost most cast mist Cost list")
+    >>> g = load_word_graph(os.path.join(folder, "words.graph"), source)
+    >>> len(g), "mist" in g, "mast" in g
+    (6, True, False)
+    >>> g.neighbours("most"), g.neighbours("mast")
+    (['cost', 'mist'], ['cast', 'mist', 'most'])
+    >>> g is load_word_graph(os.path.join(folder, "words.graph"), source)
+    True
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> from puzzle_tools import breadth_first_solve
+    >>> node = breadth_first_solve(WordLadderPuzzle("cast", "list", g))
+    >>> while node.children:
+    ...     node = node.children[0]
+    >>> print(node.puzzle)
+    list
+    """
+    if source_path is not None and not _is_current(graph_path, source_path):
+        compile_word_graph(source_path, graph_path)
+    key = os.path.realpath(graph_path)
+    stamp = os.stat(key).st_mtime_ns
+    if key not in _OPEN or _OPEN[key][0] != stamp:
+        _OPEN[key] = (stamp, WordGraph(graph_path))
+    return _OPEN[key][1]
+
+
+def _is_current(graph_path, source_path):
+    # Return whether the file at graph_path is a word graph of this
+    # format version compiled from the word list at source_path.
+    #
+    # @type graph_path: str
+    # @type source_path: str
+    # @rtype: bool
+    try:
+        with open(graph_path, "rb") as f:
+            header = f.read(_HEADER.size)
+    except OSError:
+        return False
+    if len(header) < _HEADER.size:
+        return False
+    (magic, version, _, _, _, checksum) = _HEADER.unpack(header)
+    return (magic == _MAGIC and version == FORMAT_VERSION and
+            checksum == source_checksum(source_path))
+
+
+def _padded(length):
+    # Return length rounded up to a multiple of 4.
+    #
+    # @type length: int
+    # @rtype: int
+    return (length + 3) // 4 * 4
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from time import time
+
+    start = time()
+    graph = load_word_graph("words.graph", "words.txt")
+    end = time()
+    print("Loaded {} words in {} seconds.".format(len(graph), end - start))
+    start = time()
+    print(graph.neighbours("same"))
+    end = time()
+    print("Looked up the neighbours of same in {} seconds.".format(
+        end - start))
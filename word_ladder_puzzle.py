@@ -1,26 +1,230 @@
 from puzzle import Puzzle
 from time import time
+import hashlib
+import weakref
+
+
+class WordDictionary:
+    """
+    An immutable dictionary of words for word ladders, interned so that
+    equal word sets share one WordDictionary: its words, their
+    partitions by length and a NeighbourIndex over them.
+
+    Get one with WordDictionary.intern, and compare them with "is".
+    """
+    __slots__ = ("words", "chars", "index", "_lengths", "_digest",
+                 "__weakref__")
+
+    def __init__(self, words, chars):
+        """
+        Create a new WordDictionary self of words, where a step may
+        change a letter to any of chars. Use WordDictionary.intern
+        rather than calling this directly.
+
+        @type self: WordDictionary
+        @type words: frozenset[str]
+        @type chars: str
+        @rtype: None
+        """
+        self.words, self.chars = words, chars
+        # words of each length asked for so far
+        self._lengths = {}
+        self._digest = None
+        self.index = NeighbourIndex(self)
+
+    @staticmethod
+    def intern(ws, chars="abcdefghijklmnopqrstuvwxyz"):
+        """
+        Return the WordDictionary of the words in ws, the same object
+        for every equal ws and chars. Return ws if it already finds
+        neighbours itself, as a WordDictionary or a word_graph.WordGraph
+        does.
+
+        @type ws: set[str] | WordDictionary | WordGraph
+        @type chars: str
+        @rtype: WordDictionary | WordGraph
+
+        >>> d = WordDictionary.intern({"cost", "most"})
+        >>> d is WordDictionary.intern({"most", "cost"})
+        True
+        >>> WordDictionary.intern(d) is d
+        True
+        """
+        if hasattr(ws, "neighbours"):
+            return ws
+        key = (frozenset(ws), chars)
+        result = _INTERNED.get(key)
+        if result is None:
+            result = WordDictionary(key[0], chars)
+            _INTERNED[key] = result
+        return result
+
+    def __contains__(self, word):
+        """
+        Return whether word is in WordDictionary self.
+
+        @type self: WordDictionary
+        @type word: str
+        @rtype: bool
+        """
+        return word in self.words
+
+    def __len__(self):
+        """
+        Return the number of words in WordDictionary self.
+
+        @type self: WordDictionary
+        @rtype: int
+        """
+        return len(self.words)
+
+    def __reduce__(self):
+        """
+        Return how to pickle WordDictionary self so that it is interned
+        again when unpickled.
+
+        @type self: WordDictionary
+        @rtype: tuple
+        """
+        return WordDictionary.intern, (self.words, self.chars)
+
+    def digest(self):
+        """
+        Return a sha256 digest of the words and chars of WordDictionary
+        self, the same in every run.
+
+        @type self: WordDictionary
+        @rtype: str
+        """
+        if self._digest is None:
+            text = "{}\n{}".format(self.chars, "\n".join(sorted(self.words)))
+            self._digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return self._digest
+
+    def words_of_length(self, length):
+        """
+        Return the words of WordDictionary self with length letters.
+
+        @type self: WordDictionary
+        @type length: int
+        @rtype: frozenset[str]
+
+        >>> sorted(WordDictionary.intern({"a", "be", "at"}).words_of_length(2))
+        ['at', 'be']
+        """
+        if length not in self._lengths:
+            self._lengths[length] = frozenset(
+                [word for word in self.words if len(word) == length])
+        return self._lengths[length]
+
+    def neighbours(self, word):
+        """
+        Return the words of WordDictionary self one step away from word.
+
+        @type self: WordDictionary
+        @type word: str
+        @rtype: list[str]
+        """
+        return self.index.neighbours(word)
+
+
+# WordDictionary of each (word set, chars) still in use
+_INTERNED = weakref.WeakValueDictionary()
+
+
+class NeighbourIndex:
+    """
+    The words of a dictionary bucketed by wildcard pattern, so that the
+    words one letter away from a word can be found without scanning the
+    dictionary. "s_me" buckets "same", "sime" and "some", for example.
+
+    Buckets for each word length are built the first time a word of
+    that length is looked up.
+    """
+
+    def __init__(self, dictionary):
+        """
+        Create a new NeighbourIndex self for the words of dictionary.
+
+        @type self: NeighbourIndex
+        @type dictionary: WordDictionary
+        @rtype: None
+        """
+        self._dictionary = dictionary
+        # buckets of each word length built so far
+        self._buckets = {}
+
+    def neighbours(self, word):
+        """
+        Return the words of NeighbourIndex self that differ from word in
+        exactly one position, where they have one of the dictionary's
+        chars.
+
+        The words come by position of the change, then alphabetically.
+
+        @type self: NeighbourIndex
+        @type word: str
+        @rtype: list[str]
+
+        >>> d = WordDictionary.intern({"cost", "cast", "most", "mist", "Cost"})
+        >>> d.index.neighbours("cost")
+        ['most', 'cast']
+        """
+        if len(word) not in self._buckets:
+            self._buckets[len(word)] = self._bucket_words(len(word))
+        buckets, result = self._buckets[len(word)], []
+        for i in range(len(word)):
+            for other in buckets.get(word[:i] + "_" + word[i + 1:], []):
+                if other != word:
+                    result.append(other)
+        return result
+
+    def _bucket_words(self, length):
+        # Return the words of self with this length bucketed by
+        # wildcard pattern, each bucket in alphabetical order of the
+        # letter the wildcard stands for.
+        #
+        # @type self: NeighbourIndex
+        # @type length: int
+        # @rtype: dict[str, list[str]]
+        buckets, chars = {}, self._dictionary.chars
+        for word in self._dictionary.words_of_length(length):
+            for i in range(length):
+                if word[i] in chars:
+                    pattern = word[:i] + "_" + word[i + 1:]
+                    buckets.setdefault(pattern, []).append(word)
+        for pattern in buckets:
+            i = pattern.index("_")
+            buckets[pattern].sort(key=lambda w: w[i])
+        return buckets
+
 
 class WordLadderPuzzle(Puzzle):
     """
     A word-ladder puzzle that may be solved, unsolved, or even unsolvable.
     """
 
+    __slots__ = ("_from_word", "_to_word", "_dictionary")
+    # set of characters to use for 1-character changes
+    _chars = "abcdefghijklmnopqrstuvwxyz"
+
     def __init__(self, from_word, to_word, ws):
         """
         Create a new word-ladder puzzle with the aim of stepping
         from from_word to to_word using words in ws, changing one
         character at each step.
 
+        ws is interned as a WordDictionary; pass the WordDictionary
+        itself, or a WordGraph loaded by word_graph.load_word_graph, to
+        skip that when making many puzzles.
+
         @type from_word: str
         @type to_word: str
-        @type ws: set[str]
+        @type ws: set[str] | WordDictionary | WordGraph
         @rtype: None
         """
-        (self._from_word, self._to_word, self._word_set) = (from_word,
-                                                            to_word, ws)
-        # set of characters to use for 1-character changes
-        self._chars = "abcdefghijklmnopqrstuvwxyz"
+        (self._from_word, self._to_word, self._dictionary) = (
+            from_word, to_word, WordDictionary.intern(ws, self._chars))
 
         # TODO
         # implement __eq__ and __str__
@@ -42,7 +246,17 @@ class WordLadderPuzzle(Puzzle):
         """
         return (type(self) == type(other) and self._from_word ==
                 other._from_word and self._to_word == other._to_word and
-                self._word_set == other._word_set)
+                self._dictionary is other._dictionary)
+
+    def __hash__(self):
+        """
+        Return a hash of WordLadderPuzzle self, consistent with __eq__.
+
+        @type self: WordLadderPuzzle
+        @rtype: int
+        """
+        return hash((self._from_word, self._to_word, id(self._dictionary)))
+
         # __repr__ is up to you
 
     def __str__(self):
@@ -58,6 +272,75 @@ class WordLadderPuzzle(Puzzle):
         """
         return self._from_word
 
+    def fingerprint(self):
+        """
+        Return a string that identifies WordLadderPuzzle self, the same
+        in every run.
+
+        @type self: WordLadderPuzzle
+        @rtype: str
+
+        >>> w = WordLadderPuzzle("same", "cost", {"most"})
+        >>> w.fingerprint() == WordLadderPuzzle("same", "cost", {"most"}
+        ...                                     ).fingerprint()
+        True
+        >>> w.fingerprint() == WordLadderPuzzle("same", "cast", {"most"}
+        ...                                     ).fingerprint()
+        False
+        """
+        return "WordLadderPuzzle\n{}\n{}\n{}".format(
+            self._from_word, self._to_word, self._dictionary.digest())
+
+    def context(self):
+        """
+        Return the goal word and the dictionary of WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @rtype: (str, WordDictionary | WordGraph)
+        """
+        return (self._to_word, self._dictionary)
+
+    def to_bytes(self):
+        """
+        Return the current word of WordLadderPuzzle self in UTF-8.
+
+        @type self: WordLadderPuzzle
+        @rtype: bytes
+
+        >>> w = WordLadderPuzzle("same", "cost", {"most"})
+        >>> w.to_bytes()
+        b'same'
+        >>> WordLadderPuzzle.from_bytes(w.context(), w.to_bytes()) == w
+        True
+        """
+        return self._from_word.encode("utf-8")
+
+    @staticmethod
+    def from_bytes(context, data):
+        """
+        Return the WordLadderPuzzle with context whose current word
+        to_bytes wrote as data.
+
+        @type context: (str, WordDictionary | WordGraph)
+        @type data: bytes
+        @rtype: WordLadderPuzzle
+        """
+        return WordLadderPuzzle(data.decode("utf-8"), context[0], context[1])
+
+    def describe_move(self, extension):
+        """
+        Return the word extension of WordLadderPuzzle self steps to.
+
+        @type self: WordLadderPuzzle
+        @type extension: WordLadderPuzzle
+        @rtype: str
+
+        >>> w = WordLadderPuzzle("cost", "most", {"most"})
+        >>> w.describe_move(w.extensions()[0])
+        'most'
+        """
+        return extension._from_word
+
         # TODO
         # override extensions
         # legal extensions are WordLadderPuzzles that have a from_word that can
@@ -83,26 +366,8 @@ class WordLadderPuzzle(Puzzle):
         >>> all([s in L1 for s in L2])
         True
         """
-        extension = []
-        cur_word, ws = self._from_word, self._word_set
-        result, lst = [], []
-        for x in ws:
-            if len(x) == len(cur_word):
-                result.append(x)
-        for i in range(len(cur_word)):
-            for ch in self._chars:
-                temp = list(cur_word)[:]
-                temp[i] = ch
-                new_word = "".join(temp)
-                if new_word in result and new_word != cur_word:
-                    extension.append(WordLadderPuzzle(new_word, self._to_word,
-                                                      self._word_set))
-
-        #         lst.append("".join(temp))
-
-        # common = lst.intersection(result) - {self._from_word}
-        return extension
-
+        return [WordLadderPuzzle(word, self._to_word, self._dictionary)
+                for word in self._dictionary.neighbours(self._from_word)]
 
         # TODO
         # override is_solved
@@ -125,7 +390,7 @@ if __name__ == '__main__':
     from puzzle_tools import breadth_first_solve, depth_first_solve
     from time import time
     with open("words.txt", "r") as words:
-        word_set = set(words.read().split())
+        word_set = WordDictionary.intern(words.read().split())
     w = WordLadderPuzzle("same", "cost", word_set)
     start = time()
     sol = breadth_first_solve(w)
@@ -0,0 +1,213 @@
+"""
+Some functions for working with many word ladders at once
+"""
+from puzzle_tools import Meter, SearchBudget
+from word_ladder_puzzle import WordDictionary, WordLadderPuzzle
+
+
+def ladder_parents(from_word, ws, to_words=None, budget=None):
+    """
+    Return the shortest-ladder DAG from from_word over the words of ws:
+    a dict from each word reached to the list of words one step before
+    it on some shortest ladder. The DAG covers every word reachable from
+    from_word, or stops after the level where the last of to_words, if
+    given, is reached. Each word whose neighbours are looked up counts
+    as a node expanded against budget, if it is given; raise
+    BudgetExceeded if it runs out.
+
+    @type from_word: str
+    @type ws: set[str] | WordDictionary | WordGraph
+    @type to_words: set[str] | None
+    @type budget: SearchBudget | None
+    @rtype: dict[str, list[str]]
+
+    >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+    >>> parents = ladder_parents("cast", ws)
+    >>> parents["lost"], parents["list"], parents["mist"]
+    (['cost'], ['lost'], ['most'])
+    >>> ladder_parents("cast", ws, budget=SearchBudget(nodes=2))
+    Traceback (most recent call last):
+    ...
+    puzzle_tools.BudgetExceeded: nodes budget exceeded after 2 nodes
+    """
+    dictionary = WordDictionary.intern(ws, WordLadderPuzzle._chars)
+    parents, level = {from_word: []}, [from_word]
+    left = None if to_words is None else set(to_words) - {from_word}
+    (meter, depth) = (Meter(budget), 0)
+    while level and left != set():
+        reached = {}
+        for word in level:
+            neighbours = dictionary.neighbours(word)
+            for other in neighbours:
+                if other not in parents:
+                    reached.setdefault(other, []).append(word)
+            meter.spend(len(neighbours), len(level) + len(reached), depth)
+            meter.check()
+        depth += 1
+        parents.update(reached)
+        if left is not None:
+            left.difference_update(reached)
+        level = list(reached)
+    return parents
+
+
+def ladders_to(parents, to_word, limit=None):
+    """
+    Yield the shortest ladders to to_word in the DAG parents made by
+    ladder_parents, at most limit of them if it is given.
+
+    Each ladder takes time in proportion to its length, and none is
+    built before it is asked for.
+
+    @type parents: dict[str, list[str]]
+    @type to_word: str
+    @type limit: int | None
+    @rtype: iterator[list[str]]
+    """
+    if to_word not in parents or limit == 0:
+        return
+    count, path, stack = 0, [to_word], [iter(parents[to_word])]
+    if not parents[to_word]:
+        yield path
+        return
+    while stack:
+        word = next(stack[-1], None)
+        if word is None:
+            stack.pop()
+            path.pop()
+        elif parents[word]:
+            path.append(word)
+            stack.append(iter(parents[word]))
+        else:
+            yield (path + [word])[::-1]
+            count += 1
+            if count == limit:
+                return
+
+
+def all_shortest_ladders(from_word, to_word, ws, limit=None, budget=None):
+    """
+    Yield every shortest ladder from from_word to to_word using words
+    in ws, at most limit of them if it is given.
+
+    A single breadth-first search finds all of them. It runs from
+    from_word only: steps are one-way for words with letters outside
+    WordLadderPuzzle's chars, so a search back from to_word would need
+    an index of the reverse steps too. The search keeps within budget,
+    if it is given, and raises BudgetExceeded before any ladder is
+    yielded if it runs out.
+
+    @type from_word: str
+    @type to_word: str
+    @type ws: set[str] | WordDictionary | WordGraph
+    @type limit: int | None
+    @type budget: SearchBudget | None
+    @rtype: iterator[list[str]]
+
+    >>> ws = {"cost", "most", "cast", "mist", "list", "lost"}
+    >>> for ladder in all_shortest_ladders("cast", "list", ws):
+    ...     print(ladder)
+    ['cast', 'cost', 'lost', 'list']
+    >>> for ladder in all_shortest_ladders("most", "list", ws):
+    ...     print(ladder)
+    ['most', 'lost', 'list']
+    ['most', 'mist', 'list']
+    >>> list(all_shortest_ladders("most", "list", ws, limit=1))
+    [['most', 'lost', 'list']]
+    >>> list(all_shortest_ladders("most", "fall", ws))
+    []
+    """
+    return ladders_to(ladder_parents(from_word, ws, {to_word}, budget),
+                      to_word, limit)
+
+
+def solve_ladders(pairs, ws, processes=None, budget=None):
+    """
+    Return a shortest ladder, or None if there is none, for each
+    (from_word, to_word) pair in pairs, in the same order.
+
+    Pairs are grouped by from_word, and each group is answered from one
+    breadth-first search that stops once all its to_words are reached.
+    If processes is given, the groups are shared among that many worker
+    processes. Each search keeps within budget, if it is given, and
+    BudgetExceeded is raised if one runs out; a CancellationToken in
+    budget only stops searches run in this process.
+
+    @type pairs: list[(str, str)]
+    @type ws: set[str] | WordDictionary | WordGraph
+    @type processes: int | None
+    @type budget: SearchBudget | None
+    @rtype: list[list[str] | None]
+
+    >>> ws = {"cost", "most", "cast", "mist", "list", "lost", "fall"}
+    >>> for ladder in solve_ladders([("cast", "list"), ("most", "cost"),
+    ...                              ("cast", "fall"), ("cast", "most")], ws):
+    ...     print(ladder)
+    ['cast', 'cost', 'lost', 'list']
+    ['most', 'cost']
+    None
+    ['cast', 'cost', 'most']
+    >>> solve_ladders([("cast", "list")], ws, budget=SearchBudget(nodes=1))
+    Traceback (most recent call last):
+    ...
+    puzzle_tools.BudgetExceeded: nodes budget exceeded after 1 nodes
+    """
+    dictionary = WordDictionary.intern(ws, WordLadderPuzzle._chars)
+    groups = {}
+    for (from_word, to_word) in pairs:
+        groups.setdefault(from_word, []).append(to_word)
+    if processes is None:
+        _share(dictionary, budget)
+        answers = map(_solve_group, groups.items())
+    else:
+        from multiprocessing import Pool
+        if budget is not None:
+            # a CancellationToken can't be sent to another process
+            budget = SearchBudget(budget.nodes, budget.seconds, budget.memory)
+        with Pool(processes, _share, (dictionary, budget)) as pool:
+            answers = pool.map(_solve_group, groups.items())
+    ladders = dict(zip(groups, answers))
+    return [ladders[from_word][to_word] for (from_word, to_word) in pairs]
+
+
+# dictionary solve_ladders shares with _solve_group in this process, and
+# the budget of each search
+_shared = None
+_budget = None
+
+
+def _share(dictionary, budget=None):
+    # Make dictionary the one _solve_group searches, within budget, once
+    # per process.
+    #
+    # @type dictionary: WordDictionary | WordGraph
+    # @type budget: SearchBudget | None
+    # @rtype: None
+    global _shared, _budget
+    (_shared, _budget) = (dictionary, budget)
+
+
+def _solve_group(group):
+    # Return a shortest ladder, or None, from the word of group to each
+    # of its targets, found with one search of the shared dictionary.
+    #
+    # @type group: (str, list[str])
+    # @rtype: dict[str, list[str] | None]
+    (from_word, to_words) = group
+    parents = ladder_parents(from_word, _shared, set(to_words), _budget)
+    return {to_word: next(ladders_to(parents, to_word, 1), None)
+            for to_word in to_words}
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from time import time
+
+    with open("words.txt", "r") as words:
+        word_set = WordDictionary.intern(words.read().split())
+    start = time()
+    ladders = list(all_shortest_ladders("same", "cost", word_set))
+    end = time()
+    print("Found {} shortest ladders from same to cost in {} seconds.".format(
+        len(ladders), end - start))
@@ -0,0 +1,368 @@
+"""
+A landmark distance oracle for answering many word-ladder queries on one
+word graph
+
+Preprocessing labels the connected components of a WordGraph and picks
+up to k landmark words in each, spread out by farthest-point selection.
+It stores the number of steps from each landmark to every word of its
+component and back. Steps are one-way when a word has a letter outside
+the graph's chars ("Cost" steps to "cost" but not back), so the triangle
+inequality gives two lower bounds on the steps from u to t for each
+landmark l:
+
+    d(l, t) - d(l, u)  and  d(u, l) - d(t, l)
+
+The largest of these is an admissible heuristic for A* search. Words in
+different components, or that a landmark shows cannot reach each other,
+are answered as unreachable without searching at all.
+
+File layout, in native byte order:
+    header: magic, format version, number of words, k, sha256 of the
+            word list the graph was compiled from
+    components: number of words uint32 component ids
+    outward: number of words * k uint16, the steps from the j-th
+             landmark of word i's component to word i at i * k + j
+    inward: the same for the steps from word i to the landmark
+Unreachable words are _FAR steps away.
+"""
+from puzzle_tools import Meter
+from array import array
+from collections import deque
+import heapq
+import os
+import struct
+
+_MAGIC = b"WLMARKS\0"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("=8sIII32s")
+# steps to a word that cannot be reached, the largest a uint16 can hold
+_FAR = 0xFFFF
+
+
+class LandmarkOracle:
+    """
+    Landmark distances over a WordGraph, for telling whether one word
+    can reach another and finding shortest ladders between them.
+
+    Build one with LandmarkOracle.build, or with load_landmarks to reuse
+    the one saved from an earlier run.
+    """
+
+    def __init__(self, graph, k, components, outward, inward):
+        """
+        Create a new LandmarkOracle self over graph with k landmarks per
+        component, given the component id of each word numbered in
+        graph and the steps to and from the landmarks laid out as in
+        the module docstring.
+
+        @type self: LandmarkOracle
+        @type graph: WordGraph
+        @type k: int
+        @type components: array[int]
+        @type outward: array[int]
+        @type inward: array[int]
+        @rtype: None
+        """
+        self.graph, self.k, self.components = graph, k, components
+        self.outward, self.inward = outward, inward
+
+    @staticmethod
+    def build(graph, k=4):
+        """
+        Return a new LandmarkOracle over graph with up to k landmarks in
+        each component.
+
+        @type graph: WordGraph
+        @type k: int
+        @rtype: LandmarkOracle
+        """
+        n = len(graph)
+        backward = [[] for _ in range(n)]
+        for i in range(n):
+            for j in graph.neighbour_numbers(i):
+                backward[j].append(i)
+        components = array("I", bytes(4 * n))
+        outward = array("H", bytes(2 * n * k))
+        inward = array("H", bytes(2 * n * k))
+        seen, component = bytearray(n), 0
+        for i in range(n):
+            if not seen[i]:
+                members = list(_steps(
+                    lambda j: list(graph.neighbour_numbers(j)) + backward[j],
+                    i))
+                for j in members:
+                    seen[j], components[j] = 1, component
+                _place_landmarks(graph.neighbour_numbers, backward.__getitem__,
+                                 members, k, outward, inward)
+                component += 1
+        return LandmarkOracle(graph, k, components, outward, inward)
+
+    def save(self, path):
+        """
+        Write LandmarkOracle self to the file at path.
+
+        @type self: LandmarkOracle
+        @type path: str
+        @rtype: None
+        """
+        header = _HEADER.pack(_MAGIC, FORMAT_VERSION, len(self.graph), self.k,
+                              self.graph.checksum)
+        temporary = "{}.{}.tmp".format(path, os.getpid())
+        with open(temporary, "wb") as f:
+            f.write(header)
+            f.write(self.components.tobytes())
+            f.write(self.outward.tobytes())
+            f.write(self.inward.tobytes())
+        os.replace(temporary, path)
+
+    def estimate(self, i, j):
+        """
+        Return a lower bound on the number of steps from the word
+        numbered i to the word numbered j, or None if the landmarks show
+        there is no way there.
+
+        @type self: LandmarkOracle
+        @type i: int
+        @type j: int
+        @rtype: int | None
+        """
+        if self.components[i] != self.components[j]:
+            return None
+        k, outward, inward, result = self.k, self.outward, self.inward, 0
+        for m in range(i * k, i * k + k):
+            n = m - i * k + j * k
+            if outward[m] != _FAR:
+                if outward[n] == _FAR:
+                    return None
+                result = max(result, outward[n] - outward[m])
+            if inward[n] != _FAR:
+                if inward[m] == _FAR:
+                    return None
+                result = max(result, inward[m] - inward[n])
+        return result
+
+    def reachable(self, from_word, to_word):
+        """
+        Return whether a ladder can step from from_word to to_word in
+        the graph of LandmarkOracle self, as far as the landmarks can
+        tell without searching. A True may still turn out to have no
+        ladder.
+
+        @type self: LandmarkOracle
+        @type from_word: str
+        @type to_word: str
+        @rtype: bool
+        """
+        if from_word == to_word:
+            return True
+        target = self.graph.number(to_word)
+        return target is not None and any(
+            self.estimate(i, target) is not None
+            for (i, _) in self._starts(from_word))
+
+    def ladder(self, from_word, to_word, budget=None):
+        """
+        Return a shortest ladder of words from from_word to to_word, or
+        None if there is none.
+
+        Each word whose neighbours are looked up counts as a node
+        expanded against budget, if it is given; raise BudgetExceeded
+        if it runs out.
+
+        @type self: LandmarkOracle
+        @type from_word: str
+        @type to_word: str
+        @type budget: SearchBudget | None
+        @rtype: list[str] | None
+
+        >>> import tempfile
+        >>> from word_graph import load_word_graph
+        >>> folder = tempfile.mkdtemp()
+        >>> source = os.path.join(folder, "words.txt")
+        >>> with open(source, "w") as f:
+        ...     _ = f.write("cost most cast mist list lost fall Cost")
+        >>> g = load_word_graph(os.path.join(folder, "words.graph"), source)
+        >>> oracle = LandmarkOracle.build(g, 2)
+        >>> oracle.ladder("cast", "list")
+        ['cast', 'cost', 'lost', 'list']
+        >>> oracle.ladder("mast", "list")
+        ['mast', 'mist', 'list']
+        >>> oracle.distance("Cost", "mist")
+        2
+        >>> oracle.ladder("most", "Cost") is None
+        True
+        >>> oracle.reachable("cast", "fall")
+        False
+        >>> from puzzle_tools import SearchBudget
+        >>> oracle.ladder("cast", "list", SearchBudget(nodes=2))
+        Traceback (most recent call last):
+        ...
+        puzzle_tools.BudgetExceeded: nodes budget exceeded after 2 nodes
+        """
+        if from_word == to_word:
+            return [from_word]
+        graph, target = self.graph, self.graph.number(to_word)
+        if target is None:
+            return None
+        parents, steps, frontier = {}, {}, []
+        for (i, g) in self._starts(from_word):
+            h = self.estimate(i, target)
+            if h is not None:
+                parents[i], steps[i] = None, g
+                heapq.heappush(frontier, (g + h, i))
+        (closed, meter) = (set(), Meter(budget))
+        while frontier:
+            (_, i) = heapq.heappop(frontier)
+            if i == target:
+                return self._path(from_word, target, parents)
+            if i in closed:
+                continue
+            closed.add(i)
+            neighbours = graph.neighbour_numbers(i)
+            for j in neighbours:
+                if j not in steps or steps[i] + 1 < steps[j]:
+                    h = self.estimate(j, target)
+                    if h is not None:
+                        parents[j], steps[j] = i, steps[i] + 1
+                        heapq.heappush(frontier, (steps[j] + h, j))
+            meter.spend(len(neighbours), len(frontier), steps[i])
+            meter.check()
+        return None
+
+    def distance(self, from_word, to_word, budget=None):
+        """
+        Return the number of steps in a shortest ladder from from_word
+        to to_word, or None if there is none, searching within budget
+        as ladder does.
+
+        @type self: LandmarkOracle
+        @type from_word: str
+        @type to_word: str
+        @type budget: SearchBudget | None
+        @rtype: int | None
+        """
+        path = self.ladder(from_word, to_word, budget)
+        return None if path is None else len(path) - 1
+
+    def _starts(self, from_word):
+        # Return (number, steps) pairs of the words of self's graph a
+        # ladder from from_word starts on: from_word itself, or its
+        # neighbours if it is not in the graph.
+        #
+        # @type self: LandmarkOracle
+        # @type from_word: str
+        # @rtype: list[(int, int)]
+        i = self.graph.number(from_word)
+        if i is not None:
+            return [(i, 0)]
+        return [(self.graph.number(word), 1)
+                for word in self.graph.neighbours(from_word)]
+
+    def _path(self, from_word, target, parents):
+        # Return the words of the ladder from from_word that parents
+        # leads back along from target.
+        #
+        # @type self: LandmarkOracle
+        # @type from_word: str
+        # @type target: int
+        # @type parents: dict[int, int | None]
+        # @rtype: list[str]
+        path = []
+        while target is not None:
+            path.append(self.graph.word(target))
+            target = parents[target]
+        if path[-1] != from_word:
+            path.append(from_word)
+        return path[::-1]
+
+
+def load_landmarks(path, graph, k=4):
+    """
+    Return the LandmarkOracle saved at path for graph, first building
+    and saving it if the file is missing, of another format version or
+    k, or built for another word list.
+
+    @type path: str
+    @type graph: WordGraph
+    @type k: int
+    @rtype: LandmarkOracle
+    """
+    n = len(graph)
+    try:
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) == _HEADER.size and _HEADER.unpack(header) == (
+                    _MAGIC, FORMAT_VERSION, n, k, graph.checksum):
+                components, outward, inward = (
+                    array("I"), array("H"), array("H"))
+                components.fromfile(f, n)
+                outward.fromfile(f, n * k)
+                inward.fromfile(f, n * k)
+                return LandmarkOracle(graph, k, components, outward, inward)
+    except (OSError, EOFError):
+        pass
+    oracle = LandmarkOracle.build(graph, k)
+    oracle.save(path)
+    return oracle
+
+
+def _steps(neighbours, source):
+    # Return the number of steps from source to each node it can reach
+    # through neighbours, in breadth-first order.
+    #
+    # @type neighbours: (int) -> iterable[int]
+    # @type source: int
+    # @rtype: dict[int, int]
+    result, queue = {source: 0}, deque([source])
+    while queue:
+        i = queue.popleft()
+        for j in neighbours(i):
+            if j not in result:
+                result[j] = result[i] + 1
+                queue.append(j)
+    return result
+
+
+def _place_landmarks(forward, backward, members, k, outward, inward):
+    # Pick up to k landmarks among members, a component of a graph
+    # with the given forward and backward neighbours, each the member
+    # farthest from those picked before, and fill in the members' steps
+    # from and to them. Small components repeat their last landmark.
+    #
+    # @type forward: (int) -> iterable[int]
+    # @type backward: (int) -> iterable[int]
+    # @type members: list[int]
+    # @type k: int
+    # @type outward: array[int]
+    # @type inward: array[int]
+    # @rtype: None
+    from_start = _steps(forward, members[0])
+    landmark = max(members, key=lambda i: from_start.get(i, -1))
+    nearest = dict.fromkeys(members, _FAR)
+    for m in range(k):
+        away, back = _steps(forward, landmark), _steps(backward, landmark)
+        for i in members:
+            outward[i * k + m] = away.get(i, _FAR)
+            inward[i * k + m] = back.get(i, _FAR)
+            nearest[i] = min(nearest[i], away.get(i, _FAR))
+        assert max(away.values()) < _FAR and max(back.values()) < _FAR
+        if max(nearest.values()) > 0:
+            landmark = max(members, key=nearest.get)
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from word_graph import load_word_graph
+    from time import time
+
+    graph = load_word_graph("words.graph", "words.txt")
+    start = time()
+    oracle = load_landmarks("words.landmarks", graph)
+    end = time()
+    print("Loaded landmarks in {} seconds.".format(end - start))
+    start = time()
+    print(oracle.ladder("same", "cost"))
+    end = time()
+    print("Found a ladder from same to cost in {} seconds.".format(
+        end - start))